@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+from __future__ import division, absolute_import, print_function
+"""Benchmark evaluation of the M2 collimation (flexure) model
+
+Times, per point, over random points in the du Pont pointing envelope:
+- scalar: CollimationModel.getOrientation, one point at a time
+- numpy scalar: the vectorized model called with one point at a time
+  (as the model was evaluated before scalar evaluation used the math module)
+- vectorized: CollimationModel.getOrientationArr, all points at once
+- grid scalar, grid vectorized: the same using a precomputed interpolation grid
+and reports the maximum interpolation error of the grid.
+"""
+import argparse
+import time
+
+import numpy
+
+from tcc.cmd.collimate import CollimationModel, DuPontHALimits, DuPontDecLimits, getFlexTermsArr
+
+def timePerPoint(func, num):
+    """Return usec per point of calling func(), which evaluates num points
+    """
+    startTime = time.time()
+    func()
+    return (time.time() - startTime) * 1e6 / num
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--num", type=int, default=20000, help="number of points")
+    parser.add_argument("--step", type=float, default=1., help="grid spacing (deg)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    rand = numpy.random.RandomState(args.seed)
+    haArr = rand.uniform(DuPontHALimits[0], DuPontHALimits[1], args.num)
+    decArr = rand.uniform(DuPontDecLimits[0], DuPontDecLimits[1], args.num)
+    haList = haArr.tolist()
+    decList = decArr.tolist()
+
+    model = CollimationModel()
+    exactArr = model.getOrientationArr(haArr, decArr)
+    resultList = [
+        ("scalar", timePerPoint(lambda: [model.getOrientation(ha, dec) for ha, dec in zip(haList, decList)], args.num)),
+        ("numpy scalar", timePerPoint(lambda: [model.baseOrientation - getFlexTermsArr(ha, dec)
+            for ha, dec in zip(haList, decList)], args.num)),
+        ("vectorized", timePerPoint(lambda: model.getOrientationArr(haArr, decArr), args.num)),
+    ]
+    startTime = time.time()
+    model.useGrid(step=args.step)
+    gridTime = time.time() - startTime
+    resultList += [
+        ("grid scalar", timePerPoint(lambda: [model.getOrientation(ha, dec) for ha, dec in zip(haList, decList)], args.num)),
+        ("grid vectorized", timePerPoint(lambda: model.getOrientationArr(haArr, decArr), args.num)),
+    ]
+    maxErr = numpy.max(numpy.abs(model.getOrientationArr(haArr, decArr) - exactArr), axis=0)
+
+    print("%i points; usec per point:" % (args.num,))
+    for name, usecPerPoint in resultList:
+        print("%-16s %9.3f" % (name, usecPerPoint))
+    print("grid: step=%s deg, %i x %i points, built in %.3f sec" % (args.step, model.grid.numHA, model.grid.numDec, gridTime))
+    print("grid max error: tiltX=%.4f, tiltY=%.4f arcsec; transX=%.4f, transY=%.4f microns" % tuple(maxErr))
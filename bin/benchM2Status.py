@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+from __future__ import division, absolute_import, print_function
+"""Benchmark parsing and formatting of M2 status replies
+
+Reports the cost per reply (usec) of M2 Status.parseStatus and of parseStatus followed by
+getStatusDict (as done for every status poll), for unchanged replies (the usual case),
+replies whose orientation changes (a move), and replies with the fields out of order
+(which cannot use the precompiled parser). For comparison the same is timed for
+the previous implementation (lowercase, split and check each field, format all keywords).
+"""
+import argparse
+import time
+
+from tcc.dev.m2Device import Status, validMotionStates, validStates
+
+class OldStatus(Status):
+    """Status with the previous parser and keyword formatting, for comparison
+    """
+    __slots__ = ()
+
+    def parseStatus(self, replyStr):
+        replyStr = replyStr.lower()
+        for statusBit in replyStr.split():
+            key, val = statusBit.split("=")
+            if key == "state":
+                if val == "error":
+                    val = "Failed"
+                else:
+                    val = val.title()
+                assert val in validMotionStates, "%s, %s"%(val, str(validMotionStates))
+            elif key == "ori":
+                key = "orientation"
+                val = [float(x) for x in val.split(",")]
+                assert len(val) == 5
+            elif key == "galil":
+                assert val in validStates
+            elif key == "lamps":
+                if val != "off":
+                    val = "on"
+            assert key in dir(self)
+            setattr(self, key, val)
+
+    def getStatusDict(self):
+        return {
+            "secState": self.secStateStr(),
+            "secFocus": self.secFocusStr(),
+            "Galil": self.galilStr(),
+            "secOrient": self.secOrientStr(),
+            "secDesOrient": self.secDesOrientStr(),
+            "ffPower": self.ffPowerStr(),
+        }
+
+def makeReplyList(kind, num):
+    """Return a list of num status replies of the specified kind: "unchanged", "moving" or "reordered"
+    """
+    if kind == "unchanged":
+        return ["State=DONE Ori=12500.0,-0.0,-0.0,-0.0,0.0 Lamps=off Galil=off"] * num
+    if kind == "moving":
+        return ["State=MOVING Ori=%.1f,70.0,-12.0,-600.1,925.0 Lamps=off Galil=on" % (12500 + ind * 0.1,)
+            for ind in range(num)]
+    if kind == "reordered":
+        return ["Galil=off Lamps=off State=DONE Ori=12500.0,-0.0,-0.0,-0.0,0.0"] * num
+    raise RuntimeError("Unknown kind %r" % (kind,))
+
+def timeReplies(status, replyList, getDict):
+    """Return mean usec per reply to parse (and, if getDict, format) each reply in replyList
+    """
+    startTime = time.time()
+    if getDict:
+        for replyStr in replyList:
+            status.parseStatus(replyStr)
+            status.getStatusDict()
+    else:
+        for replyStr in replyList:
+            status.parseStatus(replyStr)
+    return (time.time() - startTime) * 1e6 / len(replyList)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--num", type=int, default=20000, help="number of replies per measurement")
+    args = parser.parse_args()
+
+    print("usec per reply (%i replies each)" % (args.num,))
+    print("%-10s %-12s %9s %9s" % ("status", "replies", "parse", "+format"))
+    for statusClass in (OldStatus, Status):
+        for kind in ("unchanged", "moving", "reordered"):
+            replyList = makeReplyList(kind, args.num)
+            status = statusClass()
+            status.speed = 25.0
+            status.desOrientation = [12600.0, 70.0, -12.0, -600.1, 925.0]
+            parseTime = timeReplies(status, replyList, getDict=False)
+            status = statusClass()
+            status.speed = 25.0
+            status.desOrientation = [12600.0, 70.0, -12.0, -600.1, 925.0]
+            formatTime = timeReplies(status, replyList, getDict=True)
+            print("%-10s %-12s %9.2f %9.2f" % (statusClass.__name__, kind, parseTime, formatTime))
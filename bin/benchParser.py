@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+from __future__ import division, absolute_import, print_function
+"""Benchmark the TCC command parser
+
+Parses a reproducible mix of LCO TCC commands (similar to what the TCC receives
+while observing) with TCCLCOCmdParser and reports:
+- parses per second
+- latency percentiles (usec) for each verb
+- objects allocated per parse that are still alive after the parse
+  (the parsed command, plus anything the parser keeps, such as cache entries);
+  these are GC-tracked objects, measured on a sample of the commands.
+  Temporary objects are not counted: python 2 offers no way to count them.
+
+Results may be saved as JSON and compared with a saved baseline, e.g.:
+    benchParser.py --save before.json
+    (change the parser)
+    benchParser.py --compare before.json
+"""
+import argparse
+import collections
+import datetime
+import gc
+import json
+import random
+import sys
+import time
+
+import pyparsing
+
+import tcc
+from tcc.actor.tccLCOCmdParser import TCCLCOCmdParser
+
+ResultFormatVersion = 1
+
+def _off(rand, sigma):
+    return "%.6f" % (rand.gauss(0, sigma),)
+
+def _guideOffset(rand):
+    line = "guideoffset %s,%s,%s,%s" % (_off(rand, 1e-4), _off(rand, 1e-4), _off(rand, 1e-3), _off(rand, 5))
+    if rand.random() < 0.2:
+        line += "/waitTime=5"
+    return line
+
+def _offset(rand):
+    return rand.choice((
+        "offset arc %s,%s" % (_off(rand, 1e-3), _off(rand, 1e-3)),
+        "offset guide 0,0,%s" % (_off(rand, 1e-3),),
+        "offset rotator %s" % (_off(rand, 1e-2),),
+        "offset calibration %s,%s" % (_off(rand, 1e-3), _off(rand, 1e-3)),
+    ))
+
+def _target(rand):
+    raStr = "%.6f" % (rand.uniform(0, 360),)
+    decStr = "%.6f" % (rand.uniform(-90, 30),)
+    if rand.random() < 0.2:
+        return "target %s,%s/ha/screen" % (_off(rand, 30), decStr)
+    return "target %s,%s/posAngle=%.2f" % (raStr, decStr, rand.uniform(-180, 180))
+
+def _setFocus(rand):
+    if rand.random() < 0.5:
+        return "set focus=%.1f/incremental" % (rand.gauss(0, 20),)
+    return "set focus=%.1f" % (rand.gauss(0, 100),)
+
+def _secMove(rand):
+    line = "sec move %.1f,%.2f,%.2f,%.1f,%.1f" % (
+        rand.gauss(0, 100), rand.gauss(0, 10), rand.gauss(0, 10), rand.gauss(0, 100), rand.gauss(0, 100))
+    if rand.random() < 0.3:
+        line += "/incremental"
+    return line
+
+# (verb, relative frequency, function that returns a random command line given a random.Random)
+CmdMix = (
+    ("guideoffset", 30, _guideOffset),
+    ("offset", 12, _offset),
+    ("show", 15, lambda rand: rand.choice(("show status", "show status", "show status", "show time", "show focus"))),
+    ("device", 8, lambda rand: rand.choice(("device status", "device status tcs", "device init sec/timeLimit=10"))),
+    ("set focus", 6, _setFocus),
+    ("target", 5, _target),
+    ("sec move", 5, _secMove),
+    ("ff", 3, lambda rand: rand.choice(("ff on", "ff off", "ff status"))),
+    ("collimate", 3, lambda rand: rand.choice(("collimate startTimer", "collimate stopTimer", "collimate force"))),
+)
+
+def makeCmdList(num, seed):
+    """Return a list of num (verb, command line) drawn from CmdMix
+    """
+    rand = random.Random(seed)
+    verbList = []
+    for verb, freq, func in CmdMix:
+        verbList += [(verb, func)] * freq
+    cmdList = []
+    for i in range(num):
+        verb, func = rand.choice(verbList)
+        cmdList.append((verb, func(rand)))
+    return cmdList
+
+def percentile(sortedList, pct):
+    """Return the pct percentile of a sorted list (nearest rank)
+    """
+    ind = int(round(pct / 100.0 * (len(sortedList) - 1)))
+    return sortedList[ind]
+
+def summarize(latencyList, objCountList):
+    """Return a dict of latency statistics (usec) and mean objects per parse
+    """
+    latencyList = sorted(latencyList)
+    return collections.OrderedDict((
+        ("count", len(latencyList)),
+        ("mean", 1e6 * sum(latencyList) / len(latencyList)),
+        ("p50", 1e6 * percentile(latencyList, 50)),
+        ("p90", 1e6 * percentile(latencyList, 90)),
+        ("p99", 1e6 * percentile(latencyList, 99)),
+        ("max", 1e6 * latencyList[-1]),
+        ("objects", sum(objCountList) / len(objCountList)),
+    ))
+
+def resetParser(cmdParser):
+    """Discard parser state that would make a later pass unrepresentative (the parse cache, if any)
+    """
+    if hasattr(cmdParser, "clearCache"):
+        cmdParser.clearCache()
+
+def runBenchmark(cmdParser, cmdList, numObjSamples):
+    """Parse each line in cmdList; return a dict of results
+
+    Makes three passes: one timing the whole list, for throughput; one timing each parse;
+    and one (with garbage collection disabled) counting objects left by each of numObjSamples parses
+    (spread evenly through the list; counting is slow).
+    """
+    failDict = collections.defaultdict(int) # verb: number of lines that failed to parse
+
+    resetParser(cmdParser)
+    startTime = time.time()
+    for verb, line in cmdList:
+        try:
+            cmdParser.parseLine(line)
+        except Exception:
+            failDict[verb] += 1
+    parsesPerSec = len(cmdList) / (time.time() - startTime)
+
+    resetParser(cmdParser)
+    latencyDict = collections.defaultdict(list) # verb: list of seconds per parse
+    for verb, line in cmdList:
+        parseStart = time.time()
+        try:
+            cmdParser.parseLine(line)
+        except Exception:
+            pass
+        latencyDict[verb].append(time.time() - parseStart)
+
+    resetParser(cmdParser)
+    objCountDict = collections.defaultdict(list) # verb: list of objects per parse
+    parsedList = [] # keep parsed commands, so their objects are counted
+    sampleInterval = max(1, len(cmdList) // max(1, numObjSamples))
+    gc.collect()
+    gcWasEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        for ind, (verb, line) in enumerate(cmdList):
+            # parse every line, so the parser's state (e.g. its cache) is as in the other passes
+            doCount = ind % sampleInterval == 0
+            if doCount:
+                startCount = len(gc.get_objects())
+            try:
+                parsedList.append(cmdParser.parseLine(line))
+            except Exception:
+                pass
+            if hasattr(sys, "exc_clear"):
+                # python 2 keeps the last exception handled and its traceback
+                sys.exc_clear()
+            if doCount:
+                objCountDict[verb].append(len(gc.get_objects()) - startCount)
+    finally:
+        if gcWasEnabled:
+            gc.enable()
+    del parsedList
+
+    verbDict = collections.OrderedDict()
+    for verb, freq, func in CmdMix:
+        if verb in latencyDict:
+            verbDict[verb] = summarize(latencyDict[verb], objCountDict[verb] or [0])
+            verbDict[verb]["failed"] = failDict[verb]
+    allLatency = [lat for latList in latencyDict.values() for lat in latList]
+    allObjCount = [num for numList in objCountDict.values() for num in numList]
+    return collections.OrderedDict((
+        ("parsesPerSec", parsesPerSec),
+        ("all", summarize(allLatency, allObjCount)),
+        ("verbs", verbDict),
+    ))
+
+def printResults(resultDict):
+    print("%.0f parses/sec" % (resultDict["parsesPerSec"],))
+    print("%-12s %7s %9s %9s %9s %9s %9s %8s %6s" %
+        ("verb", "count", "mean us", "p50 us", "p90 us", "p99 us", "max us", "objects", "failed"))
+    rowList = list(resultDict["verbs"].items()) + [("all", resultDict["all"])]
+    for verb, stats in rowList:
+        print("%-12s %7d %9.1f %9.1f %9.1f %9.1f %9.1f %8.1f %6s" % (
+            verb, stats["count"], stats["mean"], stats["p50"], stats["p90"], stats["p99"],
+            stats["max"], stats["objects"], stats.get("failed", "")))
+
+def printComparison(baseDict, resultDict):
+    """Print results relative to a baseline (ratio = new / baseline)
+    """
+    if baseDict.get("formatVersion") != ResultFormatVersion:
+        print("Warning: baseline has format version %s; expected %s" % (baseDict.get("formatVersion"), ResultFormatVersion))
+    for key in ("num", "seed", "numObj"):
+        if baseDict["config"].get(key) != resultDict["config"][key]:
+            print("Warning: baseline %s=%s differs from %s; results may not be comparable" %
+                (key, baseDict["config"].get(key), resultDict["config"][key]))
+    print("\nCompared to baseline saved %s (ratio = new / baseline):" % (baseDict.get("date"),))
+    print("parses/sec: %.0f -> %.0f (%.2f)" % (baseDict["parsesPerSec"], resultDict["parsesPerSec"],
+        resultDict["parsesPerSec"] / baseDict["parsesPerSec"]))
+    print("%-12s %18s %18s %18s" % ("verb", "p50 us", "p99 us", "objects"))
+    baseVerbDict = dict(baseDict["verbs"], all=baseDict["all"])
+    rowList = list(resultDict["verbs"].items()) + [("all", resultDict["all"])]
+    for verb, stats in rowList:
+        baseStats = baseVerbDict.get(verb)
+        if baseStats is None:
+            print("%-12s not in baseline" % (verb,))
+            continue
+        colList = []
+        for key in ("p50", "p99", "objects"):
+            ratioStr = "(%.2f)" % (stats[key] / baseStats[key],) if baseStats[key] else ""
+            colList.append("%7.1f->%7.1f %s" % (baseStats[key], stats[key], ratioStr))
+        print("%-12s %s" % (verb, "  ".join(colList)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("-n", "--num", type=int, default=10000, help="number of commands to parse per pass")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the command mix")
+    parser.add_argument("--numObj", type=int, default=2000, help="number of parses for which to count objects")
+    parser.add_argument("--noCache", action="store_true", help="disable the parse cache (if the parser has one)")
+    parser.add_argument("--noFast", action="store_true", help="disable the fast tokenizer (if the parser has one)")
+    parser.add_argument("--save", help="save results as JSON to this file")
+    parser.add_argument("--compare", help="compare results with a baseline saved with --save")
+    parser.add_argument("--show", action="store_true", help="print a sample of the command mix and exit")
+    args = parser.parse_args()
+
+    cmdList = makeCmdList(args.num, args.seed)
+    if args.show:
+        for verb, line in cmdList[0:40]:
+            print(line)
+        sys.exit(0)
+
+    cmdParser = TCCLCOCmdParser()
+    if args.noCache:
+        cmdParser.cacheSize = 0
+    if args.noFast:
+        cmdParser.useFastTokenize = False
+
+    resultDict = collections.OrderedDict((
+        ("formatVersion", ResultFormatVersion),
+        ("date", datetime.datetime.now().isoformat()),
+        ("config", collections.OrderedDict((
+            ("num", args.num),
+            ("seed", args.seed),
+            ("numObj", args.numObj),
+            ("cacheSize", getattr(cmdParser, "cacheSize", None)),
+            ("useFastTokenize", getattr(cmdParser, "useFastTokenize", None)),
+            ("python", sys.version.split()[0]),
+            ("pyparsing", pyparsing.__version__),
+            ("tcc", tcc.__version__),
+        ))),
+    ))
+    resultDict.update(runBenchmark(cmdParser, cmdList, args.numObj))
+    printResults(resultDict)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(resultDict, f, indent=2)
+        print("Saved results to %s" % (args.save,))
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseDict = json.load(f)
+        printComparison(baseDict, resultDict)
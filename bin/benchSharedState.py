@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+from __future__ import division, absolute_import, print_function
+"""Benchmark the shared memory telescope state block
+
+Times writes and consistent reads of a state block in a temporary file
+(or read an existing block with --path, e.g. the one published by the running TCC).
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from tcc.utils.sharedState import SharedStateWriter, SharedStateReader, SharedStateFields
+
+def timeLoop(func, num):
+    """Return mean seconds per call of func
+    """
+    startTime = time.time()
+    for i in range(num):
+        func()
+    return (time.time() - startTime) / num
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--num", type=int, default=100000, help="number of iterations")
+    parser.add_argument("--path", help="read this existing state block instead of benchmarking a temporary one")
+    args = parser.parse_args()
+
+    if args.path:
+        reader = SharedStateReader(args.path)
+        print("readTuple: %.2f usec" % (timeLoop(reader.readTuple, args.num) * 1e6,))
+        print("read:      %.2f usec" % (timeLoop(reader.read, args.num) * 1e6,))
+        print(reader.read())
+    else:
+        fd, path = tempfile.mkstemp(prefix="tccState")
+        os.close(fd)
+        try:
+            writer = SharedStateWriter(path)
+            reader = SharedStateReader(path)
+            valueDict = dict((name, 1.0) for name in SharedStateFields if name != "time")
+            print("%i fields, %i iterations" % (len(SharedStateFields), args.num))
+            print("update:    %.2f usec" % (timeLoop(lambda: writer.update(valueDict), args.num) * 1e6,))
+            print("readTuple: %.2f usec" % (timeLoop(reader.readTuple, args.num) * 1e6,))
+            print("read:      %.2f usec" % (timeLoop(reader.read, args.num) * 1e6,))
+            reader.close()
+            writer.close()
+        finally:
+            os.remove(path)
@@ -1,3 +1,7 @@
+# profile imports if requested (before importing anything else); see tcc.utils.importProfile
+from .utils.importProfile import startImportProfileFromEnv
+startImportProfileFromEnv()
+
 import RO.Comm.Generic
 RO.Comm.Generic.setFramework("twisted")
 
@@ -0,0 +1,127 @@
+from __future__ import division, absolute_import
+"""Per user keyword subscriptions: which status keywords a user wants and how often
+"""
+import collections
+import time
+
+from RO.Comm.TwistedTimer import Timer
+
+__all__ = ["KWSubscription", "KWSubscriptionManager"]
+
+
+class KWSubscription(object):
+    def __init__(self, writeFunc, kwList=None, maxRate=None):
+        """!A user's subscription to status keywords
+
+        Keywords not in kwList are dropped.  Keyword output is written at most maxRate
+        times per second; in between the latest value of each keyword is kept and
+        written together when the interval is up.
+
+        @param[in] writeFunc  callable that writes a reply to the user;
+            called with (cmd, msgStr), where cmd is the command of the latest update
+        @param[in] kwList  list of keywords wanted (case blind); None for all
+        @param[in] maxRate  maximum number of replies per second; None for no limit
+        """
+        self.writeFunc = writeFunc
+        self.kwSet = None if kwList is None else frozenset(kw.lower() for kw in kwList)
+        self.minInterval = 1 / float(maxRate) if maxRate else 0
+        self.pendingDict = collections.OrderedDict() # kw: latest value, not yet written
+        self.pendingCmd = None
+        self.lastWriteTime = 0
+        self.flushTimer = Timer()
+
+    def update(self, cmd, kwValList):
+        """!Add keyword output; write it now or when the rate limit allows
+
+        @param[in] cmd  command associated with the keyword output
+        @param[in] kwValList  list of (keyword, value string)
+        """
+        for kw, val in kwValList:
+            if self.kwSet is not None and kw.lower() not in self.kwSet:
+                continue
+            # move the keyword to the end, so output order follows update order
+            self.pendingDict.pop(kw, None)
+            self.pendingDict[kw] = val
+        if not self.pendingDict:
+            return
+        self.pendingCmd = cmd
+        delay = self.lastWriteTime + self.minInterval - time.time()
+        if delay <= 0:
+            self.flush()
+        elif not self.flushTimer.isActive:
+            self.flushTimer.start(delay, self.flush)
+
+    def flush(self):
+        """!Write pending keyword output now
+        """
+        self.flushTimer.cancel()
+        if not self.pendingDict:
+            return
+        msgStr = "; ".join("%s=%s"%(kw, val) for kw, val in self.pendingDict.iteritems())
+        self.pendingDict = collections.OrderedDict()
+        self.lastWriteTime = time.time()
+        self.writeFunc(self.pendingCmd, msgStr)
+
+    def cancel(self):
+        """!Discard pending output
+        """
+        self.flushTimer.cancel()
+        self.pendingDict = collections.OrderedDict()
+
+
+class KWSubscriptionManager(object):
+    def __init__(self, actor):
+        """!Route status keyword output to connected users according to their subscriptions
+
+        Users without a subscription get all keyword output, as before.
+
+        @param[in] actor  the actor whose users are written to; must have userDict and writeToOneUser
+        """
+        self.actor = actor
+        self.subDict = {} # userID: KWSubscription
+
+    def __len__(self):
+        return len(self.subDict)
+
+    def subscribe(self, userID, kwList=None, maxRate=None):
+        """!Set (or replace) a user's subscription
+
+        @param[in] userID  ID of user
+        @param[in] kwList  list of keywords wanted (case blind); None for all
+        @param[in] maxRate  maximum number of replies per second; None for no limit
+        """
+        self.unsubscribe(userID)
+        def writeFunc(cmd, msgStr):
+            if userID in self.actor.userDict:
+                self.actor.writeToOneUser("d", msgStr, cmd=cmd, userID=userID)
+        self.subDict[userID] = KWSubscription(writeFunc, kwList=kwList, maxRate=maxRate)
+
+    def unsubscribe(self, userID):
+        """!Remove a user's subscription (if any); the user then gets all keyword output
+        """
+        sub = self.subDict.pop(userID, None)
+        if sub is not None:
+            sub.cancel()
+
+    def writeKWs(self, cmd, kwValList):
+        """!Write status keyword output to each connected user, as subscribed
+
+        @param[in] cmd  command associated with the keyword output
+        @param[in] kwValList  list of (keyword, value string)
+        """
+        # forget users that have disconnected
+        for userID in [userID for userID in self.subDict if userID not in self.actor.userDict]:
+            self.unsubscribe(userID)
+        if not self.subDict:
+            # nobody is subscribed: broadcast, as without subscriptions
+            cmd.writeToUsers("d", "; ".join("%s=%s"%(kw, val) for kw, val in kwValList))
+            return
+        msgStr = None
+        for userID in self.actor.userDict.keys():
+            sub = self.subDict.get(userID)
+            if sub is not None:
+                sub.update(cmd, kwValList)
+                continue
+            if msgStr is None:
+                msgStr = "; ".join("%s=%s"%(kw, val) for kw, val in kwValList)
+            self.actor.writeToOneUser("d", msgStr, cmd=cmd, userID=userID)
@@ -1,27 +1,54 @@
 from __future__ import division, absolute_import
 """The TCC (telescope control code) interface shim for the Las Campanas Observatory du Pont telescope
 """
+import collections
 import sys
+import time
 import traceback
 
 from RO.StringUtil import strFromException
 from RO.Comm.TwistedTimer import Timer
 
 import numpy
-from astropy.time import Time
 
-from twistedActor import CommandError, BaseActor, DeviceCollection, expandCommand
+from twistedActor import CommandError, BaseActor, DeviceCollection, expandCommand, log
 
 from .tccLCOCmdParser import TCCLCOCmdParser
+from .kwSubscription import KWSubscriptionManager
 from ..version import __version__
 
 from ..cmd.collimate import CollimationModel
+from ..utils.sharedState import SharedStateWriter
+from ..utils.taiClock import taiClock
 
 # tcsHost = "localhost"
 # tcsPort = 0
 
 __all__ = ["TCCLCOActor"]
 
+CollimationStatusMaxAge = 1.0 # seconds, tcs status older than this is refreshed before collimating
+CollimationStatusVerbs = ["state", "st", "inpra", "inpdc", "pos"]
+# the leap second table is refreshed from astropy (a slow import) after startup, then daily
+LeapSecondRefreshDelay = 60 # seconds
+LeapSecondRefreshInterval = 24 * 3600 # seconds
+# command modules are imported on first use; import the rest once startup is done
+PreloadCmdFuncsDelay = 5 # seconds
+ObjNetPosMaxAge = 60 # seconds, output objNetPos at least this often even if the position is unchanged
+
+def objNetPosPayload(valueStr):
+    """Return the objNetPos keyword value without its TAI time tags
+
+    objNetPos is: ra, ra velocity, tai, dec, dec velocity, tai
+    """
+    fields = valueStr.split(",")
+    return fields[0:2] + fields[3:5]
+
+# keywords (lowercase) whose values embed a time tag: (function returning the value without the time tag,
+# max seconds between outputs of an unchanged value, or None for no heartbeat)
+TimeTaggedKWDict = {
+    "objnetpos": (objNetPosPayload, ObjNetPosMaxAge),
+}
+
 """
 From Paul's email regarding scaling solution:
 
@@ -77,20 +104,24 @@ class TCCStatus(object):
             "UTC_TAI",
             "axisErr",
             "screenPos",
-            "ffLamp"
+            "ffLamp",
+            "slewDuration",
+            "slewEnd",
         ]
         self.kwDict = {}
         for kw in self.tccKWs:
             self.kwDict[kw.lower()] = None
+        self.kwOutputTimeDict = {} # lowercase keyword: time.time() the keyword was last output
+        # keyword output is gathered while a batch is open, see beginBatch
+        self._batchDepth = 0
+        self._batchDict = collections.OrderedDict() # (id(userCmd), level): (userCmd, OrderedDict of kw: value)
+        self.kwSubscriptions = None # KWSubscriptionManager for debug level output; set by TCCLCOActor
 
     def outputTimeKWs(self, userCmd):
-        timeNow = Time.now()
-        TAI = timeNow.tai.mjd*60*60*24
-        # UT1 = timeNow.ut1.mjd*60*60*24
-        UTC = timeNow.mjd*60*60*24
+        unixTime = time.time()
         timeDict = {
-            "TAI": TAI,
-            "UTC_TAI": UTC-TAI,
+            "TAI": "%.6f"%(taiClock.tai(unixTime),),
+            "UTC_TAI": "%.1f"%(-taiClock.taiMinusUTC(unixTime),),
         }
         self.updateKWs(timeDict, userCmd)
 
@@ -104,7 +135,7 @@ class TCCStatus(object):
         #level
         assert level in [None, "i", "w", "d"]
         level = level
-        didChange = valueStr != self.kwDict[kw.lower()]
+        didChange = self.didKWChange(kw, valueStr)
         self.kwDict[kw.lower()] = valueStr
         output = False
         if userCmd is not None and userCmd.eldestParentCmd.userCommanded:
@@ -120,12 +151,80 @@ class TCCStatus(object):
             level = "d" if level is None else level
 
         if output:
-            userCmd.writeToUsers(level, "%s=%s"%(kw, self.kwDict[kw.lower()]))
+            self.kwOutputTimeDict[kw.lower()] = time.time()
+            if self._batchDepth > 0:
+                batchKey = (id(userCmd), level)
+                if batchKey not in self._batchDict:
+                    self._batchDict[batchKey] = (userCmd, collections.OrderedDict())
+                self._batchDict[batchKey][1][kw] = self.kwDict[kw.lower()]
+            else:
+                self.writeKWs(userCmd, level, [(kw, self.kwDict[kw.lower()])])
+
+    def didKWChange(self, kw, valueStr):
+        """Return True if a keyword value differs from the last one
+
+        For time tagged keywords (see TimeTaggedKWDict) the time tags are ignored,
+        but an unchanged value is reported as changed once it has not been output for its max age.
+        """
+        oldValueStr = self.kwDict[kw.lower()]
+        timeTagInfo = TimeTaggedKWDict.get(kw.lower())
+        if timeTagInfo is None or oldValueStr is None or valueStr is None:
+            return valueStr != oldValueStr
+        payloadFunc, maxAge = timeTagInfo
+        if payloadFunc(valueStr) != payloadFunc(oldValueStr):
+            return True
+        if maxAge is None:
+            return False
+        return time.time() - self.kwOutputTimeDict.get(kw.lower(), 0) > maxAge
 
 
     def updateKWs(self, keyValDict, userCmd, forceOutput=False):
-        for key, val in keyValDict.iteritems():
-            self.updateKW(key, val, userCmd, forceOutput=forceOutput)
+        """Update several keywords; those that are output are written as one reply per level
+        """
+        self.beginBatch()
+        try:
+            for key, val in keyValDict.iteritems():
+                self.updateKW(key, val, userCmd, forceOutput=forceOutput)
+        finally:
+            self.endBatch()
+
+    def beginBatch(self):
+        """Start gathering keyword output
+
+        Until the matching endBatch, keywords to be output are collected (latest value
+        per keyword) and then written as one "key=value; key=value" reply per command and level.
+        Batches may be nested; output is written when the outermost batch ends.
+        """
+        self._batchDepth += 1
+
+    def endBatch(self):
+        """End a batch started by beginBatch; write the gathered output if it is the outermost
+        """
+        self._batchDepth = max(self._batchDepth - 1, 0)
+        if self._batchDepth == 0:
+            self.flushBatch()
+
+    def flushBatch(self):
+        """Write all gathered keyword output now
+        """
+        batchDict = self._batchDict
+        self._batchDict = collections.OrderedDict()
+        for (cmdId, level), (userCmd, kwValDict) in batchDict.iteritems():
+            self.writeKWs(userCmd, level, kwValDict.items())
+
+    def writeKWs(self, userCmd, level, kwValList):
+        """Write keywords as one reply
+
+        Debug level (unsolicited status) output goes through the user subscriptions, if any.
+
+        @param[in] userCmd  command associated with the output
+        @param[in] level  message code
+        @param[in] kwValList  list of (keyword, value)
+        """
+        if level == "d" and self.kwSubscriptions:
+            self.kwSubscriptions.writeKWs(userCmd, kwValList)
+        else:
+            userCmd.writeToUsers(level, "; ".join("%s=%s"%(kw, val) for kw, val in kwValList))
 
 
 class TCCLCOActor(BaseActor):
@@ -137,6 +236,7 @@ class TCCLCOActor(BaseActor):
         tcsDev,
         m2Dev,
         name = "tcc",
+        sharedStatePath = None,
     ):
         """Construct a TCCActor
 
@@ -144,6 +244,8 @@ class TCCLCOActor(BaseActor):
         @param[in] tcsDev a TCSDevice instance
         @param[in] m2Dev a M2Device instance
         @param[in] name  actor name; used for logging
+        @param[in] sharedStatePath  file in which to publish telescope state for local processes
+            (see tcc.utils.sharedState); if None, state is not published
         """
         devices = {
             "tcsDev": tcsDev,
@@ -151,9 +253,13 @@ class TCCLCOActor(BaseActor):
         }
 
         self.status = TCCStatus()
+        self.kwSubscriptions = KWSubscriptionManager(self)
+        self.status.kwSubscriptions = self.kwSubscriptions
+        self.sharedState = None if sharedStatePath is None else SharedStateWriter(sharedStatePath)
         for devName, device in devices.iteritems():
             setattr(self, devName, device)
             device.tccStatus = self.status
+            device.sharedState = self.sharedState
             device.connect()
 
         self.dev = DeviceCollection(devices.values())
@@ -163,6 +269,8 @@ class TCCLCOActor(BaseActor):
         self.collimateTimer = Timer(0, self.updateCollimation)
         self.collimateStatusTimer = Timer()
         self.collimateStatusTimer.start(5, self.collimateStatus) #give things a chance to boot up
+        self.leapSecondTimer = Timer(LeapSecondRefreshDelay, self.refreshLeapSeconds)
+        self.preloadTimer = Timer(PreloadCmdFuncsDelay, self.preloadCmdFuncs)
 
         BaseActor.__init__(self, userPort=userPort, name=name, version=__version__)
 
@@ -199,6 +307,31 @@ class TCCLCOActor(BaseActor):
         else:
             raise RuntimeError("Command %r not yet implemented" % (cmd.parsedCmd.cmdVerb,))
 
+    def subscribe(self, userID, kwList=None, maxRate=None):
+        """Limit the status keyword output sent to one user
+
+        Only affects debug level output (status updates not due to the user's own commands).
+
+        @param[in] userID  ID of user
+        @param[in] kwList  list of keywords wanted (case blind); None for all
+        @param[in] maxRate  maximum number of status replies per second; None for no limit
+        @throw CommandError if a keyword is unknown or maxRate is not positive
+        """
+        if kwList is not None:
+            unknownKWs = [kw for kw in kwList if kw.lower() not in self.status.kwDict]
+            if unknownKWs:
+                raise CommandError("Unknown keyword(s): %s" % (", ".join(unknownKWs),))
+        if maxRate is not None and maxRate <= 0:
+            raise CommandError("maxRate=%s must be > 0" % (maxRate,))
+        self.kwSubscriptions.subscribe(userID, kwList=kwList, maxRate=maxRate)
+
+    def unsubscribe(self, userID):
+        """Remove a user's subscription; the user then gets all status keyword output
+
+        @param[in] userID  ID of user
+        """
+        self.kwSubscriptions.unsubscribe(userID)
+
     def updateCollimation(self, cmd=None, force=False):
         """
 
@@ -213,8 +346,8 @@ class TCCLCOActor(BaseActor):
             cmd.setState(cmd.Canceled("RA or Dec axis halted, not applying collimation."))
             return
         self.collimateTimer.cancel() # incase one is pending
-        # query for current telescope coords
-        statusCmd = self.tcsDev.getStatus()
+        # make sure telescope coords are recent, only query what is stale
+        statusCmd = self.tcsDev.status.getFresh(CollimationStatusVerbs, CollimationStatusMaxAge)
         # when status returns determine current coords
         def moveMirrorCallback(statusCmd):
             if statusCmd.didFail:
@@ -257,10 +390,15 @@ class TCCLCOActor(BaseActor):
                     # update flex values
                     orient[1:] = newOrient[1:] # keep existing focus
                     self.writeToUsers("i", "collimation update: Focus=%.2f, TiltX=%.2f, TiltY=%.2f, TransX=%.2f, TransY=%.2f"%tuple(orient), cmd=cmd)
-                    self.secDev.move(orient, userCmd=cmd)
+                    # leave focus alone, so a focus change made while the mirror is moving is kept
+                    self.secDev.move([None] + orient[1:], userCmd=cmd)
 
 
-        statusCmd.addCallback(moveMirrorCallback)
+        if statusCmd.isDone:
+            # cached status was fresh enough
+            moveMirrorCallback(statusCmd)
+        else:
+            statusCmd.addCallback(moveMirrorCallback)
 
         # remove timer for now
         if self.collimationModel.doCollimate:
@@ -272,3 +410,25 @@ class TCCLCOActor(BaseActor):
         if not self.collimateTimer.isActive and (self.tcsDev.isTracking or self.tcsDev.isSlewing):
             self.writeToUsers("w", "Text=Collimation is NOT active!!!")
         self.collimateStatusTimer.start(5, self.collimateStatus)
+
+    def preloadCmdFuncs(self):
+        """Import the modules of all commands not yet used, so a bad module is reported early
+        and the first use of a command is not delayed by its import
+        """
+        for callFunc in self.cmdParser.getCallFuncList():
+            if not hasattr(callFunc, "resolve"):
+                continue
+            try:
+                callFunc.resolve()
+            except Exception as e:
+                log.info("%s could not load command function %s: %s" % (self, callFunc, strFromException(e)))
+
+    def refreshLeapSeconds(self):
+        """Refresh the leap second table used for TAI from astropy, and schedule the next refresh
+        """
+        try:
+            if taiClock.refresh():
+                log.info("%s updated leap second table; TAI-UTC is now %s" % (self, taiClock.taiMinusUTC()))
+        except Exception as e:
+            log.info("%s could not refresh leap second table: %s" % (self, strFromException(e)))
+        self.leapSecondTimer.start(LeapSecondRefreshInterval, self.refreshLeapSeconds)
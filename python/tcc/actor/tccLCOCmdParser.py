@@ -3,12 +3,20 @@ from __future__ import division, absolute_import
 """
 from ..parse.cmdParse import CmdParser
 from ..parse import parseDefs
-from ..cmd import setFocus, showFocus, showStatus, \
-                   showVersion, offset, device, ping, sec, target, \
-                   collimate, guiderot, help, guideoffset, lamp, showTime, ff
 
 __all__ = ["TCCLCOCmdParser"]
 
+def _cmdFunc(name):
+    """!Return the callback for a command: function name in module tcc.cmd.name, imported on first use
+    """
+    return parseDefs.LazyCallFunc("tcc.cmd.%s" % (name,), name)
+
+setFocus, showFocus, showStatus, showVersion, offset, device, ping, sec, target, \
+    collimate, guiderot, help, guideoffset, lamp, showTime, ff, subscribe = [_cmdFunc(name) for name in (
+    "setFocus", "showFocus", "showStatus", "showVersion", "offset", "device", "ping", "sec", "target",
+    "collimate", "guiderot", "help", "guideoffset", "lamp", "showTime", "ff", "subscribe",
+)]
+
 TimeLimit = parseDefs.Qualifier("TimeLimit", numValueRange=[1,1], valType=float,
     help = "Specify timeout time for communication with controllers.",
 )
@@ -320,6 +328,26 @@ TCCLCOCmdList = (
     #         )
     #     ],
     # ),
+    parseDefs.Command(
+        name = "subscribe",
+        help = "Limit the status keywords sent to this connection (output due to your own commands is not affected).",
+        callFunc = subscribe,
+        minParAmt = 0,
+        qualifierList = [
+            parseDefs.Qualifier(
+                name = "keywords", numValueRange=[1,None], valType=str,
+                help = "Only send these keywords.",
+            ),
+            parseDefs.Qualifier(
+                name = "maxRate", numValueRange=[1,1], valType=float,
+                help = "Maximum number of status replies per second; the latest value of each keyword is sent.",
+            ),
+            parseDefs.Qualifier(
+                name = "clear",
+                help = "Remove the subscription: send all status keywords.",
+            ),
+        ],
+    ),
     parseDefs.Command(
         name = "ff",
         help = "turn ff lamp on or off.",
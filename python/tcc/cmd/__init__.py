@@ -3,21 +3,8 @@ from __future__ import absolute_import
 
 Mostly subroutines called by the command parser to execute a particular command,
 but includes some high-level functions needed by those subroutines.
+
+The modules are not imported here: the command parser imports each command's module
+the first time that command is dispatched (or when the actor preloads them after startup),
+which keeps startup fast; import the module you need, e.g. tcc.cmd.offset.
 """
-from .target import *
-from .setFocus import *
-from .showFocus import *
-from .offset import *
-from .device import *
-from .sec import *
-from .ff import *
-from .showStatus import *
-from .showVersion import *
-from .collimate import *
-from .aph import *
-from .guiderot import *
-from .help import *
-from .guideoffset import *
-from .lamp import *
-from .showTime import *
-from .ping import *
@@ -1,8 +1,131 @@
 from __future__ import division, absolute_import
+import math
+
 import numpy
 
 __all__ = ["collimate"]
 
+# flexure model: each of tiltX, tiltY, transX, transY is the dot product of a row of FlexCoeffArr
+# with the terms sin(dec+29), cos(dec+29)-1, sin(ha), cos(ha)-1, sin(dec+29)*cos(ha), cos(dec+29)*sin(ha)
+# (see CollimationModel.getOrientation)
+# 07/29/2017 - Povilas discovered a sign error in tip or tilt about X
+# was: tiltX =  29.03*sinDec + 9.86*(cosDec-1.) + -0.46*sinHA + -10.21*(cosHA-1.)
+FlexCoeffArr = numpy.array((
+    (-29.03, -9.86, 0.46, 10.21, 0., 0.), # tiltX (arcsec)
+    (-13.56, -4.28, 4.84, -1.09, 0., 0.), # tiltY (arcsec)
+    (-132.1, 182.3, -589.6, 141.1, 0., 0.), # transX (microns)
+    (679., 407.8, -39.71, -334.7, 833.6, 153.1), # transY (microns)
+))
+_FlexCoeffList = [tuple(row) for row in FlexCoeffArr.tolist()]
+DecZeroPoint = 29. # degrees added to dec in the flexure model
+
+# du Pont pointing envelope covered by CollimationGrid by default (degrees)
+DuPontHALimits = (-90., 90.)
+DuPontDecLimits = (-90., 40.)
+
+def getFlexTermsArr(ha, dec):
+    """Return flexure model terms for arrays of ha and dec (deg)
+
+    @return array of shape ha.shape + (4,): tiltX, tiltY (arcsec), transX, transY (microns)
+    """
+    haRad = numpy.radians(numpy.asarray(ha, dtype=float))
+    decRad = numpy.radians(numpy.asarray(dec, dtype=float) + DecZeroPoint)
+    sinDec = numpy.sin(decRad)
+    cosDec = numpy.cos(decRad)
+    sinHA = numpy.sin(haRad)
+    cosHA = numpy.cos(haRad)
+    termsArr = numpy.stack(numpy.broadcast_arrays(
+        sinDec, cosDec - 1., sinHA, cosHA - 1., sinDec * cosHA, cosDec * sinHA), axis=-1)
+    return termsArr.dot(FlexCoeffArr.T)
+
+def getFlexTerms(ha, dec):
+    """Return flexure model terms for scalar ha and dec (deg), using the math module (faster than numpy for scalars)
+
+    @return tiltX, tiltY (arcsec), transX, transY (microns) as a list
+    """
+    haRad = math.radians(ha)
+    decRad = math.radians(dec + DecZeroPoint)
+    sinDec = math.sin(decRad)
+    cosDec = math.cos(decRad)
+    sinHA = math.sin(haRad)
+    cosHA = math.cos(haRad)
+    term0, term1, term2, term3, term4, term5 = sinDec, cosDec - 1., sinHA, cosHA - 1., sinDec * cosHA, cosDec * sinHA
+    return [c0 * term0 + c1 * term1 + c2 * term2 + c3 * term3 + c4 * term4 + c5 * term5
+        for c0, c1, c2, c3, c4, c5 in _FlexCoeffList]
+
+
+class CollimationGrid(object):
+    def __init__(self, haLimits=DuPontHALimits, decLimits=DuPontDecLimits, step=1.):
+        """Flexure model terms precomputed on a regular grid of ha, dec, for bilinear interpolation
+
+        @param[in] haLimits  minimum, maximum ha covered (deg)
+        @param[in] decLimits  minimum, maximum dec covered (deg)
+        @param[in] step  approximate grid spacing (deg); the limits are always grid points
+        """
+        self.haLimits = tuple(float(val) for val in haLimits)
+        self.decLimits = tuple(float(val) for val in decLimits)
+        self.numHA = max(2, int(math.ceil((self.haLimits[1] - self.haLimits[0]) / step)) + 1)
+        self.numDec = max(2, int(math.ceil((self.decLimits[1] - self.decLimits[0]) / step)) + 1)
+        self.haStep = (self.haLimits[1] - self.haLimits[0]) / (self.numHA - 1)
+        self.decStep = (self.decLimits[1] - self.decLimits[0]) / (self.numDec - 1)
+        haArr, decArr = numpy.meshgrid(
+            numpy.linspace(self.haLimits[0], self.haLimits[1], self.numHA),
+            numpy.linspace(self.decLimits[0], self.decLimits[1], self.numDec),
+            indexing="ij",
+        )
+        # flexure terms at each grid point, shape (numHA, numDec, 4)
+        self.flexArr = getFlexTermsArr(haArr, decArr)
+        # the same as nested lists, which are faster to index for scalar lookups
+        self._flexList = self.flexArr.tolist()
+
+    def contains(self, ha, dec):
+        """Return True if scalar ha, dec (deg) is within the grid
+        """
+        return self.haLimits[0] <= ha <= self.haLimits[1] and self.decLimits[0] <= dec <= self.decLimits[1]
+
+    def getFlexTerms(self, ha, dec):
+        """Return interpolated flexure terms for scalar ha, dec (deg); see getFlexTerms
+
+        @raise ValueError if ha, dec is not within the grid
+        """
+        if not self.contains(ha, dec):
+            raise ValueError("ha=%s, dec=%s not within grid" % (ha, dec))
+        haPos = (ha - self.haLimits[0]) / self.haStep
+        decPos = (dec - self.decLimits[0]) / self.decStep
+        haInd = min(int(haPos), self.numHA - 2)
+        decInd = min(int(decPos), self.numDec - 2)
+        haFrac = haPos - haInd
+        decFrac = decPos - decInd
+        weight00 = (1. - haFrac) * (1. - decFrac)
+        weight01 = (1. - haFrac) * decFrac
+        weight10 = haFrac * (1. - decFrac)
+        weight11 = haFrac * decFrac
+        haRow0 = self._flexList[haInd]
+        haRow1 = self._flexList[haInd + 1]
+        return [weight00 * f00 + weight01 * f01 + weight10 * f10 + weight11 * f11
+            for f00, f01, f10, f11 in zip(haRow0[decInd], haRow0[decInd + 1], haRow1[decInd], haRow1[decInd + 1])]
+
+    def getFlexTermsArr(self, ha, dec):
+        """Return interpolated flexure terms for arrays of ha, dec (deg); see getFlexTermsArr
+
+        Points outside the grid are computed from the model.
+        """
+        ha, dec = numpy.broadcast_arrays(numpy.asarray(ha, dtype=float), numpy.asarray(dec, dtype=float))
+        haPos = (ha - self.haLimits[0]) / self.haStep
+        decPos = (dec - self.decLimits[0]) / self.decStep
+        inGrid = (haPos >= 0) & (haPos <= self.numHA - 1) & (decPos >= 0) & (decPos <= self.numDec - 1)
+        haInd = numpy.clip(numpy.floor(haPos).astype(int), 0, self.numHA - 2)
+        decInd = numpy.clip(numpy.floor(decPos).astype(int), 0, self.numDec - 2)
+        haFrac = (haPos - haInd)[..., numpy.newaxis]
+        decFrac = (decPos - decInd)[..., numpy.newaxis]
+        flexArr = self.flexArr
+        result = (1. - haFrac) * ((1. - decFrac) * flexArr[haInd, decInd] + decFrac * flexArr[haInd, decInd + 1]) \
+            + haFrac * ((1. - decFrac) * flexArr[haInd + 1, decInd] + decFrac * flexArr[haInd + 1, decInd + 1])
+        if not numpy.all(inGrid):
+            outside = ~inGrid
+            result[outside] = getFlexTermsArr(ha[outside], dec[outside])
+        return result
+
 
 class CollimationModel(object):
     def __init__(self):
@@ -76,6 +199,7 @@ class CollimationModel(object):
         self.baseOrientation = numpy.asarray([tiltX, tiltY, transX, transY])
         self.baseFocus = None
         self.baseTrussTemp = None
+        self.grid = None # a CollimationGrid, if useGrid has been called
 
     def getFocus(self, trussTemp):
         """Return the desired focus value from trussTemp
@@ -97,6 +221,20 @@ class CollimationModel(object):
         self.baseFocus = focusVal
         self.baseTrussTemp = trussTemp
 
+    def useGrid(self, step=1., haLimits=DuPontHALimits, decLimits=DuPontDecLimits):
+        """Look up the flexure model in a precomputed grid (see CollimationGrid), rather than evaluating it
+
+        Points outside the grid are still evaluated.
+
+        @param[in] step  grid spacing (deg); if None stop using a grid
+        @param[in] haLimits  minimum, maximum ha covered (deg)
+        @param[in] decLimits  minimum, maximum dec covered (deg)
+        """
+        if step is None:
+            self.grid = None
+        else:
+            self.grid = CollimationGrid(haLimits=haLimits, decLimits=decLimits, step=step)
+
 
     def getOrientation(self, ha, dec, temp=None):
         """Return the desired M2
@@ -139,37 +277,29 @@ class CollimationModel(object):
 
         rms                  58          63          4            3.
 
+        The model coefficients are in FlexCoeffArr. If useGrid has been called
+        the model is interpolated from the grid (when ha, dec is within it).
         """
-        haRad = numpy.radians(ha)
-        decRad = numpy.radians(dec+29)
-
-        sinDec = numpy.sin(decRad)
-        cosDec = numpy.cos(decRad)
-        sinHA = numpy.sin(haRad)
-        cosHA = numpy.cos(haRad)
-        sinDecCosHA = numpy.sin(decRad)*numpy.cos(haRad)
-        cosDecSinHA = numpy.cos(decRad)*numpy.sin(haRad)
-
-        # old, Povilas updated such that zero points are easier?
-        # transY = -272.9 + 679*sinDec + 407.8*cosDec + -39.71*sinHA + -334.7*cosHA + 833.6*sinDecCosHA + 153.1*cosDecSinHA
-
-        # # transY = -2.141 + 1413*sinDec + 386.7*cosDec + -49.3*sinHA + -487.1*cosHA
-        # transX = -300.8 + -132.1*sinDec + 182.3*cosDec + -589.6*sinHA + 141.1*cosHA
-        # tiltX = 1.14 + 29.03*sinDec + 9.86*cosDec + -0.46*sinHA + -10.21*cosHA
-        # tiltY = 6.45 + -13.56*sinDec + -4.28*cosDec + 4.84*sinHA + -1.09*cosHA
+        if self.grid is not None and self.grid.contains(ha, dec):
+            flexTerms = self.grid.getFlexTerms(ha, dec)
+        else:
+            flexTerms = getFlexTerms(ha, dec)
+        focus = None if temp is None else self.getFocus(temp)
+        # multiply by -1 (orentation to move to to remove the flex)
+        return [focus] + [base - flex for base, flex in zip(self.baseOrientation.tolist(), flexTerms)]
 
-        # 07/29/2017 - Povilas discovered a sign error in tip or tilt about X
-        # was: tiltX =  29.03*sinDec + 9.86*(cosDec-1.) + -0.46*sinHA + -10.21*(cosHA-1.)
+    def getOrientationArr(self, ha, dec):
+        """Return the desired M2 collimation tiltx, tilty, transx, transy for arrays of ha(deg), dec(deg)
 
-        transY = 679*sinDec + 407.8*(cosDec-1.) + -39.71*sinHA + -334.7*(cosHA-1) + 833.6*sinDecCosHA + 153.1*cosDecSinHA
-        transX = -132.1*sinDec + 182.3*(cosDec-1.) + -589.6*sinHA + 141.1*(cosHA-1.)
-        tiltX =  -1*(29.03*sinDec + 9.86*(cosDec-1.) + -0.46*sinHA + -10.21*(cosHA-1.))
-        tiltY = -13.56*sinDec + -4.28*(cosDec-1) + 4.84*sinHA + -1.09*(cosHA-1.)
+        Uses the grid if useGrid has been called, else evaluates the model.
 
-        flexTerms = self.baseOrientation - numpy.asarray([tiltX, tiltY, transX, transY])
-        focus = None if temp is None else self.getFocus(temp)
-        # multiply by -1 (orentation to move to to remove the flex)
-        return [focus] + list(flexTerms)
+        @return an array of shape ha.shape + (4,): tiltx, tilty (arcsec), transx, transy (microns)
+        """
+        if self.grid is not None:
+            flexArr = self.grid.getFlexTermsArr(ha, dec)
+        else:
+            flexArr = getFlexTermsArr(ha, dec)
+        return self.baseOrientation - flexArr
 
 
 def collimate(tccActor, userCmd):
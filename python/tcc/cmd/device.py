@@ -37,5 +37,10 @@ def device(tccActor, userCmd):
     for devName in devNameList:
         dev = devDict[devName]
         devCmds.append(getattr(dev, devAttr)())
+        if cmdVerb == "status":
+            # report how long commands waited in the device queue, per priority class
+            waitStatsStr = dev.devCmdQueue.getWaitStatsStr()
+            if waitStatsStr:
+                userCmd.writeToUsers("i", 'text="%s queue wait (sec): %s"'%(devName, waitStatsStr))
     userCmd.linkCommands(devCmds)
     return True
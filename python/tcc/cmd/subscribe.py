@@ -0,0 +1,19 @@
+from __future__ import division, absolute_import
+
+__all__ = ["subscribe"]
+
+def subscribe(tccActor, userCmd):
+    """Implement the subscribe command: limit the status keywords sent to the user's connection
+
+    @param[in,out] tccActor  tcc actor
+    @param[in,out] userCmd  subscribe command
+    """
+    qualDict = userCmd.parsedCmd.qualDict
+    if qualDict["clear"].boolValue:
+        tccActor.unsubscribe(userCmd.userID)
+        userCmd.setState(userCmd.Done)
+        return
+    kwList = qualDict["keywords"].valueList if qualDict["keywords"].boolValue else None
+    maxRate = qualDict["maxrate"].valueList[0] if qualDict["maxrate"].boolValue else None
+    tccActor.subscribe(userCmd.userID, kwList=kwList, maxRate=maxRate)
+    userCmd.setState(userCmd.Done)
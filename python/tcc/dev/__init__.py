@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+from .devCmdQueue import *
 from .fakeLCODevs import *
 from .tcsDevice import *
 from .tcsDeviceWrapper import *
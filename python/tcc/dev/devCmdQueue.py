@@ -0,0 +1,157 @@
+from __future__ import division, absolute_import
+"""A device command queue that runs one command at a time in priority order
+"""
+import collections
+import time
+
+from twistedActor import DevCmd
+
+__all__ = ["DevCmdQueue", "PriorityAbort", "PriorityMotion", "PriorityCommand", "PriorityStatus"]
+
+# priority classes, higher runs first
+PriorityAbort = 30
+PriorityMotion = 20
+PriorityCommand = 10
+PriorityStatus = 0
+
+PriorityNameDict = collections.OrderedDict((
+    (PriorityAbort, "abort"),
+    (PriorityMotion, "motion"),
+    (PriorityCommand, "command"),
+    (PriorityStatus, "status"),
+))
+
+
+class QueuedCmd(object):
+    def __init__(self, cmd, runFunc, priority):
+        """A device command waiting in (or running from) a DevCmdQueue
+
+        @param[in] cmd  a twistedActor DevCmd
+        @param[in] runFunc  function to call (with cmd as the only argument) to start cmd
+        @param[in] priority  priority class of cmd
+        """
+        self.cmd = cmd
+        self.runFunc = runFunc
+        self.priority = priority
+        self.queueTime = time.time()
+
+
+class WaitStats(object):
+    def __init__(self):
+        """Queue wait time statistics for one priority class
+        """
+        self.num = 0
+        self.totalWait = 0.
+        self.maxWait = 0.
+        self.lastWait = 0.
+
+    def add(self, waitTime):
+        self.num += 1
+        self.totalWait += waitTime
+        self.maxWait = max(self.maxWait, waitTime)
+        self.lastWait = waitTime
+
+    @property
+    def meanWait(self):
+        return self.totalWait / self.num if self.num else 0.
+
+    def __str__(self):
+        return "n=%i mean=%.3f max=%.3f last=%.3f"%(self.num, self.meanWait, self.maxWait, self.lastWait)
+
+
+class DevCmdQueue(object):
+    """!Run device commands one at a time, highest priority first (FIFO within a priority)
+
+    A queued status command is superseded by a newer one requesting the same (or more) status:
+    the older command is removed from the queue and finishes when the newer one does.
+    """
+    def __init__(self, priorityFunc, statusVerbsFunc=None):
+        """!Construct a DevCmdQueue
+
+        @param[in] priorityFunc  callable that takes a DevCmd and returns its priority class
+        @param[in] statusVerbsFunc  callable that takes a DevCmd and returns the collection of
+            status verbs it requests, or None if it is not a pure status request;
+            if None, no command is ever superseded
+        """
+        self.priorityFunc = priorityFunc
+        self.statusVerbsFunc = statusVerbsFunc
+        self.queueList = []
+        idleCmd = DevCmd(cmdStr="")
+        idleCmd.setState(idleCmd.Done)
+        self.currExeCmd = QueuedCmd(idleCmd, None, PriorityStatus)
+        self.waitStatsDict = collections.OrderedDict((priority, WaitStats()) for priority in PriorityNameDict)
+
+    def addCmd(self, cmd, runFunc):
+        """!Add a command to the queue, run it now if the queue is idle
+
+        @param[in] cmd  a twistedActor DevCmd
+        @param[in] runFunc  function to call (with cmd as the only argument) to start cmd
+        """
+        queuedCmd = QueuedCmd(cmd, runFunc, self.priorityFunc(cmd))
+        self._supersede(queuedCmd)
+        self.queueList.append(queuedCmd)
+        self.runQueue()
+
+    def _supersede(self, newQueuedCmd):
+        """Remove queued status commands that newQueuedCmd makes redundant
+        """
+        if self.statusVerbsFunc is None:
+            return
+        newVerbs = self.statusVerbsFunc(newQueuedCmd.cmd)
+        if not newVerbs:
+            return
+        newVerbs = set(newVerbs)
+        keepList = []
+        for queuedCmd in self.queueList:
+            oldVerbs = self.statusVerbsFunc(queuedCmd.cmd)
+            if oldVerbs and newVerbs.issuperset(oldVerbs) and not queuedCmd.cmd.isDone:
+                newQueuedCmd.cmd.addCallback(_FollowCmd(queuedCmd.cmd))
+            else:
+                keepList.append(queuedCmd)
+        self.queueList = keepList
+
+    def runQueue(self):
+        """!Start the next command if nothing is running
+        """
+        while self.currExeCmd.cmd.isDone and self.queueList:
+            # stable: the first queued command of the highest priority wins
+            nextCmd = max(self.queueList, key=lambda queuedCmd: queuedCmd.priority)
+            self.queueList.remove(nextCmd)
+            if nextCmd.cmd.isDone:
+                # cancelled or timed out while waiting
+                continue
+            self.waitStatsDict[nextCmd.priority].add(time.time() - nextCmd.queueTime)
+            self.currExeCmd = nextCmd
+            nextCmd.cmd.addCallback(self._cmdCallback)
+            nextCmd.runFunc(nextCmd.cmd)
+
+    def _cmdCallback(self, cmd):
+        if cmd.isDone and cmd is self.currExeCmd.cmd:
+            self.runQueue()
+
+    def getWaitStatsStr(self):
+        """!Return a summary of queue wait time per priority class
+        """
+        return "; ".join("%s: %s"%(PriorityNameDict[priority], waitStats)
+            for priority, waitStats in self.waitStatsDict.iteritems() if waitStats.num)
+
+    def __repr__(self):
+        return "%s(currExeCmd=%r, queue=%r)"%(type(self).__name__, self.currExeCmd.cmd.cmdStr,
+            [queuedCmd.cmd.cmdStr for queuedCmd in self.queueList])
+
+
+class _FollowCmd(object):
+    def __init__(self, followerCmd):
+        """Callback that finishes followerCmd when the command it is attached to finishes
+
+        @param[in] followerCmd  a superseded DevCmd
+        """
+        self.followerCmd = followerCmd
+
+    def __call__(self, cmd):
+        if not cmd.isDone or self.followerCmd.isDone:
+            return
+        if cmd.didFail:
+            self.followerCmd.setState(self.followerCmd.Failed, cmd.textMsg)
+        else:
+            self.followerCmd.setState(self.followerCmd.Done)
@@ -43,10 +43,15 @@ class FakeDev(TCPServer):
         )
 
     def sockReadCallback(self, sock):
-        cmdStr = sock.readLine()
-        if self.doEcho:
-            sock.writeLine(cmdStr)
-        self.parseCmdStr(cmdStr)
+        # clients may pipeline several lines before reading replies,
+        # so handle every complete line that is buffered
+        while True:
+            cmdStr = sock.readLine(default=None)
+            if cmdStr is None:
+                return
+            if self.doEcho:
+                sock.writeLine(cmdStr)
+            self.parseCmdStr(cmdStr)
 
     def parseCmdStr(self, cmdStr):
         raise NotImplementedError
@@ -263,11 +268,13 @@ class FakeTCS(FakeDev):
     Tracking = 2
     Slewing = 3
     Stop = 4
-    def __init__(self, name, port):
+    def __init__(self, name, port, statusPort=None):
         """!Construct a fake LCO TCS
 
         @param[in] name  name of TCS controller
         @param[in] port  port on which to command TCS
+        @param[in] statusPort  if not None, also serve a second (status) port;
+            0 to assign a free port
         """
         self.rstop = 0
         self.ractive = 0
@@ -296,15 +303,25 @@ class FakeTCS(FakeDev):
         self.offDec = 0.
         self.offRA = 0.
         self.epoch = 2000
+        self.rejectCmdVerbs = set() # command verbs to reply to with an error (-1)
         self.telState = self.Idle
         self.focusTimer = Timer()
         self.slewTimer = Timer()
         self.rotTimer = Timer()
+        self.userSock = None # created upon connection
 
         FakeDev.__init__(self,
             name = name,
             port = port,
         )
+        if statusPort is None:
+            self.statusServer = None
+        else:
+            self.statusServer = FakeTCSStatusServer(
+                name = "%sStatus"%(name,),
+                port = statusPort,
+                fakeTCS = self,
+            )
 
     @property
     def rerr(self):
@@ -326,6 +343,8 @@ class FakeTCS(FakeDev):
         """
         try:
             tokens = cmdStr.strip().split(" ")
+            if tokens[0] in self.rejectCmdVerbs:
+                raise RuntimeError("Rejecting command: %s"%cmdStr)
 
             # status requests
             if tokens[0] == "RA" and len(tokens) == 1:
@@ -518,6 +537,39 @@ class FakeTCS(FakeDev):
             # self.readyDeferred.errback(failure.Failure(RuntimeError(errMsg)))
 
 
+class FakeTCSStatusServer(FakeDev):
+    """!A second port on a FakeTCS, replies are written to the status socket
+    """
+    def __init__(self, name, port, fakeTCS):
+        """!Construct a fake TCS status port
+
+        @param[in] name  name of status server
+        @param[in] port  port on which to query status
+        @param[in] fakeTCS  the FakeTCS that parses the requests
+        """
+        self.fakeTCS = fakeTCS
+        self.userSock = None # created upon connection
+        FakeDev.__init__(self,
+            name = name,
+            port = port,
+        )
+
+    def parseCmdStr(self, cmdStr):
+        # let the tcs parse the command, but reply on this socket
+        cmdSock = self.fakeTCS.userSock
+        self.fakeTCS.userSock = self.userSock
+        try:
+            self.fakeTCS.parseCmdStr(cmdStr)
+        finally:
+            self.fakeTCS.userSock = cmdSock
+
+    def stateCallback(self, server=None):
+        if self.isReady:
+            print("Fake TCS status port %s running on port %s" % (self.name, self.port))
+        elif self.didFail:
+            print("Fake TCS status port %s failed to start on port %s" % (self.name, self.port))
+
+
 class FakeM2Ctrl(FakeDev):
     """!A server that emulates the LCO M2 Controller
     """
@@ -1,13 +1,19 @@
 from __future__ import division, absolute_import
 
+import collections
+import re
+import time
+
 import numpy
 
 from RO.Comm.TwistedTimer import Timer
 from RO.StringUtil import strFromException
 
-from twistedActor import TCPDevice, DevCmd, CommandQueue, log, expandCommand
+from twistedActor import TCPDevice, DevCmd, log, expandCommand
 from twisted.internet.task import LoopingCall
 
+from .devCmdQueue import DevCmdQueue, PriorityAbort, PriorityMotion, PriorityCommand, PriorityStatus
+
 __all__ = ["M2Device"]
 
 #TODO: fix move timeout, timeout should be set on device
@@ -15,9 +21,14 @@ __all__ = ["M2Device"]
 
 PollTime = 0.5 # polling frequency during a move, seconds, LCO says status is updated no more frequently that 5 times a second
 StatusCheckTime = 5 # query for status frequency automatically
+GalilBootTime = 2 # seconds, the galil takes roughly this long to boot before a move starts
+MoveBurstWindow = 1.0 # seconds, poll densely from this long before to this long after the predicted end of a move
+MoveBurstPollTime = 0.2 # seconds between polls during the burst (the M2 status is updated at most 5 times a second)
+MoveMaxPollTime = StatusCheckTime # seconds, longest wait between polls while moving, in case the prediction is too long
 # PollTime = 1
 # Speed = 25.0 # microns per second for focus
 DefaultTimeout = 2 # seconds
+BatchTimeout = 2 # seconds per command, time limit for a pipelined batch of commands
 RelayPosM2 = 5 # our FF lamp is wired to the 5th relay on the du Pont M2
 
 Done = "Done"
@@ -29,20 +40,80 @@ Off = "off"
 validMotionStates = [Done, Moving, Failed]
 validStates = [On, Off]
 
+# queue priority by command verb, stop jumps ahead of everything else
+StatusVerbs = frozenset(["status", "status2", "speed"])
+PriorityDict = {
+    "stop": PriorityAbort,
+    "move": PriorityMotion,
+    "offset": PriorityMotion,
+    "galil": PriorityMotion,
+}
+PriorityDict.update((verb, PriorityStatus) for verb in StatusVerbs)
+
+
+# change mask bits of Status fields
+StateBit = 1 << 0
+OrientationBit = 1 << 1
+DesOrientationBit = 1 << 2
+LampsBit = 1 << 3
+GalilBit = 1 << 4
+SpeedBit = 1 << 5
+MoveTimeBit = 1 << 6
+
+# TCC keyword: (Status method that formats it, change mask of the fields it is derived from)
+StatusKWFormatDict = collections.OrderedDict((
+    ("secState", ("secStateStr", StateBit | OrientationBit | DesOrientationBit | SpeedBit | MoveTimeBit)),
+    ("secFocus", ("secFocusStr", OrientationBit)),
+    ("Galil", ("galilStr", GalilBit)),
+    ("secOrient", ("secOrientStr", OrientationBit)),
+    ("secDesOrient", ("secDesOrientStr", DesOrientationBit)),
+    ("ffPower", ("ffPowerStr", LampsBit)),
+))
+
+# the status reply, e.g. State=DONE Ori=12500.0,-0.0,-0.0,-0.0,0.0 Lamps=off Galil=off
+StatusReplyRE = re.compile(r"\s*state=(\S+)\s+ori=(\S+)\s+lamps=(\S+)\s+galil=(\S+)\s*$", re.IGNORECASE)
+
+def _changedProperty(attrName, changeBit, doc):
+    """Return a property for slot attrName that sets changeBit in changeMask when the value changes
+    """
+    def getter(self):
+        return getattr(self, attrName)
+    def setter(self, value):
+        if value != getattr(self, attrName):
+            self.changeMask |= changeBit
+        setattr(self, attrName, value)
+    return property(getter, setter, doc=doc)
+
 
 class Status(object):
+    __slots__ = ("_speed", "_state", "_orientation", "_desOrientation", "_lamps", "_galil", "_moveTimeTotal",
+        "changeMask", "_kwCache")
+
     def __init__(self):
         """Container for holding current status of the m2
 
         this is the status string State=DONE Ori=12500.0,-0.0,-0.0,-0.0,0.0 Lamps=off Galil=off
+
+        Setting a field (other than by modifying a list in place) sets its bit in changeMask;
+        getStatusDict only reformats keywords derived from fields that changed, then clears changeMask.
         """
-        self.speed = None
-        self.state = None
-        self.orientation = [None]*5
-        self.desOrientation = [None]*5
-        self.lamps = None
-        self.galil = None
+        self._speed = None
+        self._state = None
+        self._orientation = [None]*5
+        self._desOrientation = [None]*5
+        self._lamps = None
+        self._galil = None
         self._moveTimeTotal = 0.
+        self.changeMask = 0
+        self._kwCache = {} # TCC keyword: formatted value
+
+    speed = _changedProperty("_speed", SpeedBit, "speed (microns/sec)")
+    state = _changedProperty("_state", StateBit, "motion state: one of validMotionStates, or None if unknown")
+    orientation = _changedProperty("_orientation", OrientationBit,
+        "orientation: piston (um), tilt x, tilt y (arcsec), trans x, trans y (um)")
+    desOrientation = _changedProperty("_desOrientation", DesOrientationBit, "desired orientation")
+    lamps = _changedProperty("_lamps", LampsBit, "ff lamp state: on or off")
+    galil = _changedProperty("_galil", GalilBit, "galil power state: on or off")
 
     @property
     def moveTimeRemaining(self):
@@ -62,6 +133,12 @@ class Status(object):
         else:
             return self._moveTimeTotal
 
+    @moveTimeTotal.setter
+    def moveTimeTotal(self, value):
+        if value != self._moveTimeTotal:
+            self.changeMask |= MoveTimeBit
+        self._moveTimeTotal = value
+
     @property
     def desFocus(self):
         return self.desOrientation[0]
@@ -116,50 +193,136 @@ class Status(object):
             )
 
     def getStatusDict(self):
-        """Grab and format tcc keywords, only output those which have changed
+        """Grab and format tcc keywords
+
+        A keyword is only reformatted if a field it is derived from has changed
+        since the last call (see StatusKWFormatDict).
         """
-        statusDict = {
-            "secState": self.secStateStr(),
-            "secFocus": self.secFocusStr(),
-            "Galil": self.galilStr(),
-            "secOrient": self.secOrientStr(),
-            "secDesOrient": self.secDesOrientStr(),
-            "ffPower": self.ffPowerStr(),
+        changeMask = self.changeMask
+        for kw, (funcName, kwMask) in StatusKWFormatDict.iteritems():
+            if changeMask & kwMask or kw not in self._kwCache:
+                self._kwCache[kw] = getattr(self, funcName)()
+        self.changeMask = 0
+        return dict(self._kwCache)
+
+    def getSharedStateDict(self):
+        """Return a dict of shared state field: value (see tcc.utils.sharedState); None if unknown
+        """
+        sharedStateDict = {
+            "secMoving": None if self.state is None else self.state == Moving,
+            "secTime": time.time(),
         }
-        return statusDict
+        for prefix, orientation in (("sec", self.orientation), ("secDes", self.desOrientation)):
+            for name, value in zip(("Focus", "TipX", "TipY", "TransX", "TransY"), orientation):
+                sharedStateDict[prefix + name] = value
+        return sharedStateDict
 
     def parseStatus(self, replyStr):
         """Parse replyString (as returned from the M2 tcp/ip server) and set values
 
-        this is the status string State=DONE Ori=12500.0, -0.0, -0.0, -0.0, 0.0 Lamps=off Galil=off
+        this is the status string State=DONE Ori=12500.0,-0.0,-0.0,-0.0,0.0 Lamps=off Galil=off
+        Replies with the fields in another order, or only some of them, are parsed more slowly.
         """
-        # lowerify everything
-        replyStr = replyStr.lower()
+        match = StatusReplyRE.match(replyStr)
+        if match:
+            stateStr, oriStr, lampsStr, galilStr = match.groups()
+            self._setState(stateStr)
+            self._setOrientation(oriStr)
+            self._setLamps(lampsStr)
+            self._setGalil(galilStr)
+            return
         for statusBit in replyStr.split():
             key, val = statusBit.split("=")
-            if key == "state":
-                if val == "error":
-                    val = "Failed" # failed fits with teh secState keyword, Error doesn't
-                else:
-                    val = val.title()
-                assert val in validMotionStates, "%s, %s"%(val, str(validMotionStates))
-            elif key == "ori":
-                key = "orientation"
-                val = [float(x) for x in val.split(",")]
-                assert len(val) == 5
-            elif key == "galil":
-                assert val in validStates
-            elif key == "lamps":
-                if val != "off":
-                    val = "on"
-            # set the status values as attrs on this
-            # object
-            assert key in dir(self)
-            setattr(self, key, val)
+            key = key.lower()
+            assert key in StatusParseDict, "unknown status field %r" % (key,)
+            getattr(self, StatusParseDict[key])(val)
+
+    def _setState(self, val):
+        val = val.lower()
+        if val == "error":
+            val = "Failed" # failed fits with teh secState keyword, Error doesn't
+        else:
+            val = val.title()
+        assert val in validMotionStates, "%s, %s"%(val, str(validMotionStates))
+        self.state = val
+
+    def _setOrientation(self, val):
+        val = [float(x) for x in val.split(",")]
+        assert len(val) == 5
+        self.orientation = val
+
+    def _setLamps(self, val):
+        self.lamps = "off" if val.lower() == "off" else "on"
+
+    def _setGalil(self, val):
+        val = val.lower()
+        assert val in validStates
+        self.galil = val
+
+# status reply field (lowercase): Status method that parses and sets it
+StatusParseDict = {
+    "state": "_setState",
+    "ori": "_setOrientation",
+    "lamps": "_setLamps",
+    "galil": "_setGalil",
+}
+
+class MoveRequest(object):
+    def __init__(self, userCmd, valueList, offset):
+        """A requested mirror move (see M2Device.move)
+
+        @param[in] userCmd: user command to finish when the move is done
+        @param[in] valueList: list of 1 to 5 values, None for an axis that should not be moved
+        @param[in] offset: if true this is an offset, else absolute
+        """
+        self.userCmd = userCmd
+        self.valueList = list(valueList)
+        self.offset = bool(offset)
+
+def mergeMoves(moveRequestList, orientation):
+    """Merge move requests, in the order received, into one move
+
+    An absolute value replaces any earlier value or offset for that axis; offsets add.
+    If all requests are offsets the result is one offset, else one absolute move
+    (from the current orientation for axes that are only offset).
+    The result covers the axes up to the last one that any request moves.
+
+    @param[in] moveRequestList: list of MoveRequest
+    @param[in] orientation: current orientation (a list of 5 values)
+    @return three items:
+    - cmdType: "offset" or "move"
+    - valueList: values for the command
+    - desOrientation: desired orientation after the move (a list of 5 values)
+    """
+    absValues = [None]*5
+    offsets = [0.]*5
+    numAxes = 0
+    for moveRequest in moveRequestList:
+        for ii, value in enumerate(moveRequest.valueList):
+            if value is None:
+                continue
+            numAxes = max(numAxes, ii + 1)
+            if moveRequest.offset:
+                offsets[ii] += value
+            else:
+                absValues[ii] = value
+                offsets[ii] = 0.
+    desOrientation = list(orientation)
+    if all(value is None for value in absValues):
+        valueList = offsets[0:numAxes]
+        for ii, value in enumerate(valueList):
+            desOrientation[ii] += value
+        return "offset", valueList, desOrientation
+    for ii in range(numAxes):
+        if absValues[ii] is not None:
+            desOrientation[ii] = absValues[ii]
+        desOrientation[ii] += offsets[ii]
+    return "move", desOrientation[0:numAxes], desOrientation
+
 
 class M2Device(TCPDevice):
     """!A Device for communicating with the M2 process."""
-    def __init__(self, name, host, port, callFunc=None):
+    def __init__(self, name, host, port, callFunc=None, pipelineCmds=False):
         """!Construct a LCODevice
 
         Inputs:
@@ -169,22 +332,21 @@ class M2Device(TCPDevice):
         @param[in] callFunc  function to call when state of device changes;
                 note that it is NOT called when the connection state changes;
                 register a callback with "conn" for that task.
+        @param[in] pipelineCmds  if True write a sequence of commands (e.g. for stop) at once,
+                rather than waiting for the reply to each before writing the next
         """
         self.tccStatus = None # set by lcoTCCActor
+        self.sharedState = None # tcc.utils.sharedState.SharedStateWriter; set by lcoTCCActor
+        self.pipelineCmds = bool(pipelineCmds)
+        self._pipelineOK = True # cleared after a pipelined batch fails, reset by init
         self.status = Status()
         self._statusTimer = Timer()
+        self._statusDevCmd = None # in-flight status query, callers join it rather than re-query
         self.waitMoveCmd = expandCommand()
         self.waitMoveCmd.setState(self.waitMoveCmd.Done)
-        priorityDict = {
-            "status": 1,
-            "speed": 1,
-            "stop": 1,
-            "move": 1,
-            "galil": 1,
-            "offset": 1,
-        }
-
-        self.devCmdQueue = CommandQueue(priorityDict) # all commands of equal priority
+        self.moveEndTime = None # predicted time.time() at which the current move ends; None if unknown
+        self.moveRequestList = [] # MoveRequests received while the mirror is moving
+        self.devCmdQueue = DevCmdQueue(self.getCmdPriority, self.getStatusVerbs)
 
         TCPDevice.__init__(self,
             name = name,
@@ -198,6 +360,28 @@ class M2Device(TCPDevice):
         loop = LoopingCall(self.continuousStatusLoop)
         loop.start(StatusCheckTime)
 
+    def getCmdPriority(self, devCmd):
+        """Return the DevCmdQueue priority class for a device command
+        """
+        return PriorityDict.get(devCmd.cmdVerb.lower(), PriorityCommand)
+
+    def getStatusVerbs(self, devCmd):
+        """Return the status verbs requested by a device command, or None if it is not a status request
+        """
+        if hasattr(devCmd, "batchCmds"):
+            cmdVerbs = [batchCmd.cmdStr.lower() for batchCmd in devCmd.batchCmds]
+            return cmdVerbs if StatusVerbs.issuperset(cmdVerbs) else None
+        cmdStr = devCmd.cmdStr.lower()
+        if cmdStr in StatusVerbs:
+            return [cmdStr]
+        return None
+
+    @property
+    def usePipeline(self):
+        """True if command sequences should be written as a pipelined batch
+        """
+        return self.pipelineCmds and self._pipelineOK
+
     @property
     def isBusy(self):
         return self.status.state == Moving
@@ -242,10 +426,27 @@ class M2Device(TCPDevice):
         statusCmd = DevCmd("status")
         devCmds = [speedCmd, statusCmd]
         userCmd.linkCommands(devCmds)
-        for cmd in devCmds:
-            self.queueDevCmd(cmd)
+        # give pipelined commands another chance after a reconnect/init
+        self._pipelineOK = True
+        self.queueDevCmdList(devCmds)
         return userCmd
 
+    def movePollTime(self):
+        """Return seconds until the next status poll while the mirror is moving
+
+        Sleep until MoveBurstWindow before the predicted end of the move (at most MoveMaxPollTime),
+        then poll every MoveBurstPollTime until MoveBurstWindow after it;
+        if there is no prediction or the move has outlasted it, poll every PollTime.
+        """
+        if self.moveEndTime is None:
+            return PollTime
+        timeToEnd = self.moveEndTime - time.time()
+        if timeToEnd > MoveBurstWindow:
+            return min(timeToEnd - MoveBurstWindow, MoveMaxPollTime)
+        if timeToEnd > -MoveBurstWindow:
+            return MoveBurstPollTime
+        return PollTime
+
     def continuousStatusLoop(self):
         if self._statusTimer.isActive:
             return  # do nothing, status already running
@@ -255,6 +456,8 @@ class M2Device(TCPDevice):
 
     def getStatus(self, userCmd=None):
         """Return current telescope status. Continuously poll.
+
+        If a status query is already queued or running, userCmd finishes with it.
         """
         # log.info("%s.getStatus(userCmd=%s)" % (self, userCmd)) # logging this will flood the log
         # print("%s.getStatus(userCmd=%s)" % (self, userCmd))
@@ -264,14 +467,25 @@ class M2Device(TCPDevice):
             return userCmd
         self._statusTimer.cancel() # incase a status is pending
         # userCmd.addCallback(self._statusCallback)
+        if self._statusDevCmd is not None and not self._statusDevCmd.isDone:
+            userCmd.linkCommands([self._statusDevCmd])
+            return userCmd
         # gather list of status elements to get
         statusCmd = DevCmd("status")
+        self._statusDevCmd = statusCmd
         userCmd.linkCommands([statusCmd])
         self.queueDevCmd(statusCmd)
         return userCmd
 
-    def processStatus(self, replyStr):
+    def processStatus(self, replyStr, devCmd=None):
+        """Parse a status reply and output the status
+
+        @param[in] replyStr  the reply
+        @param[in] devCmd  the status DevCmd; if None use the current command
+        """
         # print("procesStatus", replyStr)
+        if devCmd is None:
+            devCmd = self.currExeDevCmd
         self.status.parseStatus(replyStr)
         # do we want status output so frequently? probabaly not.
         # perhaps only write status if it has changed...
@@ -279,7 +493,12 @@ class M2Device(TCPDevice):
         # so its probably ok
         statusDict = self.status.getStatusDict()
         if self.tccStatus is not None:
-            self.tccStatus.updateKWs(statusDict, self.currExeDevCmd, forceOutput=True)
+            # updateKWs writes all the keywords as a single reply
+            self.tccStatus.updateKWs(statusDict, devCmd, forceOutput=True)
+        if self.sharedState is not None:
+            self.sharedState.update(self.status.getSharedStateDict())
+        if not self.isBusy:
+            self.moveEndTime = None
         if self.waitMoveCmd.isActive:
             if not self.isBusy:
                 # move is done
@@ -295,12 +514,17 @@ class M2Device(TCPDevice):
 
         if not self.isDone:
             # keep polling until done
-            self._statusTimer.start(PollTime, self.getStatus)
+            self._statusTimer.start(self.movePollTime(), self.getStatus)
 
     def stop(self, userCmd=None):
         userCmd = expandCommand(userCmd)
+        moveRequestList, self.moveRequestList = self.moveRequestList, []
+        for moveRequest in moveRequestList:
+            if not moveRequest.userCmd.isDone:
+                moveRequest.userCmd.setState(moveRequest.userCmd.Cancelled, "Stop commanded")
         if not self.waitMoveCmd.isDone:
             self.waitMoveCmd.setState(self.waitMoveCmd.Cancelled, "Stop commanded")
+        self.moveEndTime = None
         #print("sec stop commanded")
         devCmdList = [
             DevCmd("stop"),
@@ -309,8 +533,7 @@ class M2Device(TCPDevice):
             DevCmd("status2"),
         ]
         userCmd.linkCommands(devCmdList)
-        for devCmd in devCmdList:
-            self.queueDevCmd(devCmd)
+        self.queueDevCmdList(devCmdList)
         return userCmd
 
     def focus(self, focusValue, offset=False, userCmd=None):
@@ -334,52 +557,59 @@ class M2Device(TCPDevice):
     def move(self, valueList, offset=False, userCmd=None):
         """Command an offset or absolute orientation move
 
-        @param[in] valueList: list of 1 to 5 values specifying pistion(um), tiltx("), tilty("), transx(um), transy(um)
+        @param[in] valueList: list of 1 to 5 values specifying pistion(um), tiltx("), tilty("), transx(um), transy(um);
+            None for an axis that should not be moved
         @param[in] offset, if true this is offset, else absolute
         @param[in] userCmd: a twistedActor BaseCommand
 
+        If the mirror is moving, the request waits until the move is done; all requests received
+        in the meantime are merged into one move (see mergeMoves), and each of their user commands
+        finishes when that move does.
+
         Note: increasing distance eg pistion means increasing spacing between primary and
         secondary mirrors.
         """
         log.info("%s.move(userCmd=%s, valueList=%s, offset=%s)" % (self, userCmd, str(valueList), str(bool(offset))))
         userCmd = expandCommand(userCmd)
-        if not self.waitMoveCmd.isDone:
-            userCmd.setState(userCmd.Failed, "Mirror currently moving")
-            return userCmd
-        if not 1<=len(valueList)<=5:
+        if not 1<=len(valueList)<=5 or all(value is None for value in valueList):
             userCmd.setState(userCmd.Failed, "Must specify 1 to 5 numbers for a move")
             return userCmd
-        self.waitMoveCmd = expandCommand()
-        self.waitMoveCmd.userCmd = userCmd # for write to users
-        self.status.desOrientation = self.status.orientation[:]
-        if offset:
-            # if offset is specified, offset from current value
-            for ii, value in enumerate(valueList):
-                self.status.desOrientation[ii] += value
+        self.moveRequestList.append(MoveRequest(userCmd, valueList, offset))
+        if self.waitMoveCmd.isDone:
+            self._startMove()
         else:
-            # if absolute is wanted, overwrite all those
-            # specified
-            for ii, value in enumerate(valueList):
-                self.status.desOrientation[ii] = value
-        cmdType = "offset" if offset else "move"
+            log.info("%s.move: mirror is moving; %s move request(s) pending" % (self, len(self.moveRequestList)))
+        return userCmd
+
+    def _startMove(self):
+        """Start one move for all pending move requests whose user commands are still active
+        """
+        moveRequestList = [moveRequest for moveRequest in self.moveRequestList if not moveRequest.userCmd.isDone]
+        self.moveRequestList = []
+        if not moveRequestList:
+            return
+        cmdType, valueList, desOrientation = mergeMoves(moveRequestList, self.status.orientation)
+        self.waitMoveCmd = expandCommand()
+        self.waitMoveCmd.userCmd = moveRequestList[0].userCmd # for write to users
+        self.waitMoveCmd.addCallback(self._moveCallback)
+        self.status.desOrientation = desOrientation
         strValList = " ".join(["%.2f"%val for val in valueList])
         cmdStr = "%s %s"%(cmdType, strValList)
         moveCmd = DevCmd(cmdStr)
         statusCmd = DevCmd("status")
-        galilOverHead = 2 # galil take roughly 2 secs to boot up.
         extraOverHead = 2 #
-        self.status._moveTimeTotal = self.getTimeForMove()
-        timeout = self.status._moveTimeTotal+galilOverHead+extraOverHead
-        userCmd.setTimeLimit(timeout*3) # triple the time out time
-        userCmd.linkCommands([moveCmd, statusCmd, self.waitMoveCmd])
-        for cmd in [moveCmd, statusCmd]:
-            self.queueDevCmd(cmd)
-        # status immediately to see moving state
-        # determine total time for move
-        # just use focus distance as proxy (ignore)
-
-
-        return userCmd
+        self.status.moveTimeTotal = self.getTimeForMove()
+        timeout = self.status._moveTimeTotal+GalilBootTime+extraOverHead
+        for moveRequest in moveRequestList:
+            moveRequest.userCmd.setTimeLimit(timeout*3) # triple the time out time
+            moveRequest.userCmd.linkCommands([moveCmd, statusCmd, self.waitMoveCmd])
+        self.queueDevCmdList([moveCmd, statusCmd])
+
+    def _moveCallback(self, waitMoveCmd):
+        """When a move finishes, start a move for any requests received while it was moving
+        """
+        if waitMoveCmd.isDone and waitMoveCmd is self.waitMoveCmd and self.moveRequestList:
+            self._startMove()
 
     def getTimeForMove(self):
         dist2Move = numpy.max(numpy.abs(numpy.subtract(self.status.desOrientation, self.status.orientation)))
@@ -426,20 +656,69 @@ class M2Device(TCPDevice):
         if self.currExeDevCmd.isDone:
             # ignore unsolicited ouput
             return
+        pendingCmds = getattr(self.currExeDevCmd, "pendingCmds", None)
+        if pendingCmds is not None:
+            # pipelined batch: the reply is for the oldest command without one
+            if not pendingCmds:
+                return
+            self._handleCmdReply(pendingCmds.popleft(), replyStr)
+            if not pendingCmds:
+                self.currExeDevCmd.setState(self.currExeDevCmd.Done)
+            return
+        self._handleCmdReply(self.currExeDevCmd, replyStr)
+
+    def _handleCmdReply(self, devCmd, replyStr):
+        """Handle the reply to one command
+
+        @param[in] devCmd  the DevCmd the reply is for
+        @param[in] replyStr  the reply, stripped of whitespace
+        """
         if "error" in replyStr.lower():
             # error
-            errStr = "Error in M2 reply: %s, current cmd: %s"%(replyStr, self.currExeDevCmd.cmdStr)
+            errStr = "Error in M2 reply: %s, current cmd: %s"%(replyStr, devCmd.cmdStr)
             log.info(errStr)
-            self.currExeDevCmd.writeToUsers("w", errStr)
+            devCmd.writeToUsers("w", errStr)
         # if this was a speed command, set it
-        if self.currDevCmdStr.lower() == "speed":
+        if devCmd.cmdStr.lower() == "speed":
             self.status.speed = float(replyStr)
-        elif self.currDevCmdStr.lower() == "status":
-            self.processStatus(replyStr)
+        elif devCmd.cmdStr.lower() == "status":
+            self.processStatus(replyStr, devCmd)
         # only one line is ever returned after a request
         # so if we got one, then the request is done
-        self.currExeDevCmd.setState(self.currExeDevCmd.Done)
+        devCmd.setState(devCmd.Done)
+
+    def queueDevCmdList(self, devCmdList):
+        """Queue a sequence of device commands
 
+        If usePipeline, the commands are written at once (as one queue entry, with the priority
+        of the first command) and the replies are matched to them in order;
+        otherwise each command is queued separately.
+
+        @param[in] devCmdList  list of DevCmd
+        """
+        if not self.usePipeline or len(devCmdList) < 2:
+            for devCmd in devCmdList:
+                self.queueDevCmd(devCmd)
+            return
+        batchCmd = DevCmd("; ".join(devCmd.cmdStr for devCmd in devCmdList))
+        batchCmd.batchCmds = devCmdList
+        # commands written and awaiting a reply, in write order
+        batchCmd.pendingCmds = collections.deque()
+        batchCmd.addCallback(self._batchCallback)
+        self.queueDevCmd(batchCmd)
+
+    def _batchCallback(self, batchCmd):
+        """If a pipelined batch fails, fail its unfinished commands and stop pipelining
+        """
+        if not batchCmd.didFail:
+            return
+        for devCmd in batchCmd.batchCmds:
+            if not devCmd.isDone:
+                devCmd.setState(devCmd.Failed, batchCmd.textMsg)
+        batchCmd.pendingCmds.clear()
+        if self._pipelineOK:
+            log.info("%s reverting to serial commands: batch %r failed: %s" % (self, batchCmd.cmdStr, batchCmd.textMsg))
+        self._pipelineOK = False
 
     def queueDevCmd(self, devCmd):
         """Add a device command to the device command queue
@@ -449,9 +728,8 @@ class M2Device(TCPDevice):
         cmdStr = devCmd.cmdStr
         log.info("%s.queueDevCmd(cmdStr=%r, cmdQueue: %r"%(self, cmdStr, self.devCmdQueue))
         # print("%s.queueDevCmd(devCmd=%r, devCmdStr=%r, cmdQueue: %r"%(self, devCmd, devCmd.cmdStr, self.devCmdQueue))
-        # append a cmdVerb for the command queue (other wise all get the same cmdVerb and cancel eachother)
-        # could change the default behavior in CommandQueue?
-        devCmd.cmdVerb = cmdStr.split()[0]
+        # the queue priority is looked up by cmdVerb
+        devCmd.cmdVerb = cmdStr.split()[0].rstrip(";")
         def queueFunc(devCmd):
             self.startDevCmd(devCmd)
         self.devCmdQueue.addCmd(devCmd, queueFunc)
@@ -460,29 +738,46 @@ class M2Device(TCPDevice):
 
     def startDevCmd(self, devCmd):
         """
-        @param[in] devCmdStr a line of text to send to the device
+        @param[in] devCmd  the DevCmd to send to the device (possibly a pipelined batch)
         """
-        devCmdStr = devCmd.cmdStr.lower() # m2 uses all lower case
-        log.info("%s.startDevCmd(%r)" % (self, devCmdStr))
+        batchCmds = getattr(devCmd, "batchCmds", None)
         try:
             if self.conn.isConnected:
-                log.info("%s writing %r" % (self, devCmdStr))
-                # set move command to running now. Bug if set earlier race condition
-                # with status
-                if "move" in devCmdStr.lower() or "offset" in devCmdStr.lower():
-                    self.waitMoveCmd.setState(self.waitMoveCmd.Running)
-                    self.status.state = Moving
-                    if self.tccStatus is not None:
-                        self.tccStatus.updateKW("secState", self.status.secStateStr(), devCmd)
-                # if "galil" in devCmdStr.lower():
-                #     self.waitGalilCmd.setState(self.waitGalilCmd.Running)
-                self.conn.writeLine(devCmdStr)
+                if batchCmds is None:
+                    self._writeDevCmd(devCmd)
+                    return
+                devCmd.setTimeLimit(BatchTimeout * len(batchCmds))
+                devCmd.setState(devCmd.Running)
+                for batchCmd in batchCmds:
+                    if batchCmd.isDone:
+                        continue
+                    batchCmd.setState(batchCmd.Running)
+                    devCmd.pendingCmds.append(batchCmd)
+                    self._writeDevCmd(batchCmd)
+                if not devCmd.pendingCmds:
+                    devCmd.setState(devCmd.Done)
             else:
                 self.currExeDevCmd.setState(self.currExeDevCmd.Failed, "Not connected to M2")
         except Exception as e:
             self.currExeDevCmd.setState(self.currExeDevCmd.Failed, textMsg=strFromException(e))
 
+    def _writeDevCmd(self, devCmd):
+        """Write a command to the device
 
-
-
-
+        @param[in] devCmd  a DevCmd (not a batch)
+        """
+        devCmdStr = devCmd.cmdStr.lower() # m2 uses all lower case
+        log.info("%s writing %r" % (self, devCmdStr))
+        # set move command to running now. Bug if set earlier race condition
+        # with status
+        if "move" in devCmdStr or "offset" in devCmdStr:
+            self.waitMoveCmd.setState(self.waitMoveCmd.Running)
+            # predict the end of the move; the galil boots first unless it is already on
+            bootTime = 0 if self.status.galil == On else GalilBootTime
+            self.moveEndTime = time.time() + bootTime + self.status._moveTimeTotal
+            self.status.state = Moving
+            if self.tccStatus is not None:
+                self.tccStatus.updateKW("secState", self.status.secStateStr(), devCmd)
+        # if "galil" in devCmdStr.lower():
+        #     self.waitGalilCmd.setState(self.waitGalilCmd.Running)
+        self.conn.writeLine(devCmdStr)
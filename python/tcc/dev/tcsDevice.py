@@ -10,9 +10,12 @@ from RO.Astro.Sph.AzAltFromHADec import azAltFromHADec
 from RO.Astro.Sph.HADecFromAzAlt import haDecFromAzAlt
 from RO.StringUtil import strFromException, degFromDMSStr
 
-from twistedActor import TCPDevice, DevCmd, CommandQueue, log, expandCommand
+from twistedActor import TCPDevice, DevCmd, log, expandCommand
 
 from tcc.utils.ffs import get_ffs_altitude, telescope_alt_limit
+from tcc.utils.telemetry import TelemetryBuffer
+from tcc.utils.taiClock import tai
+from .devCmdQueue import DevCmdQueue, PriorityMotion, PriorityCommand, PriorityStatus
 
 from twisted.internet import reactor
 #TODO: Combine offset wait command and rotation offset wait commands.
@@ -23,13 +26,11 @@ from twisted.internet import reactor
 # to clamp!!!
 
 SEC_TIMEOUT = 2.0
+BATCH_TIMEOUT = 4.0 # time limit for a whole pipelined status batch
 MAX_OFFSET_WAIT = 60.0
 LCO_LATITUDE = -29.0146
 
-def tai():
-    return time.time() - 36.
-
-__all__ = ["TCSDevice"]
+__all__ = ["TCSDevice", "TCSStatusDevice"]
 # ForceSlew = "ForceSlew"
 
 #### telescope parameters found in c100.ini file in tcs source code #####
@@ -60,6 +61,10 @@ IRSLOWSP=53
 ## slew on target thresholds from updatethread.cpp (TCS)
 # MD_TRACKING_STABILITY_THRESHOLD = 0.5 # Tracking is declared stable when error is below this threshold in arc-seconds
 MD_FINE_CORRECTION_TARGET = 0.1 #Target error before completing move in arc-seconds
+# while an offset settles, rerr/derr are polled when they are predicted to be on target,
+# but never sooner than this (sec) after the previous sample
+OffsetMinPollTime = 0.2
+OffsetStatusVerbs = ["rerr", "derr"]
 # RADEC_ERR_THRES = 0.04 # arcseconds, when stable here, offset is done
 
 def encCounts2Deg(encCounts):
@@ -70,15 +75,38 @@ def encCounts2Deg(encCounts):
     return IROFFSET + IRSCALE * encCounts
 
 def SlewTimeRA(deg):
-    return deg * HASCALE / float(HASP)
+    return abs(deg * HASCALE / float(HASP))
 
 def SlewTimeDec(deg):
-    return deg * DECSCALE / float(DECSP)
+    return abs(deg * DECSCALE / float(DECSP))
+
+SlewSettleTime = 5 # seconds, axes acceleration and settling not covered by SlewTimeRA/Dec
+ScreenSlewRate = 0.5 # degrees/second, approximate flat field screen (INPS) speed
+
+def estimateSlewTime(haDist, decDist, rotDist=0., screenDist=0.):
+    """Return the estimated duration (sec) of a slew; the axes, rotator and screen move concurrently
+
+    @param[in] haDist: hour angle distance (degrees)
+    @param[in] decDist: declination distance (degrees)
+    @param[in] rotDist: rotator distance (degrees), 0 if the rotator is not moved
+    @param[in] screenDist: flat field screen distance (degrees), 0 if the screen is not moved
+    """
+    slewTime = max(SlewTimeRA(haDist), SlewTimeDec(decDist)) + SlewSettleTime
+    if rotDist:
+        slewTime = max(slewTime, RotMotion(rotDist).duration)
+    if screenDist:
+        slewTime = max(slewTime, abs(screenDist) / ScreenSlewRate)
+    return slewTime
 
 PollTimeRot = 0.5 # if rotator is slewing query frequently
 PollTimeSlew = 0.5 #seconds, LCO says status is updated no more frequently that 5 times a second
 PollTimeTrack = 2
 PollTimeIdle = 5
+PollSlack = 0.1 # seconds, a field this close to being due is fetched with the current sweep
+SlewMaxPollTime = 5 # seconds, slowest polling of SlewHeldStatusVerbs early in a long slew
+SlewFastPollFrac = 0.2 # poll at the slewing rate for this fraction of the slew before its predicted end
+SlewTimeLimMargin = 60 # seconds added to the estimated slew duration for the slew time limit
+SlewTimeLim = 300 # seconds, slew time limit if there is no estimate of the slew duration
 # FocusPosTol = 0.001 # microns?
 ArcSecPerDeg = 3600 # arcseconds per degree
 MinRotOffset = 2 / ArcSecPerDeg # minimum commandable rotator offset
@@ -86,7 +114,58 @@ MinRotOffset = 2 / ArcSecPerDeg # minimum commandable rotator offset
 MaxRotOffset = 1000 / ArcSecPerDeg
 UnclampWaitTime = 7 # measured with a stopwatch to be 5 seconds listening to motors, add 2 extra secs buffer
 ClampFudgeTime = 0.5 #seconds.  Time delay between perceived end of rotation and issuing "clamp"
-# RotSpeed = 1 # in degrees/second for setting timeout.
+RotDelayTime = 2 # seconds, the clamp status is ignored this long after a rotator move is sent
+# RotMotion estimates, only used to schedule the dense clamp polling burst; not yet calibrated:
+# compare with the measured move times logged by rotOffset
+RotUnclampTime = 5 # seconds, measured with a stopwatch (see UnclampWaitTime)
+RotSpeed = 1 # degrees/second, rough rotator speed
+RotClampTime = 1 # seconds, estimated time for the clamp to engage after it is issued
+RotBurstWindow = 1.5 # seconds, poll the clamp densely from this long before to this long after the predicted clamp
+RotBurstPollTime = 0.2 # seconds between clamp polls during the burst
+RotTimeLim = RotDelayTime + 20 # seconds, time limit for a rotator move (independent of the move model, which is not yet validated)
+RotStatusVerbs = ["mrp", "rawpos"]
+# costly position and error fields that are polled slowly early in a long slew;
+# all others (notably state, and lplc for the screen) are polled at the normal rate
+SlewHeldStatusVerbs = ["rerr", "derr", "ra", "dec", "ha", "pos", "mpos", "telel", "telaz", "rot", "zd"]
+# (status verb, log format) of fields logged after each status sweep that refreshes them
+SweepLogFormatList = (
+    ("rerr", "ra error arcsec: %.2f"),
+    ("derr", "dec error arcsec: %.2f"),
+    ("rawpos", "rotator pos: %.4f"),
+    ("lplc", "ws pos: %.2f"),
+)
+
+
+class RotMotion(object):
+    def __init__(self, deg, startTime=None):
+        """Predicted timeline of a rotator move: unclamp, travel at RotSpeed, clamp
+
+        The prediction is only used to schedule dense polling of the clamp.
+
+        @param[in] deg: size of the move in degrees
+        @param[in] startTime: time.time() when the move was commanded; if None use now
+        """
+        self.deg = abs(deg)
+        self.startTime = time.time() if startTime is None else startTime
+        self.unclampTime = RotUnclampTime
+        self.travelTime = self.deg / RotSpeed
+        self.clampTime = ClampFudgeTime + RotClampTime
+
+    @property
+    def duration(self):
+        """Predicted duration of the move (sec), from command to clamped
+        """
+        return self.unclampTime + self.travelTime + self.clampTime
+
+    @property
+    def clampedTime(self):
+        """Predicted time.time() at which the rotator is clamped
+        """
+        return self.startTime + self.duration
+
+    def __repr__(self):
+        return "%s(deg=%.4f, unclamp=%.2f, travel=%.2f, clamp=%.2f)"%(type(self).__name__,
+            self.deg, self.unclampTime, self.travelTime, self.clampTime)
 
 # DuPontLat = -1*(29 + 52.56 / float(ArcSecPerDeg))
 # DuPontLong = 70 + 41.0 / 60. + 33.36 / float(ArcSecPerDeg)
@@ -97,6 +176,16 @@ Slewing = "Slewing"
 
 CMDOFF = "OFFP"
 
+# tcs verbs that move the telescope, these jump ahead of queued status requests
+MotionVerbs = frozenset(["OFRA", "OFDC", CMDOFF, "CIR", "APGCIR", "DCIR", "RAD", "DECD", "HAD", "MP", "INPS", "CLAMP", "UNCLAMP"])
+
+# per telescope state refresh interval for status fields that don't specify one
+DefaultPollTimes = {
+    Slewing: PollTimeSlew,
+    Tracking: PollTimeTrack,
+    Halted: PollTimeIdle,
+}
+
 TelStateEnumNameDict = collections.OrderedDict((
     (1, Halted),
     (2, Tracking),
@@ -199,24 +288,51 @@ def castScreenPos(lcoReply):
 
 
 class StatusField(object):
-    def __init__(self, cmdVerb, castFunc):
+    def __init__(self, cmdVerb, castFunc, pollTimes=None):
         """A class defining an LCO Status Field intended to be queried for
 
         @param[in] cmdVerb: string to be sent to the LCO TCS server, requesting status
         @param[in] castFunc: a callable that parses LCO status output
+        @param[in] pollTimes: dict of telescope state (Slewing, Tracking, Halted): refresh
+            interval in seconds.  If None use DefaultPollTimes.
 
         do we want to specify units?
         perhaps add in string key val format?
         """
         self.cmdVerb = cmdVerb
         self.castFunc = castFunc
+        self.pollTimes = DefaultPollTimes.copy()
+        if pollTimes is not None:
+            self.pollTimes.update(pollTimes)
         self.value = None
+        self.timestamp = None # time.time() of the last successful setValue
+        self.changeCount = 0 # incremented each time setValue changes the value
 
     def setValue(self, lcoReply):
         """Set the value attribute from the raw lco output
         """
-        self.value = self.castFunc(lcoReply)
+        value = self.castFunc(lcoReply)
+        if value != self.value:
+            self.changeCount += 1
+        self.value = value
+        self.timestamp = time.time()
+
+    def timeUntilDue(self, telState, now=None):
+        """Return seconds until this field should be queried again (<= 0 if due)
+
+        @param[in] telState: one of Slewing, Tracking, Halted
+        @param[in] now: current time.time(); if None, query it
+        """
+        if self.timestamp is None:
+            return 0
+        if now is None:
+            now = time.time()
+        return self.timestamp + self.pollTimes[telState] - now
+
 
+# refresh intervals (sec) for fields that change slowly
+SlowPollTimes = {Slewing: 30, Tracking: 30, Halted: 60}
+ModeratePollTimes = {Slewing: 2, Tracking: 10, Halted: 30}
 
 StatusFieldList = [
                 # StatusField("focus", float),
@@ -224,11 +340,11 @@ StatusFieldList = [
                 StatusField("derr", float),
                 StatusField("ra", castHoursToDeg),
                 StatusField("dec", degFromDMSStr),
-                StatusField("inpra", castHoursToDeg),
-                StatusField("inpdc", degFromDMSStr),
-                StatusField("inpha", degFromDMSStr),
+                StatusField("inpra", castHoursToDeg, ModeratePollTimes),
+                StatusField("inpdc", degFromDMSStr, ModeratePollTimes),
+                StatusField("inpha", degFromDMSStr, ModeratePollTimes),
                 StatusField("state", castTelState),
-                StatusField("st", castHoursToDeg),
+                StatusField("st", castHoursToDeg, {Tracking: 5, Halted: 10}),
                 StatusField("ha", castHoursToDeg),
                 StatusField("pos", castPos), #ha, dec to degrees
                 StatusField("mpos", castPos), #ra, dec to degrees
@@ -236,17 +352,59 @@ StatusFieldList = [
                 StatusField("telaz", float), # I think degrees
                 StatusField("rot", float), # I think degrees
                 # StatusField("had", float), # I think degrees, only for input?
-                StatusField("epoch", float),
+                StatusField("epoch", float, {Slewing: 10, Tracking: 60, Halted: 60}),
                 StatusField("zd", float),
                 StatusField("mrp", castMRP),
                 StatusField("axisstatus", castAxis), #unhack this!
-                StatusField("temps", castTemps),
-                StatusField("ttruss", float),
+                StatusField("temps", castTemps, SlowPollTimes),
+                StatusField("ttruss", float, SlowPollTimes),
                 StatusField("rawpos", castRawPos),
-                StatusField("airmass", float),
+                StatusField("airmass", float, ModeratePollTimes),
                 StatusField("lplc", castScreenPos)
             ]
 
+# number of status sweeps kept in the telemetry history
+# (about an hour of sweeps at the slewing poll rate)
+TelemetryBufferLen = 8192
+
+# telemetry field name: (status field key, function extracting a float from the status field value)
+TelemetryFieldDict = collections.OrderedDict((
+    ("rerr", ("rerr", float)),
+    ("derr", ("derr", float)),
+    ("haPos", ("pos", lambda value: value[0])),
+    ("decPos", ("pos", lambda value: value[1])),
+    ("raMPos", ("mpos", lambda value: value[0])),
+    ("decMPos", ("mpos", lambda value: value[1])),
+    ("telEl", ("telel", float)),
+    ("telAz", ("telaz", float)),
+    ("rot", ("rot", float)),
+    ("rotPos", ("rawpos", float)),
+    ("ttruss", ("ttruss", float)),
+    ("airmass", ("airmass", float)),
+    ("screenPos", ("lplc", float)),
+))
+for _tempKey in tempKeys:
+    TelemetryFieldDict[_tempKey] = ("temps", lambda value, tempKey=_tempKey: value[tempKey])
+
+# TCC keyword: (Status method that formats it, status fields it is derived from);
+# fields is None if the keyword also depends on other state, in which case it is formatted every time
+TCCKWFormatDict = collections.OrderedDict((
+    ("axisCmdState", ("axisCmdState", None)),
+    ("axePos", ("axePos", ("telel", "telaz", "rawpos"))),
+    ("tccPos", ("tccPos", ("telel", "telaz", "rawpos"))),
+    ("objNetPos", ("objNetPos", None)),
+    ("objSys", ("objSys", ("epoch",))),
+    ("secTrussTemp", ("secTrussTemp", ("ttruss",))),
+    ("tccHA", ("tccHA", ("ha",))),
+    ("tccTemps", ("tccTemps", ("temps",))),
+    ("airmass", ("airmass", ("airmass",))),
+    ("axisErr", ("axisErr", ("rerr", "derr"))),
+    ("ffLamp", ("ffLamp", ("mrp",))),
+    ("screenPos", ("screenPos", ("lplc",))),
+    ("slewDuration", ("slewDurationStr", None)),
+    ("slewEnd", ("slewEnd", None)),
+))
+
 class Status(object):
     def __init__(self, tcsDevice):
         """Container for holding current status of the TCS
@@ -266,6 +424,10 @@ class Status(object):
 
         # self.rotOnTarg = 1 * ArcSecPerDeg # within 1 arcsec rot move is considered done
         self.statusFieldDict = collections.OrderedDict(( (x.cmdVerb, x) for x in StatusFieldList ))
+        # TCC keyword: (changeCount of each status field it depends on, formatted value)
+        self._tccKWCache = {}
+        # history of numeric status values, one sample per status sweep
+        self.telemetry = TelemetryBuffer(TelemetryFieldDict.keys(), size=TelemetryBufferLen)
         # self.focus = None
         # self.targFocus = None
         self.ra = None #unused?
@@ -275,24 +437,72 @@ class Status(object):
         self.targDec = None
         self.offDec = None
         self.offRA = None
+        self.offsetStartTime = None # time.time() when the last offset was sent to the TCS
+        self.slewStartTime = None # time.time() when the last slew was commanded
+        self.slewDuration = None # estimated duration (sec) of the last slew
         self.telState = None
 
     def getTCCKWDict(self):
-        return {
-            "axisCmdState": self.axisCmdState(),
-            "axePos": self.axePos(),
-            "tccPos": self.tccPos(),
-            "objNetPos": self.objNetPos(),
-            # "utc_tai": self.utc_tai(),
-            "objSys": self.objSys(),
-            "secTrussTemp": self.secTrussTemp(),
-            "tccHA": self.tccHA(),
-            "tccTemps": self.tccTemps(),
-            "airmass": self.airmass(),
-            "axisErr": self.axisErr(),
-            "ffLamp": self.ffLamp(),
-            "screenPos": self.screenPos()
-        }
+        """Return a dict of TCC keyword: formatted value
+
+        A keyword is only reformatted if a status field it is derived from
+        has changed since it was last formatted (see TCCKWFormatDict).
+        """
+        kwDict = {}
+        for kw, (funcName, cmdVerbs) in TCCKWFormatDict.iteritems():
+            if cmdVerbs is None:
+                kwDict[kw] = getattr(self, funcName)()
+                continue
+            changeCounts = tuple(self.statusFieldDict[cmdVerb].changeCount for cmdVerb in cmdVerbs)
+            cached = self._tccKWCache.get(kw)
+            if cached is None or cached[0] != changeCounts:
+                cached = (changeCounts, getattr(self, funcName)())
+                self._tccKWCache[kw] = cached
+            kwDict[kw] = cached[1]
+        return kwDict
+
+    @property
+    def slewEndTime(self):
+        """Return the predicted time.time() at which the last slew ends, or None if unknown
+        """
+        if self.slewDuration is None:
+            return None
+        return self.slewStartTime + self.slewDuration
+
+    def slewDurationStr(self):
+        """Format the slewDuration keyword (sec)
+        """
+        return "%.1f"%self.slewDuration if self.slewDuration is not None else "NaN"
+
+    def slewEnd(self):
+        """Format the slewEnd keyword: predicted end of the last slew (TAI, MJD seconds)
+        """
+        if self.slewEndTime is None:
+            return "NaN"
+        return "%.1f"%(tai(self.slewEndTime))
+
+    def estimateSlew(self, ha, dec, rotPos=None, screenPos=None):
+        """Estimate the duration of a slew from the current position
+
+        @param[in] ha: target hour angle (degrees)
+        @param[in] dec: target declination (degrees)
+        @param[in] rotPos: target rotator position (degrees), None if the rotator is not moved
+        @param[in] screenPos: target flat field screen position (degrees), None if the screen is not moved
+        @return estimated duration (sec), or None if the current position is unknown
+        """
+        currPos = self.statusFieldDict["pos"].value
+        if currPos is None:
+            return None
+        haDist = (ha - currPos[0] + 180) % 360 - 180
+        decDist = dec - currPos[1]
+        rotDist = 0.
+        if rotPos is not None and self.rotPos is not None:
+            rotDist = rotPos - self.rotPos
+        screenDist = 0.
+        currScreenPos = self.statusFieldDict["lplc"].value
+        if screenPos is not None and currScreenPos is not None:
+            screenDist = screenPos - currScreenPos
+        return estimateSlewTime(haDist, decDist, rotDist, screenDist)
 
     def screenPos(self):
         sp = self.statusFieldDict["lplc"].value
@@ -396,9 +606,6 @@ class Status(object):
         """
         return "%s"%(self.azAltStr())
 
-    def utc_tai(self):
-        return "UTC_TAI=%0.0f"%(-36.0,) # this value is usually gotten from coordConv/earthpred, I think, which we don't have implemented...
-
     def ffLamp(self):
         """Returns the status on/off of the FF lamp."""
         mrp = self.statusFieldDict["mrp"].value
@@ -434,6 +641,22 @@ class Status(object):
             # the buffer is full and errors are under the threshold
             return True
 
+    def predictOnTargetTime(self):
+        """Predict when both axis errors will be under MD_FINE_CORRECTION_TARGET
+
+        Fits the decay of the rerr and derr samples taken since the last offset was sent.
+
+        @return the predicted time.time(), or None if there is no prediction
+        """
+        if self.offsetStartTime is None:
+            return None
+        now = time.time()
+        onTargetTimes = [self.telemetry.predictDecay(name, MD_FINE_CORRECTION_TARGET,
+            seconds=now - self.offsetStartTime, now=now) for name in OffsetStatusVerbs]
+        if None in onTargetTimes:
+            return None
+        return max(onTargetTimes)
+
     @property
     def raOnTarget(self):
         """Return True if the rerr buffer is full and all values are under the threshold
@@ -520,10 +743,107 @@ class Status(object):
         if self.tcsDevice.tccStatus is not None:
             self.tcsDevice.tccStatus.updateKWs(self.getTCCKWDict(), userCmd)
 
+    def recordTelemetry(self, statusVerbs, timestamp=None):
+        """Append a sample of the status fields refreshed by a status sweep to the telemetry history
+
+        Fields that were not refreshed by the sweep are recorded as unknown (NaN)
+        so that window statistics only use measured values.
+
+        @param[in] statusVerbs  collection of status field keys queried by the sweep
+        @param[in] timestamp  sample time (unix seconds); if None use time.time()
+        """
+        valueDict = {}
+        for name, (cmdVerb, getFunc) in TelemetryFieldDict.iteritems():
+            if cmdVerb not in statusVerbs:
+                continue
+            value = self.statusFieldDict[cmdVerb].value
+            if value is None:
+                continue
+            try:
+                valueDict[name] = getFunc(value)
+            except Exception as e:
+                log.info("Could not record telemetry %s from %s=%r: %s"%(name, cmdVerb, value, strFromException(e)))
+        self.telemetry.append(valueDict, timestamp)
+
+    def getSharedStateDict(self):
+        """Return a dict of shared state field: value (see tcc.utils.sharedState); None if unknown
+        """
+        def getValue(cmdVerb, ind=None):
+            value = self.statusFieldDict[cmdVerb].value
+            if value is None or ind is None:
+                return value
+            return value[ind]
+        telStateNum = None
+        for num, telState in TelStateEnumNameDict.iteritems():
+            if telState == self.statusFieldDict["state"].value:
+                telStateNum = num
+        return {
+            "haPos": getValue("pos", 0),
+            "decPos": getValue("pos", 1),
+            "raMPos": getValue("mpos", 0),
+            "decMPos": getValue("mpos", 1),
+            "telAz": getValue("telaz"),
+            "telEl": getValue("telel"),
+            "rotPos": self.rotPos,
+            "rerr": getValue("rerr"),
+            "derr": getValue("derr"),
+            "ha": getValue("ha"),
+            "st": getValue("st"),
+            "airmass": getValue("airmass"),
+            "screenPos": getValue("lplc"),
+            "telState": telStateNum,
+            "tcsTime": time.time(),
+        }
+
+    def getAge(self, cmdVerb, now=None):
+        """Return seconds since a status field was last set, or None if it never was
+
+        @param[in] cmdVerb  status field key in statusFieldDict
+        @param[in] now  current time.time(); if None, query it
+        """
+        timestamp = self.statusFieldDict[cmdVerb].timestamp
+        if timestamp is None:
+            return None
+        if now is None:
+            now = time.time()
+        return now - timestamp
+
+    def getStaleVerbs(self, cmdVerbList, maxAge):
+        """Return the subset of cmdVerbList whose values are older than maxAge (or unset)
+
+        @param[in] cmdVerbList  list of status field keys
+        @param[in] maxAge  maximum acceptable age (sec)
+        """
+        now = time.time()
+        staleVerbs = []
+        for cmdVerb in cmdVerbList:
+            age = self.getAge(cmdVerb, now)
+            if age is None or age > maxAge:
+                staleVerbs.append(cmdVerb)
+        return staleVerbs
+
+    def getFresh(self, cmdVerbList, maxAge, userCmd=None):
+        """Make sure status fields are no older than maxAge
+
+        userCmd is set done immediately if the cached values are fresh enough,
+        else only the stale fields are queried from the TCS.
+
+        @param[in] cmdVerbList  list of status field keys
+        @param[in] maxAge  maximum acceptable age (sec)
+        @param[in] userCmd  a twistedActor BaseCommand
+        @return userCmd
+        """
+        userCmd = expandCommand(userCmd)
+        staleVerbs = self.getStaleVerbs(cmdVerbList, maxAge)
+        if not staleVerbs:
+            userCmd.setState(userCmd.Done)
+            return userCmd
+        return self.tcsDevice.getStatus(userCmd=userCmd, statusVerbs=staleVerbs)
+
 
 class TCSDevice(TCPDevice):
     """!A Device for communicating with the LCO TCS."""
-    def __init__(self, name, host, port, callFunc=None):
+    def __init__(self, name, host, port, callFunc=None, pipelineStatus=False, statusPort=None):
         """!Construct a LCODevice
 
         Inputs:
@@ -533,10 +853,19 @@ class TCSDevice(TCPDevice):
         @param[in] callFunc  function to call when state of device changes;
                 note that it is NOT called when the connection state changes;
                 register a callback with "conn" for that task.
+        @param[in] pipelineStatus  if True write all status verbs of a sweep at once
+                and match the replies in FIFO order (falls back to one verb per
+                round trip after a -1 or a timeout)
+        @param[in] statusPort  if not None, port of a second tcs connection dedicated to
+                status queries, so commands never wait behind telemetry
         """
         self.tccStatus = None # set by the tccLCOActort
+        self.sharedState = None # tcc.utils.sharedState.SharedStateWriter; set by the tccLCOActor
         self._statusTimer = Timer()
 
+        self.pipelineStatus = bool(pipelineStatus)
+        self._pipelineOK = True # cleared after a pipelined batch fails, reset by init
+
         self.waitRotCmd = expandCommand()
         self.waitRotCmd.setState(self.waitRotCmd.Done)
         self.waitRotTimer = Timer()
@@ -551,8 +880,9 @@ class TCSDevice(TCPDevice):
         self.waitSlewCmd.setState(self.waitSlewCmd.Done)
         # self.waitOffsetTimer = Timer()
         self.rotDelay = False
+        self.rotMotion = None # RotMotion of the current or last rotator move
 
-        self.devCmdQueue = CommandQueue({}) # all commands of equal priority
+        self.devCmdQueue = DevCmdQueue(self.getCmdPriority, self.getStatusVerbs)
 
         self.lastGuideRotApplied = None
 
@@ -566,6 +896,45 @@ class TCSDevice(TCPDevice):
             cmdInfo = (),
         )
         self.status = Status(self)
+        self._statusSweeps = [] # in-flight status commands, callers join these rather than re-query
+        if statusPort is None:
+            self.statusDev = None
+        else:
+            self.statusDev = TCSStatusDevice(
+                name = "%sStatus"%(name,),
+                host = host,
+                port = statusPort,
+                tcsDevice = self,
+            )
+
+    def getCmdPriority(self, devCmd):
+        """Return the DevCmdQueue priority class for a device command
+        """
+        if self.getStatusVerbs(devCmd):
+            return PriorityStatus
+        if (devCmd.cmdStr.split() or [""])[0].upper() in MotionVerbs:
+            return PriorityMotion
+        return PriorityCommand
+
+    def getStatusVerbs(self, devCmd):
+        """Return the status verbs requested by a device command, or None if it is not a status request
+        """
+        statusVerbs = getattr(devCmd, "statusVerbs", None)
+        if statusVerbs is not None:
+            return statusVerbs
+        if devCmd.cmdStr in self.status.statusFieldDict:
+            return [devCmd.cmdStr]
+        return None
+
+    @property
+    def statusQueueDev(self):
+        """Return the device that status queries should be queued on
+
+        The dedicated status connection if it is up, else this device.
+        """
+        if self.statusDev is not None and self.statusDev.conn.isConnected:
+            return self.statusDev
+        return self
 
     @property
     def currExeDevCmd(self):
@@ -598,18 +967,133 @@ class TCSDevice(TCPDevice):
             return False
 
     @property
-    def pollTime(self):
-        if self.isSlewing:
-            # slewing, get status kinda frequently
-            pollTime = PollTimeSlew
+    def pollState(self):
+        """Return the telescope state (Slewing, Tracking or Halted) used to pick poll rates
+        """
+        if self.isSlewing or self.slewPending:
+            return Slewing
         elif self.isTracking:
-            # tracking, get status less frequently
-            pollTime = PollTimeTrack
+            return Tracking
         else:
-            # idle, get status infrequently (as things shouldn't be changing fast)
-            pollTime = PollTimeIdle
+            return Halted
+
+    @property
+    def slewPending(self):
+        """Return True if a slew is in progress or may still start
+
+        A slew the TCS has not (yet) reported as slewing is only waited for until its time limit,
+        in case it was too short to be seen.
+        """
+        if self.waitSlewCmd.isDone:
+            return False
+        if self.waitSlewCmd.isActive or self.status.slewStartTime is None:
+            return True
+        return time.time() < self.status.slewStartTime + self.slewTimeLim()
+
+    def slewTimeLim(self):
+        """Return the time limit (sec) for the current slew, from its estimated duration if known
+        """
+        if self.status.slewDuration is None:
+            return SlewTimeLim
+        return self.status.slewDuration + SlewTimeLimMargin
+
+    @property
+    def pollTime(self):
+        """Return the refresh interval of the fastest polled fields for the current state
+        """
+        return DefaultPollTimes[self.pollState]
+
+    def offsetPollTime(self):
+        """Return seconds until rerr and derr should next be sampled to confirm an offset
+        has settled, or None if no offset is settling
+
+        The confirming samples are timed for when the fitted error decay predicts the
+        axes will be on target; the offset is still only done after errBufferLen
+        consecutive samples are under MD_FINE_CORRECTION_TARGET.
+        """
+        if not self.waitOffsetCmd.isActive:
+            return None
+        onTargetTime = self.status.predictOnTargetTime()
+        if onTargetTime is None:
+            return PollTimeSlew
+        return min(max(onTargetTime - time.time(), OffsetMinPollTime), PollTimeSlew)
+
+    def slewHoldTime(self, statusField, now):
+        """Return seconds to hold off polling a status field early in a slew (0 if none)
+
+        Fields in SlewHeldStatusVerbs are polled at most every SlewMaxPollTime until the last
+        SlewFastPollFrac of the estimated slew duration, then at the slewing rate.
+        Other fields are never held, so an aborted or early slew end is noticed promptly.
+
+        @param[in] statusField: a StatusField
+        @param[in] now: current time.time()
+        """
+        if statusField.cmdVerb not in SlewHeldStatusVerbs or statusField.timestamp is None:
+            return 0
+        if not self.slewPending or self.status.slewEndTime is None:
+            return 0
+        timeToFastPoll = self.status.slewEndTime - now - SlewFastPollFrac * self.status.slewDuration
+        return max(0, min(timeToFastPoll, statusField.timestamp + SlewMaxPollTime - now))
+
+    def timeUntilDue(self, statusField, telState, now):
+        """Return seconds until a status field should be queried again (<= 0 if due), including slewHoldTime
+
+        @param[in] statusField: a StatusField
+        @param[in] telState: one of Slewing, Tracking, Halted
+        @param[in] now: current time.time()
+        """
+        return max(statusField.timeUntilDue(telState, now), self.slewHoldTime(statusField, now))
+
+    def rotPollTime(self):
+        """Return seconds until the next rotator clamp poll of the dense burst around the predicted clamp,
+        or None if there is no burst to come
+
+        After RotDelayTime the clamp is also polled at the normal rate (see dueStatusVerbs).
+        """
+        if not self.waitRotCmd.isActive or self.rotDelay or self.rotMotion is None:
+            return None
+        timeToClamp = self.rotMotion.clampedTime - time.time()
+        if timeToClamp > RotBurstWindow:
+            return timeToClamp - RotBurstWindow
+        if timeToClamp < -RotBurstWindow:
+            return None
+        return RotBurstPollTime
+
+    def dueStatusVerbs(self):
+        """Return the list of status verbs that are due to be refreshed
+        """
+        now = time.time()
+        telState = self.pollState
+        dueVerbs = [cmdVerb for cmdVerb, statusField in self.status.statusFieldDict.iteritems()
+            if self.timeUntilDue(statusField, telState, now) <= PollSlack]
+        if self.waitOffsetCmd.isActive:
+            dueVerbs += [cmdVerb for cmdVerb in OffsetStatusVerbs if cmdVerb not in dueVerbs]
+        if self.waitRotCmd.isActive and not self.rotDelay:
+            dueVerbs += [cmdVerb for cmdVerb in RotStatusVerbs if cmdVerb not in dueVerbs]
+        return dueVerbs
+
+    def nextPollTime(self):
+        """Return seconds until the next status field is due (never less than PollTimeSlew,
+        except while an offset is settling or the rotator is clamping)
+        """
+        now = time.time()
+        telState = self.pollState
+        timeUntilDue = min(self.timeUntilDue(statusField, telState, now) for statusField in self.status.statusFieldDict.itervalues())
+        pollTime = max(timeUntilDue, PollTimeSlew)
+        for fastPollTime in (self.offsetPollTime(), self.rotPollTime()):
+            if fastPollTime is not None:
+                pollTime = min(pollTime, fastPollTime)
         return pollTime
 
+    def _pollStatus(self):
+        """Query for the status fields that are due, then reschedule
+        """
+        statusVerbs = self.dueStatusVerbs()
+        if statusVerbs:
+            self.getStatus(statusVerbs=statusVerbs)
+        else:
+            self._statusTimer.start(self.nextPollTime(), self._pollStatus)
+
     def init(self, userCmd=None, timeLim=None, getStatus=True):
         """Called automatically on startup after the connection is established.
         Only thing to do is query for status or connect if not connected
@@ -617,6 +1101,10 @@ class TCSDevice(TCPDevice):
         log.info("%s.init(userCmd=%s, timeLim=%s, getStatus=%s)" % (self, userCmd, timeLim, getStatus))
         # print("%s.init(userCmd=%s, timeLim=%s, getStatus=%s)" % (self, userCmd, timeLim, getStatus))
         userCmd = expandCommand(userCmd)
+        # give pipelined status another chance after a reconnect/init
+        self._pipelineOK = True
+        if self.statusDev is not None and not self.statusDev.conn.isConnected:
+            self.statusDev.connect()
         # if not self.isConnected:
         #     # time lim handled by lco.deviceCmd
         #     return self.connect(userCmd=userCmd)
@@ -626,8 +1114,14 @@ class TCSDevice(TCPDevice):
             userCmd.setState(userCmd.Done)
             return userCmd
 
-    def getStatus(self, userCmd=None):
+    def getStatus(self, userCmd=None, statusVerbs=None):
         """Return current telescope status. Continuously poll.
+
+        @param[in] userCmd  a twistedActor BaseCommand
+        @param[in] statusVerbs  list of status verbs to query; if None query all of them
+
+        Verbs that are already being queried by an in-flight sweep are not queried again,
+        userCmd finishes when the sweeps it depends on finish.
         """
         log.info("%s.getStatus(userCmd=%s)" % (self, userCmd)) # logging this will flood the log
         userCmd = expandCommand(userCmd)
@@ -635,34 +1129,137 @@ class TCSDevice(TCPDevice):
             userCmd.setState(userCmd.Failed, "Not Connected to TCS: try reconnecting (is the APOGEE TCS running!?)")
             return userCmd
         self._statusTimer.cancel() # incase a status is pending
+        # gather list of status elements to get
+        if statusVerbs is None:
+            cmdVerbList = list(self.status.statusFieldDict.keys())
+        else:
+            cmdVerbList = list(statusVerbs)
+        # single flight: attach to sweeps already querying the wanted verbs
+        self._statusSweeps = [sweep for sweep in self._statusSweeps if not sweep.isDone]
+        wantedVerbs = set(cmdVerbList)
+        joinList = []
+        for sweep in self._statusSweeps:
+            if wantedVerbs.intersection(sweep.statusVerbs):
+                joinList.append(sweep)
+                wantedVerbs.difference_update(sweep.statusVerbs)
+        cmdVerbList = [cmdVerb for cmdVerb in cmdVerbList if cmdVerb in wantedVerbs]
+        if not cmdVerbList:
+            userCmd.linkCommands(joinList)
+            return userCmd
+
         statusCmd = expandCommand()
-        userCmd.linkCommands([statusCmd])
+        statusCmd.statusVerbs = cmdVerbList
+        self._statusSweeps.append(statusCmd)
+        userCmd.linkCommands(joinList + [statusCmd])
         statusCmd.addCallback(self._statusCallback)
 
-        # gather list of status elements to get
-        devCmdList = [DevCmd(cmdStr=cmdVerb) for cmdVerb in self.status.statusFieldDict.keys()]
+        if self.usePipeline:
+            # one queue entry for the whole sweep, replies matched in handleReply
+            devCmdList = [self._makeStatusBatch(cmdVerbList)]
+        else:
+            devCmdList = [DevCmd(cmdStr=cmdVerb) for cmdVerb in cmdVerbList]
         statusCmd.linkCommands(devCmdList)
+        queueDev = self.statusQueueDev
         for devCmd in devCmdList:
-            self.queueDevCmd(devCmd)
+            queueDev.queueDevCmd(devCmd)
         return userCmd
 
+    def disconnect(self, *args, **kwargs):
+        """Disconnect from the TCS, including the dedicated status connection
+        """
+        if self.statusDev is not None:
+            self.statusDev.disconnect()
+        return TCPDevice.disconnect(self, *args, **kwargs)
+
+    @property
+    def usePipeline(self):
+        """True if status verbs should be written as a pipelined batch
+        """
+        return self.pipelineStatus and self._pipelineOK
+
+    def _makeStatusBatch(self, cmdVerbList):
+        """Return a DevCmd standing in for a pipelined batch of status verbs
+
+        @param[in] cmdVerbList  list of status verbs (keys of statusFieldDict)
+        """
+        batchCmd = DevCmd(cmdStr="statusbatch")
+        batchCmd.statusVerbs = cmdVerbList
+        batchCmd.batchErrors = []
+        # status fields awaiting a reply, in write order
+        batchCmd.pendingFields = collections.deque()
+        def checkBatch(batchCmd):
+            if batchCmd.didFail:
+                batchCmd.pendingFields.clear()
+                self._fallBackToSerial("status batch failed: %s"%batchCmd.textMsg)
+        batchCmd.addCallback(checkBatch)
+        return batchCmd
+
+    def _fallBackToSerial(self, reason):
+        """Stop pipelining status requests, replies can no longer be trusted to line up
+        """
+        if self._pipelineOK:
+            log.info("%s reverting to serial status queries: %s"%(self, reason))
+        self._pipelineOK = False
+
+    def _startStatusBatch(self, batchCmd, conn):
+        """Write every status verb of batchCmd without waiting for replies
+
+        @param[in] batchCmd  a DevCmd from _makeStatusBatch
+        @param[in] conn  connection to write to
+        """
+        try:
+            if not conn.isConnected:
+                batchCmd.setState(batchCmd.Failed, "Not connected to TCS")
+                return
+            for cmdVerb in batchCmd.statusVerbs:
+                batchCmd.pendingFields.append(self.status.statusFieldDict[cmdVerb])
+            log.info("%s writing status batch %r" % (self, batchCmd.statusVerbs))
+            for cmdVerb in batchCmd.statusVerbs:
+                conn.writeLine(cmdVerb.upper())
+        except Exception as e:
+            batchCmd.setState(batchCmd.Failed, textMsg=strFromException(e))
+
     def _statusCallback(self, cmd):
         """! When status command is complete, send info to users, and check if any
         wait commands need to be set done
+
+        Keywords output while handling the sweep are written as one reply per level.
+        """
+        tccStatus = self.tccStatus
+        if tccStatus is not None:
+            tccStatus.beginBatch()
+        try:
+            self._handleStatusSweep(cmd)
+        finally:
+            if tccStatus is not None:
+                tccStatus.endBatch()
+
+    def _handleStatusSweep(self, cmd):
+        """! Handle a finished (or failed) status sweep; called by _statusCallback
         """
         if cmd.isDone and not cmd.didFail:
             # do we want status output so frequently? probabaly not.
             # perhaps only write status if it has changed...
             # append ra and dec errors to the queues
-            self.status.rerrQueue.append(self.status.statusFieldDict["rerr"].value)
-            self.status.derrQueue.append(self.status.statusFieldDict["derr"].value)
-            self.status.wsPosQueue.append(self.status.statusFieldDict["lplc"].value)
-
-            log.info("XXX ra error arcsec: %.2f"%self.status.statusFieldDict["rerr"].value)
-            log.info("XXX dec error arcsec: %.2f"%self.status.statusFieldDict["derr"].value)
-            log.info("XXX rotator pos: %.4f"%self.status.rotPos)
-            log.info("XXX ws pos: %.2f"%self.status.statusFieldDict["lplc"].value)
-            log.info("XXX rotator clamped: %s"%str(self.status.isClamped))
+            # only append values that were refreshed by this sweep
+            statusVerbs = cmd.statusVerbs
+            if "rerr" in statusVerbs:
+                self.status.rerrQueue.append(self.status.statusFieldDict["rerr"].value)
+            if "derr" in statusVerbs:
+                self.status.derrQueue.append(self.status.statusFieldDict["derr"].value)
+            if "lplc" in statusVerbs:
+                self.status.wsPosQueue.append(self.status.statusFieldDict["lplc"].value)
+            self.status.recordTelemetry(statusVerbs)
+            if self.sharedState is not None:
+                self.sharedState.update(self.status.getSharedStateDict())
+
+            # log the fields refreshed by this sweep; others may never have been read
+            for verb, logFmt in SweepLogFormatList:
+                value = self.status.statusFieldDict[verb].value
+                if verb in statusVerbs and value is not None:
+                    log.info(logFmt%value)
+            if "mrp" in statusVerbs:
+                log.info("rotator clamped: %s"%str(self.status.isClamped))
 
             if self.waitOffsetCmd.isActive and self.status.axesOnTarget:
                 self.waitOffsetCmd.setState(self.waitOffsetCmd.Done)
@@ -674,16 +1271,16 @@ class TCSDevice(TCPDevice):
                     self.status.statusFieldDict["state"].value in [Tracking, Halted] and
                     not self.status.wsMoving):
                 self.waitSlewCmd.setState(self.waitSlewCmd.Done)
-                log.info("XXX slew done")
+                log.info("slew done")
 
             if self.waitRotCmd.isActive and not self.rotDelay and self.status.isClamped: #not self.status.rotMoving: #and self.status.rotOnTarget :
                 # print("set rot command done", self.rotDelay, self.status.isClamped, self.status.rotMoving)
                 self.waitRotCmd.setState(self.waitRotCmd.Done)
-                log.info("XXX rot done")
+                log.info("rot done")
 
 
         self.status.updateTCCStatus(cmd)
-        self._statusTimer.start(self.pollTime, self.getStatus)
+        self._statusTimer.start(self.nextPollTime(), self._pollStatus)
 
         # output a few pieces of status to the log continuously
 
@@ -764,8 +1361,11 @@ class TCSDevice(TCPDevice):
 
         if doHA:
             enterRa = 'HAD %.8f' % ra
+            targHA = ra
         else:
             enterRa = 'RAD %.8f' % ra
+            st = self.status.statusFieldDict['st'].value
+            targHA = None if st is None else st - ra
 
         enterDec = 'DECD %.8f' % dec
         enterEpoch = 'MP %.2f' % 2000  # LCO: HACK should coords always be 2000?
@@ -782,6 +1382,20 @@ class TCSDevice(TCPDevice):
         if not self.waitSlewCmd.isDone:
             self.waitSlewCmd.setState(self.waitSlewCmd.Cancelled, "Superseded by new slew")
         self.waitSlewCmd = expandCommand()
+        self.status.slewStartTime = time.time()
+        self.status.slewDuration = None
+        if targHA is not None:
+            self.status.slewDuration = self.status.estimateSlew(targHA, dec, ipa_position, ffs_altitude)
+        if self.status.slewDuration is not None:
+            log.info("%s estimated slew duration %.1f sec" % (self, self.status.slewDuration))
+        waitSlewCmd = self.waitSlewCmd
+        waitSlewCmd.setTimeLimit(self.slewTimeLim())
+        def failSlew(devCmd):
+            # the TCS rejected part of the target, so no slew will follow
+            if devCmd.didFail and not waitSlewCmd.isDone:
+                waitSlewCmd.setState(waitSlewCmd.Failed, "%s failed" % (devCmd.cmdStr,))
+        for devCmd in devCmdList:
+            devCmd.addCallback(failSlew)
 
         # if rotation is wanted move the rotator
         if ipa_position is not None:
@@ -907,25 +1521,26 @@ class TCSDevice(TCPDevice):
         if newPos < 60 or newPos > 300:
             userCmd.setState(userCmd.Failed, "Rotator command: %.2f out of limits"%newPos)
             return userCmd
-        # rotStart = time.time()
-        # def printRotSlewTime(aCmd):
-        #     if aCmd.isDone:
-        #         rotTime = time.time() - rotStart
-        #         print("rot: off, time, speed: %.5f %.5f %5f"%(newPos, rotTime, newPos/rotTime))
         waitRotCmd = expandCommand()
         self.waitRotCmd = waitRotCmd
-        # calculate time limit for rot move:
-        rotTimeLimBuffer = 2 # check for clamp after 4 seconds
+        # ignore the clamp status for RotDelayTime, until the rotator has unclamped;
+        # the delay timer is restarted when the move is sent to the TCS
+        # if the current position is unknown assume the longest move
+        rotDist = 180 if self.status.rotPos is None else newPos - self.status.rotPos
+        rotMotion = RotMotion(rotDist)
+        self.rotMotion = rotMotion
+        log.info("%s predicted rotator move %r" % (self, rotMotion))
+        def logRotMoveTime(aCmd):
+            # measured move times, for calibrating RotMotion
+            if aCmd.isDone:
+                log.info("%s rotator move %r took %.2f sec (predicted %.2f); state=%s" % (
+                    self, rotMotion, time.time() - rotMotion.startTime, rotMotion.duration, aCmd.state))
+        waitRotCmd.addCallback(logRotMoveTime)
         self.rotDelay = True
-        print("setting rot delay true")
-        def setRotBufferOff():
-            print("setting rot delay false")
-            print("rot buffer Off (clamped?)", self.status.isClamped)
-            self.rotDelay = False
-        self.waitRotTimer.start(rotTimeLimBuffer, setRotBufferOff)
+        self._startRotDelay()
         #### should this be waitRotCmd ?!!?
         # self.waitOffsetCmd.setTimeLimit(rotTimeLimBuffer + 20)
-        self.waitRotCmd.setTimeLimit(rotTimeLimBuffer + 20)
+        self.waitRotCmd.setTimeLimit(RotTimeLim)
         self.status.setRotOffsetTarg(rot)
         if absolute:
             tcsCMD = "CIR"
@@ -938,6 +1553,19 @@ class TCSDevice(TCPDevice):
         self.status.updateTCCStatus(userCmd)
         return userCmd
 
+    def _startRotDelay(self):
+        """Start (or restart) the rotator delay timer, timed from now
+        """
+        self.rotMotion.startTime = time.time()
+        self.waitRotTimer.start(RotDelayTime, self._endRotDelay)
+
+    def _endRotDelay(self):
+        """The rotator should have unclamped: start polling the clamp
+        """
+        log.info("%s rot delay off (clamped=%s)" % (self, self.status.isClamped))
+        self.rotDelay = False
+        self._statusTimer.start(0, self._pollStatus)
+
     def handleFFLamp(self, on, userCmd=None):
         """Turns on/off the FF lamp. The FFLAMP command is a toggle.
 
@@ -1002,6 +1630,9 @@ class TCSDevice(TCPDevice):
         # log.info("%s read %r, currCmdStr: %s" % (self, replyStr, self.currDevCmdStr))
         replyStr = replyStr.strip()
         log.info("%s read %s" % (self,replyStr))
+        if getattr(self.currExeDevCmd, "pendingFields", None):
+            self._handleBatchReply(self.currExeDevCmd, replyStr)
+            return
         if replyStr == "-1":
             # error
             errorStr = "handleReply failed for %s with -1"%self.currDevCmdStr
@@ -1028,14 +1659,33 @@ class TCSDevice(TCPDevice):
             #self.currExeDevCmd.setState(self.currExeDevCmd.Failed, "Unexpected reply %s for %s"%(replyStr, self.currDevCmdStr))
 
 
+    def _handleBatchReply(self, batchCmd, replyStr):
+        """Match a reply to the oldest outstanding verb of a pipelined status batch
+
+        Errors are recorded but the batch keeps consuming replies until every
+        verb is accounted for, so no stray reply is left for the next command.
+        """
+        statusField = batchCmd.pendingFields.popleft()
+        if replyStr == "-1":
+            batchCmd.batchErrors.append("handleReply failed for %s with -1"%statusField.cmdVerb)
+        else:
+            try:
+                statusField.setValue(replyStr)
+            except Exception as e:
+                batchCmd.batchErrors.append("could not parse %s reply %r: %s"%(statusField.cmdVerb, replyStr, strFromException(e)))
+        if not batchCmd.pendingFields:
+            if batchCmd.batchErrors:
+                batchCmd.setState(batchCmd.Failed, "; ".join(batchCmd.batchErrors))
+            else:
+                batchCmd.setState(batchCmd.Done)
+
     def queueDevCmd(self, devCmd):
         """Add a device command to the device command queue
 
         @param[in] devCmd: a twistedActor DevCmd.
         """
         # log.info("%s.queueDevCmd(devCmd=%r, devCmdStr=%r, cmdQueue: %r"%(self, devCmd, devCmd.cmdStr, self.devCmdQueue))
-        # append a cmdVerb for the command queue (other wise all get the same cmdVerb and cancel eachother)
-        # could change the default behavior in CommandQueue?
+        # cmdVerb is used for logging by the queue; priority comes from getCmdPriority
         devCmd.cmdVerb = devCmd.cmdStr
 
         def forceMPDone(mpDevCmd):
@@ -1046,6 +1696,12 @@ class TCSDevice(TCPDevice):
                 mpDevCmd.setState(mpDevCmd.Done,"forcing MP done")
 
         def queueFunc(devCmd):
+            if hasattr(devCmd, "statusVerbs"):
+                # pipelined status batch
+                devCmd.setTimeLimit(BATCH_TIMEOUT)
+                devCmd.setState(devCmd.Running)
+                self._startStatusBatch(devCmd, self.conn)
+                return
             # all tcs commands return immediately so set a short timeout
             if "MP" in devCmd.cmdStr:
                 reactor.callLater(2.0, forceMPDone, devCmd)
@@ -1065,12 +1721,107 @@ class TCSDevice(TCPDevice):
         try:
             if self.conn.isConnected:
                 log.info("%s writing %r" % (self, devCmdStr))
+                if CMDOFF.upper() == devCmdStr:
+                    self.status.offsetStartTime = time.time()
                 if CMDOFF.upper() == devCmdStr and not self.waitOffsetCmd.Running:
                     self.waitOffsetCmd.setState(self.waitOffsetCmd.Running)
                 elif "CIR" in devCmdStr:
                     self.waitRotCmd.setState(self.waitRotCmd.Running)
+                    if self.rotDelay and self.rotMotion is not None:
+                        self._startRotDelay()
                 self.conn.writeLine(devCmdStr)
             else:
                 self.currExeDevCmd.setState(self.currExeDevCmd.Failed, "Not connected to TCS")
         except Exception as e:
             self.currExeDevCmd.setState(self.currExeDevCmd.Failed, textMsg=strFromException(e))
+
+
+class TCSStatusDevice(TCPDevice):
+    """!A second connection to the LCO TCS that only carries status queries
+
+    Replies update the Status of the TCSDevice that owns this connection.
+    """
+    def __init__(self, name, host, port, tcsDevice, callFunc=None):
+        """!Construct a TCSStatusDevice
+
+        @param[in] name  name of device
+        @param[in] host  host address of tcs controller
+        @param[in] port  status port of tcs controller
+        @param[in] tcsDevice  the TCSDevice whose status is updated
+        @param[in] callFunc  function to call when state of device changes
+        """
+        self.tcsDevice = tcsDevice
+        self.devCmdQueue = DevCmdQueue(tcsDevice.getCmdPriority, tcsDevice.getStatusVerbs) # only status verbs
+        TCPDevice.__init__(self,
+            name = name,
+            host = host,
+            port = port,
+            callFunc = callFunc,
+            cmdInfo = (),
+        )
+
+    @property
+    def currExeDevCmd(self):
+        return self.devCmdQueue.currExeCmd.cmd
+
+    def init(self, userCmd=None, timeLim=None, getStatus=False):
+        """Called automatically on startup after the connection is established.
+        Nothing to initialize; status is polled by the TCSDevice.
+        """
+        userCmd = expandCommand(userCmd)
+        userCmd.setState(userCmd.Done)
+        return userCmd
+
+    def handleReply(self, replyStr):
+        """Handle a line of output from the status port
+
+        @param[in] replyStr   the reply, minus any terminating \n
+        """
+        replyStr = replyStr.strip()
+        log.info("%s read %s" % (self, replyStr))
+        devCmd = self.currExeDevCmd
+        if devCmd.isDone:
+            # ignore unsolicited output
+            return
+        if getattr(devCmd, "pendingFields", None):
+            self.tcsDevice._handleBatchReply(devCmd, replyStr)
+            return
+        if replyStr == "-1":
+            devCmd.setState(devCmd.Failed, "handleReply failed for %s with -1"%devCmd.cmdStr)
+            return
+        statusField = self.tcsDevice.status.statusFieldDict.get(devCmd.cmdStr, None)
+        if statusField is None:
+            log.info("%s unexpected reply: %s" % (self, replyStr))
+            return
+        statusField.setValue(replyStr)
+        devCmd.setState(devCmd.Done)
+
+    def queueDevCmd(self, devCmd):
+        """Add a status device command (or pipelined batch) to the queue
+
+        @param[in] devCmd: a twistedActor DevCmd.
+        """
+        devCmd.cmdVerb = devCmd.cmdStr
+        def queueFunc(devCmd):
+            if hasattr(devCmd, "statusVerbs"):
+                devCmd.setTimeLimit(BATCH_TIMEOUT)
+                devCmd.setState(devCmd.Running)
+                self.tcsDevice._startStatusBatch(devCmd, self.conn)
+                return
+            devCmd.setTimeLimit(SEC_TIMEOUT)
+            devCmd.setState(devCmd.Running)
+            self.startDevCmd(devCmd.cmdStr)
+        self.devCmdQueue.addCmd(devCmd, queueFunc)
+
+    def startDevCmd(self, devCmdStr):
+        """
+        @param[in] devCmdStr a status verb to send to the device
+        """
+        devCmdStr = devCmdStr.upper() # lco uses all upper case
+        try:
+            if self.conn.isConnected:
+                self.conn.writeLine(devCmdStr)
+            else:
+                self.currExeDevCmd.setState(self.currExeDevCmd.Failed, "Not connected to TCS status port")
+        except Exception as e:
+            self.currExeDevCmd.setState(self.currExeDevCmd.Failed, textMsg=strFromException(e))
@@ -16,6 +16,7 @@ class TCSDeviceWrapper(DeviceWrapper):
         port = 0,
         debug = False,
         logReplies = False,
+        useStatusPort = False,
     ):
         """!Construct a TCSDeviceWrapper that manages its fake axis controller
 
@@ -25,10 +26,13 @@ class TCSDeviceWrapper(DeviceWrapper):
         @param[in] port  port for device; 0 to assign a free port
         @param[in] debug  if True, print debug messages
         @param[in] logReplies  should the FakeAxisCtrl print replies to stdout?
+        @param[in] useStatusPort  if True the fake TCS serves a second port and the
+            device queries status on it
         """
         controller = FakeTCS(
             name = name,
             port = port,
+            statusPort = 0 if useStatusPort else None,
         )
         DeviceWrapper.__init__(self, name=name, stateCallback=stateCallback, controller=controller, debug=debug)
 
@@ -36,10 +40,12 @@ class TCSDeviceWrapper(DeviceWrapper):
         port = self.port
         if port is None:
             raise RuntimeError("Controller port is unknown")
+        statusServer = self.controller.statusServer
         self.device = TCSDevice(
             name=self.name,
             host="localhost",
             port=port,
+            statusPort=None if statusServer is None else statusServer.port,
         )
 
     def _basicClose(self):
@@ -49,4 +55,8 @@ class TCSDeviceWrapper(DeviceWrapper):
         self.controller.focusTimer.cancel()
         self.controller.slewTimer.cancel()
         self.device._statusTimer.cancel()
+        if self.device.statusDev is not None:
+            self.device.statusDev.disconnect()
+        if self.controller.statusServer is not None:
+            self.controller.statusServer.close()
         return DeviceWrapper._basicClose(self)
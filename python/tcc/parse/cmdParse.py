@@ -12,12 +12,14 @@ error handling
 """
 import itertools
 import collections
+import re
 
 from RO.StringUtil import strFromException
 from RO.StringUtil import unquoteStr
-import RO.Alg.MatchList
 import pyparsing as pp
 
+from .parseDefs import AbbrevIndex
+
 
 
 class ParseError(Exception):
@@ -31,8 +33,7 @@ def getUniqueAbbrevIndex(keyword, matchList):
 
     @return integer, the index of the list holding the correct match
     """
-    match = RO.Alg.MatchList(valueList=matchList).getUniqueMatch(keyword)
-    return matchList.index(match)
+    return AbbrevIndex(matchList).getUniqueIndex(keyword)
 
 def makeGenericCmd():
     """!Constructs a generic TCC command from pyparsing elements.
@@ -82,35 +83,181 @@ def makeGenericCmd():
     return genericCmd
 
 
+# regular expressions for fastTokenize; these match the pyparsing elements of makeGenericCmd
+_FastVerbRE = re.compile(r"[A-Za-z^]+$")
+_FastNumberRE = re.compile(r"[-+0-9][0-9]*(?:\.[0-9]*)?(?:[eE][-+0-9][0-9]*)?$")
+# a keyword must start with a letter here, else pyparsing would parse a leading number
+_FastKeywordRE = re.compile(r"[A-Za-z][A-Za-z0-9_:.]*$")
+_FastQualNameRE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_:.]*$")
+_FastDelimRE = re.compile(r"\s*([,=])\s*")
+
+class FastTokens(object):
+    """!Output of fastTokenize: the same structure as the pyparsing output of makeGenericCmd,
+    using lists in place of ParseResults
+    """
+    def __init__(self, cmdVerb, qualifiers, parameters):
+        self.cmdVerb = cmdVerb
+        self.qualifiers = qualifiers
+        self.parameters = parameters
+
+def _fastDatumList(datumListStr):
+    """!Split a comma-separated list of numbers and keywords into a list of [datum]
+
+    @return a list of [datum], or None if any item is not a plain number or keyword
+    """
+    datumList = []
+    for datum in datumListStr.split(","):
+        if _FastNumberRE.match(datum):
+            # pyparsing's CaselessLiteral returns the exponent marker as "E"
+            datum = datum.replace("e", "E")
+        elif not _FastKeywordRE.match(datum):
+            return None
+        datumList.append([datum])
+    return datumList
+
+def fastTokenize(inputLine):
+    """!Tokenize a simple command line without pyparsing
+
+    Handles the subset of the makeGenericCmd grammar used by high-rate commands such as
+    "guideoffset 1,2,3,4/waitTime=5", "offset guide 0,0,0.1" and "show status":
+    a command verb followed by parameters that are comma-separated numbers or keywords,
+    and qualifiers with no value or a comma-separated list of numbers or keywords.
+
+    @param[in] inputLine  line to tokenize
+    @return a FastTokens, or None if the line is outside the supported subset
+        (in which case use the full pyparsing grammar)
+    """
+    if '"' in inputLine or "!" in inputLine or "(" in inputLine or ")" in inputLine:
+        return None
+    # split on whitespace and before each "/"; a qualifier need not be preceded by whitespace
+    tokenList = []
+    for word in _FastDelimRE.sub(r"\1", inputLine).split():
+        wordList = word.split("/")
+        if wordList[0]:
+            tokenList.append(wordList[0])
+        tokenList += ["/" + qualStr for qualStr in wordList[1:]]
+    if not tokenList or not _FastVerbRE.match(tokenList[0]):
+        return None
+    qualifiers = []
+    parameters = []
+    for token in tokenList[1:]:
+        if token.startswith("/"):
+            qualName, eqSep, valStr = token[1:].partition("=")
+            if not _FastQualNameRE.match(qualName):
+                return None
+            if eqSep:
+                datumList = _fastDatumList(valStr)
+                if datumList is None:
+                    return None
+                qualifiers.append([qualName, datumList])
+            else:
+                qualifiers.append([qualName])
+        else:
+            if "=" in token:
+                # keyword=value parameters are left to pyparsing
+                return None
+            datumList = _fastDatumList(token)
+            if datumList is None:
+                return None
+            parameters.append(datumList)
+    return FastTokens(cmdVerb=tokenList[0], qualifiers=qualifiers, parameters=parameters)
+
+def normalizeLine(inputLine):
+    """!Return a command line normalized for use as a parse cache key
+
+    Leading and trailing whitespace is removed, and (unless the line contains quotes)
+    runs of whitespace are replaced by a single space; neither affects parsing.
+    """
+    if '"' in inputLine:
+        return inputLine.strip()
+    return " ".join(inputLine.split())
+
 class CmdParser(object):
     """!A class that holds command definitions, and can parse tcc commands
     """
-    def __init__(self, cmdDefList):
+    def __init__(self, cmdDefList, cacheSize=256, useFastTokenize=True):
         """!Construct a CmdParser
 
         @param[in] cmdDefList  a list of command definititions
             (Command or CommandWrapper Objects defined in parseObjects),
             containing all commands to be recognized by this parser.
+        @param[in] cacheSize  maximum number of parsed commands to cache
+            (least recently used are discarded first); 0 to disable the cache
+        @param[in] useFastTokenize  tokenize simple commands with fastTokenize
+            instead of the (much slower) pyparsing grammar?
         """
         self.genericCmd = makeGenericCmd() # pyparsing
         # dict of cmd verb: cmd definition
 #         self.checkDefaults(cmdDefList)
         self.cmdDefDict = dict((cmdDef.name.lower(), cmdDef) for cmdDef in cmdDefList)
-        self.cmdMatchList = RO.Alg.MatchList(valueList=self.cmdDefDict.keys())
+        self.cmdIndex = AbbrevIndex(self.cmdDefDict.keys())
+        self.cacheSize = int(cacheSize)
+        self.useFastTokenize = bool(useFastTokenize)
+        self._parseCache = collections.OrderedDict() # normalized line: ParsedCmd, most recently used last
+
+    def getCallFuncList(self):
+        """!Return a list of the callbacks of all commands and sub-commands
+        """
+        callFuncList = []
+        for cmdDef in self.cmdDefDict.itervalues():
+            for subCmdDef in getattr(cmdDef, "subCmdList", [cmdDef]):
+                if subCmdDef.callFunc is not None and subCmdDef.callFunc not in callFuncList:
+                    callFuncList.append(subCmdDef.callFunc)
+        return callFuncList
+
+    def clearCache(self):
+        """!Discard all cached parsed commands
+        """
+        self._parseCache.clear()
 
     def parseLine(self, inputLine):
         """!Parse an input line, return a ParsedCmd Object
 
+        Parsed commands are cached, so repeating a line returns the same ParsedCmd object;
+        callers must not modify it.
+
+        @param[in] inputLine  line to parse
+        @return parsedCmd, a ParsedCmd object
+        @throw ParseError if command cannot be parsed.
+        """
+        if self.cacheSize <= 0:
+            return self._parseLine(inputLine)
+        cacheKey = normalizeLine(inputLine)
+        parsedCmd = self._parseCache.pop(cacheKey, None)
+        if parsedCmd is None:
+            # errors are not cached: a line that fails is parsed again each time
+            parsedCmd = self._parseLine(inputLine)
+            if len(self._parseCache) >= self.cacheSize:
+                self._parseCache.popitem(last=False)
+        self._parseCache[cacheKey] = parsedCmd
+        return parsedCmd
+
+    def tokenize(self, inputLine):
+        """!Split an input line into command verb, qualifiers and parameters
+
+        @param[in] inputLine  line to tokenize
+        @return an object with attributes cmdVerb, qualifiers and parameters:
+            a FastTokens if the line is simple enough for fastTokenize, else pyparsing ParseResults
+        """
+        if self.useFastTokenize:
+            fastTokens = fastTokenize(inputLine)
+            if fastTokens is not None:
+                return fastTokens
+        return self.genericCmd.parseString(inputLine, parseAll=True)
+
+    def _parseLine(self, inputLine):
+        """!Parse an input line without using the cache
+
         @param[in] inputLine  line to parse
         @return parsedCmd, a ParsedCmd object
         @throw ParseError if command cannot be parsed.
         """
         # try:
-        # pyparsing, returns object with
+        # pyparsing (or the fast tokenizer), returns object with
         # verb, params, quals as previously defined attributes
-        ppOut = self.genericCmd.parseString(inputLine, parseAll=True)
+        ppOut = self.tokenize(inputLine)
         # find correct command definition
-        cmdNames = self.cmdMatchList.getAllMatches(ppOut.cmdVerb)
+        cmdNames = self.cmdIndex.getAllMatches(ppOut.cmdVerb)
         if len(cmdNames) == 0:
             raise ParseError("Unrecognized command %r" % (ppOut.cmdVerb,))
         elif len(cmdNames) > 1:
@@ -126,17 +273,12 @@ class CmdParser(object):
             # alternate parsing enabled in this case
             secCmd = ppOut.parameters[0][0][0]
             # match with the name of the first parameter in the first slot
-            ind = getUniqueAbbrevIndex(
-                secCmd,
-                [item.paramList[0].paramElementList[0].name for item in cmdDef.subCmdList]
-            )
             # (re) set cmdDef to this and carry on
-            cmdDef = cmdDef.subCmdList[ind]
+            cmdDef = cmdDef.matchSubCommand(secCmd)
 
         ################## add and validate qualifiers. #################
         # set value = None if no value was passed, values are always a list if not None
         for qual in ppOut.qualifiers:
-            boolValue = True
             qualName = qual[0]
             try:
                 # if a value was passed, it will be in index=1
@@ -145,19 +287,8 @@ class CmdParser(object):
             except IndexError:
                 # there was no value passed
                 qualVal = None
-            try:
-                ind = getUniqueAbbrevIndex(qualName, [item.name for item in cmdDef.qualifierList])
-            except ValueError:
-                # match wasn't found, try again using negated qualifiers (where allowed)
-                nameList=[]
-                for tempQual in cmdDef.qualifierList:
-                    if tempQual.negatable:
-                        nameList.append('No' + tempQual.name)
-                    else:
-                        nameList.append(tempQual.name)
-                ind = getUniqueAbbrevIndex(qualName, nameList)
-                boolValue = False # we just encountered a negated qualifier
-            qualDef = cmdDef.qualifierList[ind]
+            # boolValue is False if a negated qualifier (where allowed) was matched
+            qualDef, boolValue = cmdDef.matchQualifier(qualName)
 
             if qualDef.valType == None:
                 # this is a flag-like qualifier with no values
@@ -219,7 +350,7 @@ class CmdParser(object):
                 else:
                     # search each value for it's full (non-abbreviated) representation
                     # in the parsedCmd valType field
-                    valueList = [RO.Alg.MatchList(valueList=qualDef.valType).getUniqueMatch(keyword) for keyword in qualVal]
+                    valueList = [qualDef.matchValue(keyword) for keyword in qualVal]
                     # check if amount of values are allowed
                     if qualDef.numValueRange[1] == None:
                         if len(valueList) < qualDef.numValueRange[0]:
@@ -294,7 +425,7 @@ class CmdParser(object):
                 if not correctParamAmt:
                     raise ParseError('Incorrect amount of parameters for command %r' % (inputLine,))
                 for paramGot in paramSlotGot:
-                    paramDef = paramSlotDef.paramElementList[getUniqueAbbrevIndex(paramGot.pop(0), paramSlotDef.matchList)]
+                    paramDef = paramSlotDef.matchKeyword(paramGot.pop(0))
                     validatedName = paramDef.name
                     # are values associated with this keyword? They will be left over in paramGot
                     if paramGot:
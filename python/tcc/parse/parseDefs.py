@@ -8,13 +8,89 @@ This will have to be handled outside the parser.  The parser sees Azimuth and No
 distinct keywords (not a negation of a single one).  This choice simplifies the code because
 I believe the only command with negatable parameters is Axis...but I could be wrong
 """
+import importlib
 
-__all__ = ["Qualifier", "Keyword", "Command", "SubCommand", "CommandWrapper"]
+__all__ = ["LazyCallFunc", "AbbrevIndex", "Qualifier", "Keyword", "Command", "SubCommand", "CommandWrapper"]
 
 class CmdDefError(Exception):
     pass
 
 
+class LazyCallFunc(object):
+    """!A command callback whose module is imported when it is first needed
+
+    This keeps command modules from being imported when the command definitions are.
+    """
+    def __init__(self, moduleName, funcName):
+        """
+        @param[in] moduleName  full name of the module containing the callback, e.g. "tcc.cmd.offset"
+        @param[in] funcName  name of the callback in that module
+        """
+        self.moduleName = moduleName
+        self.funcName = funcName
+        self._func = None
+
+    @property
+    def isResolved(self):
+        """!Has the module been imported?
+        """
+        return self._func is not None
+
+    def resolve(self):
+        """!Import the module (if not already done) and return the callback
+
+        @throw ImportError or AttributeError if the callback cannot be found
+        """
+        if self._func is None:
+            self._func = getattr(importlib.import_module(self.moduleName), self.funcName)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return "%s(%r, %r)" % (type(self).__name__, self.moduleName, self.funcName)
+
+
+class AbbrevIndex(object):
+    """!Case-blind lookup of names by unique abbreviation, using a precomputed dict
+
+    Matching is the same as RO.Alg.MatchList (including the error messages),
+    but costs a single dict lookup instead of a scan of all names.
+    """
+    def __init__(self, nameList):
+        """
+        @param[in] nameList  a list of names; non-string entries are ignored
+        """
+        self.nameList = list(nameList)
+        # sort as MatchList does, so matches and error messages are in the same order
+        itemList = sorted(
+            (name.lower(), name, ind) for ind, name in enumerate(self.nameList) if hasattr(name, "lower")
+        )
+        self.sortedNameList = [item[1] for item in itemList]
+        self._abbrevDict = {} # lowercase abbreviation: list of (name, index in nameList)
+        for lowName, name, ind in itemList:
+            for abbrevLen in range(len(lowName) + 1):
+                self._abbrevDict.setdefault(lowName[:abbrevLen], []).append((name, ind))
+
+    def getAllMatches(self, abbrev):
+        """!Return a list of names that abbrev matches (an empty list if none)
+        """
+        return [name for name, ind in self._abbrevDict.get(abbrev.lower(), ())]
+
+    def getUniqueIndex(self, abbrev):
+        """!Return the index in nameList of the name uniquely matched by abbrev
+
+        @throw ValueError if abbrev matches no names or more than one name
+        """
+        matchList = self._abbrevDict.get(abbrev.lower(), ())
+        if len(matchList) == 1:
+            return matchList[0][1]
+        if matchList:
+            raise ValueError("too many matches for %r in %r" % (abbrev, [name for name, ind in matchList]))
+        raise ValueError("no matches for %r in %r" % (abbrev, self.sortedNameList))
+
+
 class Qualifier(object):
     """!Used to define a qualifier (which may have values associated).
     """
@@ -77,6 +153,19 @@ class Qualifier(object):
         self.defValueList = defValueList
         self.numValueRange = numValueRange
         self.valType = valType
+        if valType != None and not callable(valType):
+            self.valIndex = AbbrevIndex(valType)
+        else:
+            self.valIndex = None
+
+    def matchValue(self, abbrev):
+        """!Return the value in valType uniquely matched by abbrev (case blind)
+
+        Only for qualifiers whose valType is a list of keywords.
+
+        @throw ValueError if abbrev does not uniquely match a value
+        """
+        return self.valType[self.valIndex.getUniqueIndex(abbrev)]
 
     @property
     def argList(self):
@@ -255,11 +344,20 @@ class ParamBase(object):
             except:
                 raise CmdDefError('For a given parameter, all values must either be named or not named; a mix is unacceptable.')
             self.matchList = None
+            self.matchIndex = None
         else:
             self.matchList = uniqueNames
+            self.matchIndex = AbbrevIndex(uniqueNames)
         self.paramElementList = paramElementList
         self._help = help
 
+    def matchKeyword(self, abbrev):
+        """!Return the ParamElement whose name is uniquely matched by abbrev (case blind)
+
+        @throw ValueError if abbrev does not uniquely match a name
+        """
+        return self.paramElementList[self.matchIndex.getUniqueIndex(abbrev)]
+
     @property
     def defaultParamList(self):
         """!Which params to pass by default for this slot?
@@ -413,6 +511,24 @@ class Command(object):
         self.help = help
         self.callFunc = callFunc
         self.minParAmt = int(minParAmt)
+        self.qualIndex = AbbrevIndex([qual.name for qual in self.qualifierList])
+        # names allowing negated qualifiers, e.g. NoCollimate; a failed match is retried with these
+        self.negQualIndex = AbbrevIndex(
+            ["No" + qual.name if qual.negatable else qual.name for qual in self.qualifierList]
+        )
+
+    def matchQualifier(self, abbrev):
+        """!Return the qualifier uniquely matched by abbrev (case blind), allowing negation
+
+        @return two values:
+        - qualifier: the matching Qualifier
+        - boolValue: False if abbrev matched the negated name (e.g. /NoCollimate), else True
+        @throw ValueError if abbrev does not uniquely match a qualifier
+        """
+        try:
+            return self.qualifierList[self.qualIndex.getUniqueIndex(abbrev)], True
+        except ValueError:
+            return self.qualifierList[self.negQualIndex.getUniqueIndex(abbrev)], False
 
     def getFullHelp(self):
         """!Return full help as a list of strings
@@ -501,6 +617,14 @@ class CommandWrapper(object):
         #self.name = name # hack for now, for help printing
         self.subCmdList = subCmdList or []
         self.help = help
+        self.subCmdIndex = AbbrevIndex([subCmd.subCommandName for subCmd in self.subCmdList])
+
+    def matchSubCommand(self, abbrev):
+        """!Return the SubCommand whose name is uniquely matched by abbrev (case blind)
+
+        @throw ValueError if abbrev does not uniquely match a sub-command name
+        """
+        return self.subCmdList[self.subCmdIndex.getUniqueIndex(abbrev)]
 
     def getFullHelp(self):
         """!Return full help as a list of strings
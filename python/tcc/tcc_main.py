@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 from __future__ import division, absolute_import
 """Run the TCC LCO actor
+
+To measure startup time set environment variable TCC_IMPORT_PROFILE to a file path
+(or to 1 for stderr) and a report of the time taken to import each module is written
+once the actor is listening; see tcc.utils.importProfile.
 """
 import sys
 import traceback
@@ -13,6 +17,8 @@ from twistedActor import startFileLogging
 
 from tcc.actor.tccLCOActor import TCCLCOActor
 from tcc.dev import TCSDevice, M2Device
+from tcc.utils.sharedState import DefaultSharedStatePath
+from tcc.utils.importProfile import importProfiler
 
 rolloverDatetime = datetime.time(hour=13, minute=0, second=0)
 
@@ -27,8 +33,11 @@ UserPort = 25000
 
 TCSHost = "c100tcs"#.lco.cl
 TCSDevicePort = 4242
+TCSPipelineStatus = False # write each status sweep as one batch; not yet verified on the real TCS
+TCSStatusPort = None # e.g. 4243: status polls use their own connection; not yet verified on the real TCS
 M2DeviceHost = "vinchuca"
 M2DevicePort = 52001
+M2PipelineCmds = False # write command sequences (e.g. for stop) at once; not yet verified on the real M2
 
 
 def startTCCLCO(*args):
@@ -36,15 +45,27 @@ def startTCCLCO(*args):
         tccActor = TCCLCOActor(
             name = "tcc",
             userPort = UserPort,
-            tcsDev = TCSDevice("tcsDev", TCSHost, TCSDevicePort),
-            m2Dev = M2Device("m2Dev", M2DeviceHost, M2DevicePort),
+            tcsDev = TCSDevice("tcsDev", TCSHost, TCSDevicePort, pipelineStatus=TCSPipelineStatus, statusPort=TCSStatusPort),
+            m2Dev = M2Device("m2Dev", M2DeviceHost, M2DevicePort, pipelineCmds=M2PipelineCmds),
+            sharedStatePath = DefaultSharedStatePath,
             )
     except Exception:
         print >>sys.stderr, "Error lcoTCC"
         traceback.print_exc(file=sys.stderr)
 
+def writeImportProfile():
+    """Stop profiling imports (if active) and write the report
+    """
+    if not importProfiler.isActive:
+        return
+    importProfiler.stop()
+    importProfiler.writeReport(extraLines=[
+        "listening on port %s %.3f sec after importing tcc" % (UserPort, importProfiler.elapsedTime),
+    ])
+
 def runTCC():
     startTCCLCO()
+    reactor.callWhenRunning(writeImportProfile)
     reactor.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# importProfile.py
+#
+# Record how long each module takes to import, to find what delays TCC startup.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import sys
+import timeit
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+__all__ = ["ImportProfileEnvVar", "ImportProfiler", "importProfiler", "startImportProfileFromEnv"]
+
+# set this environment variable to profile imports: to a file path to write the report there,
+# or to "1" to write it to stderr; the report is written once the TCC actor is listening
+ImportProfileEnvVar = "TCC_IMPORT_PROFILE"
+
+# default "level" argument of __import__: python 2 tries implicit relative imports first
+_DefaultLevel = -1 if sys.version_info[0] < 3 else 0
+
+
+class ImportProfiler(object):
+    """Time the first import of each module by replacing the builtin __import__
+
+    Each record is (depth, module name(s), self time, cumulative time), where the self time
+    excludes the time spent importing other modules (in seconds); records are listed
+    in the order the imports finished, so a module follows the modules it imported.
+    """
+
+    def __init__(self):
+        self.isActive = False
+        self.startTime = None
+        self.recordList = []
+        self._recordedNames = set()
+        self._origImport = None
+        self._childTimeStack = [] # time spent importing recorded modules, for each import in progress
+
+    def start(self):
+        """Start recording imports (a no-op if already recording)
+        """
+        if self.isActive:
+            return
+        self.isActive = True
+        self.startTime = timeit.default_timer()
+        self._origImport = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        """Stop recording imports
+        """
+        if not self.isActive:
+            return
+        builtins.__import__ = self._origImport
+        self.isActive = False
+
+    @property
+    def elapsedTime(self):
+        """Seconds since start was called
+        """
+        return timeit.default_timer() - self.startTime
+
+    def _candidateNames(self, name, globals, level, fromlist):
+        """Return full module names that an __import__ call might load
+        """
+        globals = globals or {}
+        modName = globals.get("__name__") or ""
+        if "__path__" in globals:
+            pkgName = modName
+        else:
+            pkgName = globals.get("__package__") or modName.rpartition(".")[0]
+        if level > 0:
+            baseName = pkgName.rsplit(".", level - 1)[0] if level > 1 else pkgName
+            nameList = [".".join(item for item in (baseName, name) if item)]
+        elif level < 0 and pkgName and name:
+            # python 2 implicit relative import
+            nameList = ["%s.%s" % (pkgName, name), name]
+        else:
+            nameList = [name]
+        # "from pkg import mod" may load submodule pkg.mod
+        subNameList = [subName for subName in fromlist or () if subName != "*"]
+        return nameList + ["%s.%s" % (modName, subName) for modName in nameList for subName in subNameList]
+
+    def _import(self, name, globals=None, locals=None, fromlist=None, level=_DefaultLevel):
+        candNameList = self._candidateNames(name, globals, level, fromlist)
+        loadedList = [sys.modules.get(candName) is not None for candName in candNameList]
+        self._childTimeStack.append(0.0)
+        startTime = timeit.default_timer()
+        try:
+            return self._origImport(name, globals, locals, fromlist, level)
+        finally:
+            cumTime = timeit.default_timer() - startTime
+            childTime = self._childTimeStack.pop()
+            newNameList = [candName for candName, wasLoaded in zip(candNameList, loadedList)
+                if not wasLoaded and candName not in self._recordedNames and sys.modules.get(candName) is not None]
+            if newNameList:
+                self._recordedNames.update(newNameList)
+                self.recordList.append((len(self._childTimeStack), ", ".join(newNameList), cumTime - childTime, cumTime))
+                if self._childTimeStack:
+                    self._childTimeStack[-1] += cumTime
+            elif self._childTimeStack:
+                # nothing new was loaded by this call itself; pass on the time of any modules it loaded
+                self._childTimeStack[-1] += childTime
+
+    def getReport(self, numSlowest=20):
+        """Return the report as a list of lines
+
+        @param[in] numSlowest  number of modules to list in order of decreasing self time
+        """
+        lineList = ["Import time (ms): self, cumulative, module (in order of completion)"]
+        for depth, modName, selfTime, cumTime in self.recordList:
+            lineList.append("%9.1f %9.1f %s%s" % (selfTime * 1e3, cumTime * 1e3, "  " * depth, modName))
+        lineList.append("")
+        lineList.append("Slowest %s modules (ms): self, cumulative, module" % (numSlowest,))
+        for depth, modName, selfTime, cumTime in sorted(self.recordList, key=lambda rec: -rec[2])[0:numSlowest]:
+            lineList.append("%9.1f %9.1f %s" % (selfTime * 1e3, cumTime * 1e3, modName))
+        lineList.append("")
+        totalTime = sum(rec[3] for rec in self.recordList if rec[0] == 0)
+        lineList.append("%s modules imported in %.3f sec" % (len(self.recordList), totalTime))
+        return lineList
+
+    def writeReport(self, dest=None, extraLines=()):
+        """Write the report
+
+        @param[in] dest  file path, or "1" for stderr;
+            if None use the value of environment variable ImportProfileEnvVar (stderr if that is not set)
+        @param[in] extraLines  additional lines to append to the report
+        """
+        if dest is None:
+            dest = os.environ.get(ImportProfileEnvVar)
+        reportStr = "\n".join(self.getReport() + list(extraLines)) + "\n"
+        if dest in (None, "", "1"):
+            sys.stderr.write(reportStr)
+        else:
+            with open(dest, "w") as f:
+                f.write(reportStr)
+
+
+# the profiler used for TCC startup
+importProfiler = ImportProfiler()
+
+
+def startImportProfileFromEnv():
+    """Start importProfiler if environment variable ImportProfileEnvVar is set
+    """
+    if os.environ.get(ImportProfileEnvVar):
+        importProfiler.start()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# sharedState.py
+#
+# Fixed layout memory-mapped telescope state block, for processes on the TCC host.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import mmap
+import os
+import struct
+import time
+
+__all__ = ["DefaultSharedStatePath", "SharedStateFields", "SharedStateWriter", "SharedStateReader", "SharedStateError"]
+
+# default location of the state block (in memory on linux)
+DefaultSharedStatePath = "/dev/shm/lcoTCCState"
+
+Magic = b"TCCS"
+LayoutVersion = 1
+
+# all values are float64; NaN if unknown
+SharedStateFields = (
+    "time", # unix time at which the block was last written
+    # TCS
+    "haPos", "decPos", # mount hour angle, declination (deg)
+    "raMPos", "decMPos", # mean ra, dec (deg)
+    "telAz", "telEl", # (deg)
+    "rotPos", # rotator (deg)
+    "rerr", "derr", # ra, dec axis errors (arcsec)
+    "ha", "st", # hour angle, sidereal time (deg)
+    "airmass",
+    "screenPos", # flat field screen (deg)
+    "telState", # 1=Halted, 2=Tracking, 3=Slewing, NaN=unknown
+    "tcsTime", # unix time of the last TCS status sweep
+    # M2
+    "secFocus", "secTipX", "secTipY", "secTransX", "secTransY", # orientation (um, arcsec)
+    "secDesFocus", "secDesTipX", "secDesTipY", "secDesTransX", "secDesTransY", # desired orientation
+    "secMoving", # 1 if moving, 0 if not
+    "secTime", # unix time of the last M2 status
+)
+
+# magic, layout version, number of fields, padding, sequence counter
+HeaderStruct = struct.Struct("<4sIII Q")
+PayloadStruct = struct.Struct("<%id" % (len(SharedStateFields),))
+BlockSize = HeaderStruct.size + PayloadStruct.size
+SeqOffset = HeaderStruct.size - 8
+SeqStruct = struct.Struct("<Q")
+
+
+class SharedStateError(Exception):
+    pass
+
+
+class SharedStateWriter(object):
+    """Publish telescope state in a memory-mapped file
+
+    The block is a fixed header followed by one float64 per entry of SharedStateFields.
+    Writes are bracketed by a sequence counter that is odd while a write is in progress,
+    so readers can detect and retry torn reads without locking.
+    There must only be one writer per file.
+    """
+
+    def __init__(self, path=DefaultSharedStatePath):
+        """Create (or reset) the state block
+
+        @param[in] path  file to map
+        """
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, BlockSize)
+            self.mmap = mmap.mmap(fd, BlockSize, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        self.seq = 0
+        self.valueDict = dict((name, float("nan")) for name in SharedStateFields)
+        HeaderStruct.pack_into(self.mmap, 0, Magic, LayoutVersion, len(SharedStateFields), 0, self.seq)
+        self._writePayload()
+
+    def update(self, valueDict):
+        """Update some values and publish the whole block
+
+        @param[in] valueDict  dict of field name: value; None is published as NaN
+        """
+        for name, value in valueDict.items():
+            if name not in self.valueDict:
+                raise SharedStateError("Unknown shared state field %r" % (name,))
+            self.valueDict[name] = float("nan") if value is None else float(value)
+        self.valueDict["time"] = time.time()
+        self._writePayload()
+
+    def _writePayload(self):
+        # odd sequence number: write in progress
+        self.seq += 1
+        SeqStruct.pack_into(self.mmap, SeqOffset, self.seq)
+        PayloadStruct.pack_into(self.mmap, HeaderStruct.size, *[self.valueDict[name] for name in SharedStateFields])
+        self.seq += 1
+        SeqStruct.pack_into(self.mmap, SeqOffset, self.seq)
+
+    def close(self):
+        self.mmap.close()
+
+
+class SharedStateReader(object):
+    """Read telescope state published by a SharedStateWriter
+
+    A read costs a few microseconds and never blocks the writer.
+    """
+
+    def __init__(self, path=DefaultSharedStatePath):
+        """Map an existing state block
+
+        @param[in] path  file to map
+        @throw SharedStateError if the file is not a state block with a compatible layout
+        """
+        self.path = path
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if os.fstat(fd).st_size < BlockSize:
+                raise SharedStateError("%s is too small to be a state block" % (path,))
+            self.mmap = mmap.mmap(fd, BlockSize, mmap.MAP_SHARED, mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, version, numFields = HeaderStruct.unpack_from(self.mmap, 0)[0:3]
+        if magic != Magic or version != LayoutVersion or numFields != len(SharedStateFields):
+            self.mmap.close()
+            raise SharedStateError("%s has magic=%r, version=%s, numFields=%s; expected %r, %s, %s" %
+                (path, magic, version, numFields, Magic, LayoutVersion, len(SharedStateFields)))
+
+    def readTuple(self, maxTries=1000):
+        """Return (sequence number, tuple of values in SharedStateFields order)
+
+        @param[in] maxTries  give up after this many torn reads
+        @throw SharedStateError if no consistent read was obtained
+        """
+        for i in range(maxTries):
+            seq = SeqStruct.unpack_from(self.mmap, SeqOffset)[0]
+            if seq % 2:
+                continue
+            values = PayloadStruct.unpack_from(self.mmap, HeaderStruct.size)
+            if SeqStruct.unpack_from(self.mmap, SeqOffset)[0] == seq:
+                return seq, values
+        raise SharedStateError("No consistent read of %s after %i tries" % (self.path, maxTries))
+
+    def read(self, maxTries=1000):
+        """Return a dict of field name: value, plus "seq": the sequence number
+
+        @param[in] maxTries  give up after this many torn reads
+        """
+        seq, values = self.readTuple(maxTries)
+        valueDict = dict(zip(SharedStateFields, values))
+        valueDict["seq"] = seq
+        return valueDict
+
+    def close(self):
+        self.mmap.close()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# taiClock.py
+#
+# TAI and UTC from the system clock, using a cached table of leap seconds.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import bisect
+import calendar
+import time
+import warnings
+
+__all__ = ["TAIClock", "taiClock", "tai", "utcMinusTAI", "UnixEpochMJDSecs"]
+
+# MJD 40587 = 1970-01-01, the unix epoch
+UnixEpochMJDSecs = 40587 * 24 * 3600
+
+# (year, month, TAI-UTC in seconds starting on the first of that month)
+# leap seconds through the one at the end of 2016; refresh from astropy to get newer ones
+LeapSecondList = (
+    (1972, 1, 10), (1972, 7, 11), (1973, 1, 12), (1974, 1, 13), (1975, 1, 14),
+    (1976, 1, 15), (1977, 1, 16), (1978, 1, 17), (1979, 1, 18), (1980, 1, 19),
+    (1981, 7, 20), (1982, 7, 21), (1983, 7, 22), (1985, 7, 23), (1988, 1, 24),
+    (1990, 1, 25), (1991, 1, 26), (1992, 7, 27), (1993, 7, 28), (1994, 7, 29),
+    (1996, 1, 30), (1997, 7, 31), (1999, 1, 32), (2006, 1, 33), (2009, 1, 34),
+    (2012, 7, 35), (2015, 7, 36), (2017, 1, 37),
+)
+
+
+def _unixTimeOfMonth(year, month):
+    return calendar.timegm((year, month, 1, 0, 0, 0))
+
+
+class TAIClock(object):
+    """TAI and UTC (as MJD seconds) from the system clock, which must be synchronized to UTC
+
+    TAI-UTC is looked up in a table of leap seconds that is kept in memory.
+    The table starts as LeapSecondList and may be updated from astropy with refresh;
+    astropy is only imported by refresh.
+    """
+
+    def __init__(self, leapSecondList=LeapSecondList):
+        """Construct a TAIClock
+
+        @param[in] leapSecondList  list of (year, month, TAI-UTC) for each leap second, in time order
+        """
+        self._setTable(leapSecondList)
+        self.refreshTime = None # unix time of the last successful refresh
+
+    def _setTable(self, leapSecondList):
+        self.leapSecondList = tuple(leapSecondList)
+        # unix times at which each TAI-UTC starts, and the TAI-UTC values
+        self._startTimeList = [_unixTimeOfMonth(year, month) for year, month, offset in self.leapSecondList]
+        self._offsetList = [offset for year, month, offset in self.leapSecondList]
+
+    def taiMinusUTC(self, unixTime=None):
+        """Return TAI-UTC (sec) at the specified time
+
+        @param[in] unixTime  unix time (e.g. from time.time()); if None use the current time
+        """
+        if unixTime is None:
+            unixTime = time.time()
+        ind = bisect.bisect_right(self._startTimeList, unixTime) - 1
+        # before 1972 TAI-UTC was not an integer; use the earliest value
+        return self._offsetList[max(ind, 0)]
+
+    def tai(self, unixTime=None):
+        """Return TAI as MJD seconds
+
+        @param[in] unixTime  unix time (e.g. from time.time()); if None use the current time
+        """
+        if unixTime is None:
+            unixTime = time.time()
+        return unixTime + UnixEpochMJDSecs + self.taiMinusUTC(unixTime)
+
+    def utc(self, unixTime=None):
+        """Return UTC as MJD seconds
+
+        @param[in] unixTime  unix time (e.g. from time.time()); if None use the current time
+        """
+        if unixTime is None:
+            unixTime = time.time()
+        return unixTime + UnixEpochMJDSecs
+
+    def refresh(self, numYears=2):
+        """Update the table of leap seconds from astropy
+
+        Samples TAI-UTC from astropy at the start of each January and July (when leap seconds take effect)
+        from 1972 through numYears after the current year. This imports astropy, which is slow the first time.
+
+        @param[in] numYears  number of years after this one to sample
+        @return True if the table changed
+        @throw ImportError if astropy is not available
+        """
+        from astropy.time import Time
+
+        endYear = time.gmtime().tm_year + numYears
+        yearMonthList = [(year, month) for year in range(1972, endYear + 1) for month in (1, 7)]
+        with warnings.catch_warnings():
+            # astropy warns about dates beyond its table ("dubious year")
+            warnings.simplefilter("ignore")
+            utcTime = Time(["%04d-%02d-01" % (year, month) for year, month in yearMonthList], scale="utc")
+            offsetList = (utcTime.tai.mjd - utcTime.utc.mjd) * 24 * 3600
+        leapSecondList = []
+        for (year, month), offset in zip(yearMonthList, offsetList):
+            offset = int(round(offset))
+            if not leapSecondList or offset != leapSecondList[-1][2]:
+                leapSecondList.append((year, month, offset))
+        self.refreshTime = time.time()
+        if tuple(leapSecondList) == self.leapSecondList:
+            return False
+        self._setTable(leapSecondList)
+        return True
+
+
+# the clock used by the TCC
+taiClock = TAIClock()
+
+
+def tai(unixTime=None):
+    """Return TAI as MJD seconds, using taiClock
+
+    @param[in] unixTime  unix time (e.g. from time.time()); if None use the current time
+    """
+    return taiClock.tai(unixTime)
+
+
+def utcMinusTAI(unixTime=None):
+    """Return UTC-TAI (sec), using taiClock
+
+    @param[in] unixTime  unix time (e.g. from time.time()); if None use the current time
+    """
+    return -taiClock.taiMinusUTC(unixTime)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# telemetry.py
+#
+# Preallocated ring buffer of timestamped telescope status samples.
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import time
+
+import numpy
+
+__all__ = ["TelemetryBuffer"]
+
+
+class TelemetryBuffer(object):
+    """A fixed size ring buffer of timestamped samples of numeric fields
+
+    Samples are stored in a preallocated numpy structured array, so append is O(1)
+    and window queries are vectorized.  Fields that are unknown in a sample are
+    stored as NaN and ignored by the statistics.
+    """
+
+    def __init__(self, fieldNames, size=8192):
+        """Construct a TelemetryBuffer
+
+        @param[in] fieldNames  list of numeric field names
+        @param[in] size  maximum number of samples kept
+        """
+        if "time" in fieldNames:
+            raise ValueError("'time' is reserved for the sample timestamp")
+        self.fieldNames = list(fieldNames)
+        self.size = int(size)
+        self.dtype = numpy.dtype([("time", numpy.float64)] + [(name, numpy.float64) for name in self.fieldNames])
+        self.data = numpy.empty(self.size, dtype=self.dtype)
+        self.data.fill(numpy.nan)
+        self.nextInd = 0
+        self.num = 0
+
+    def __len__(self):
+        return self.num
+
+    def clear(self):
+        self.data.fill(numpy.nan)
+        self.nextInd = 0
+        self.num = 0
+
+    def append(self, valueDict, timestamp=None):
+        """Add a sample, overwriting the oldest one if the buffer is full
+
+        @param[in] valueDict  dict of field name: value; missing fields and None are stored as NaN
+        @param[in] timestamp  sample time (unix seconds); if None use time.time()
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        row = self.data[self.nextInd]
+        row["time"] = timestamp
+        for name in self.fieldNames:
+            value = valueDict.get(name)
+            row[name] = numpy.nan if value is None else value
+        self.nextInd = (self.nextInd + 1) % self.size
+        self.num = min(self.num + 1, self.size)
+
+    def latest(self, name):
+        """Return (time, value) of the newest sample with a finite value for name, or (None, None)
+        """
+        times, values = self.window(name)
+        if not len(values):
+            return None, None
+        return times[-1], values[-1]
+
+    def window(self, name, seconds=None, now=None):
+        """Return (times, values) arrays of finite samples of a field, oldest first
+
+        @param[in] name  field name
+        @param[in] seconds  only return samples no older than this; if None return all
+        @param[in] now  reference time for seconds; if None use the newest sample time
+        """
+        if self.num < self.size:
+            sliceList = [slice(0, self.num)]
+        else:
+            # the oldest sample is at nextInd; index both parts rather than copying the whole buffer
+            sliceList = [slice(self.nextInd, self.size), slice(0, self.nextInd)]
+        if seconds is not None and self.num and now is None:
+            now = self.data["time"][self.nextInd - 1]
+        timesList = []
+        valuesList = []
+        for dataSlice in sliceList:
+            times = self.data["time"][dataSlice]
+            values = self.data[name][dataSlice]
+            keep = numpy.isfinite(values)
+            if seconds is not None:
+                keep &= times >= now - seconds
+            timesList.append(times[keep])
+            valuesList.append(values[keep])
+        if len(sliceList) == 1:
+            return timesList[0], valuesList[0]
+        return numpy.concatenate(timesList), numpy.concatenate(valuesList)
+
+    def mean(self, name, seconds=None, now=None):
+        """Return the mean of a field over the window, NaN if there are no samples
+        """
+        values = self.window(name, seconds, now)[1]
+        return values.mean() if len(values) else numpy.nan
+
+    def std(self, name, seconds=None, now=None):
+        """Return the (population) standard deviation of a field over the window, NaN if there are no samples
+        """
+        values = self.window(name, seconds, now)[1]
+        return values.std() if len(values) else numpy.nan
+
+    def slope(self, name, seconds=None, now=None):
+        """Return the least squares rate of change (units/sec) of a field over the window
+
+        NaN if there are fewer than 2 samples at distinct times.
+        """
+        times, values = self.window(name, seconds, now)
+        if len(values) < 2:
+            return numpy.nan
+        dt = times - times.mean()
+        denom = numpy.dot(dt, dt)
+        if denom == 0:
+            return numpy.nan
+        return numpy.dot(dt, values - values.mean()) / denom
+
+    def predictDecay(self, name, threshold, seconds=None, now=None, numSamples=5):
+        """Predict when the magnitude of a decaying field will reach a threshold
+
+        Fits an exponential decay (a straight line to log(abs(value)) vs. time)
+        to the most recent samples, ignoring samples that are exactly 0.
+
+        @param[in] name  field name
+        @param[in] threshold  magnitude threshold (> 0)
+        @param[in] seconds  only use samples no older than this; if None use all
+        @param[in] now  reference time for seconds; if None use the newest sample time
+        @param[in] numSamples  maximum number of recent samples to fit
+        @return predicted time (same units as sample times), the newest sample time
+            if that sample is already within threshold, or None if there are fewer than
+            2 samples or the magnitude is not decaying
+        """
+        times, values = self.window(name, seconds, now)
+        times = times[-numSamples:]
+        values = numpy.abs(values[-numSamples:])
+        if len(values) and values[-1] <= threshold:
+            return times[-1]
+        # an exact 0 cannot be fit in log space
+        positive = values > 0
+        times = times[positive]
+        values = values[positive]
+        if len(values) < 2:
+            return None
+        logValues = numpy.log(values)
+        dt = times - times.mean()
+        denom = numpy.dot(dt, dt)
+        if denom == 0:
+            return None
+        rate = numpy.dot(dt, logValues - logValues.mean()) / denom
+        if rate >= 0:
+            return None
+        # log(threshold) = logValues.mean() + rate * (t - times.mean())
+        return times.mean() + (numpy.log(threshold) - logValues.mean()) / rate
@@ -0,0 +1,190 @@
+#!/usr/bin/env python2
+from __future__ import division, absolute_import
+
+import re
+
+from twisted.trial.unittest import TestCase
+
+import RO.Alg
+
+from tcc.parse import parseDefs
+from tcc.parse.cmdParse import CmdParser, ParseError, fastTokenize
+from tcc.actor.tccLCOCmdParser import TCCLCOCmdList
+
+# lines the fast tokenizer must handle
+FastLineList = (
+    "guideoffset 0.0001,-0.0002,0.001,5",
+    "guideoffset 1e-4, -2E-4 ,0,+5.",
+    "guideoffset 1,2,3,4/waitTime=5",
+    "guideoffset 1,2,3,4 /wait = 5.5",
+    "guideoffset 1,2,3,4/waittime",
+    "GUIDEOFFSET 1,2,3,4   /WAITT=5",
+    "offset guide 0,0,0.1",
+    "offset arc 0.001,-0.002",
+    "off rot 0.5",
+    "offset calib -0.1,0.2,3",
+    "show status",
+    "  show   status  ",
+    "sh stat",
+    "show time",
+    "sec move 1,2,3,4,5/incr",
+    "sec stop",
+    "device status",
+    "device init tcs,sec",
+    "device status/timelimit=10",
+    "target 10,20/posAngle=30/screen",
+    "target 10,20 /ha /abort",
+    "target/abort",
+    "collimate startTimer",
+    "guiderot on",
+    "ff status",
+    "ping",
+    "subscribe /keywords=axePos,tccHA /maxRate=2",
+)
+
+# lines the fast tokenizer must leave to pyparsing
+SlowLineList = (
+    "set focus=100",
+    "set focus = 100/incr",
+    "target 10,20/posAngle=(30)",
+    "show status ! a comment",
+    "subscribe /keywords=(axePos,tccHA)",
+)
+
+# lines that must fail to parse
+BadLineList = (
+    "guideoffset 1,2,3",
+    "guideoffset 1,2,3,4,5",
+    "guideoffset 1,2,3,x",
+    "offset 0,0",
+    "offset guide 0,0/foo",
+    "s status",
+    "sec",
+    "noSuchVerb 1,2",
+    # fastTokenize must reject these, since pyparsing splits "1abc" into two parameters
+    # and a trailing comma is an error
+    "offset guide 0,0,1abc",
+    "guideoffset 1,2,3,4,",
+)
+
+
+def describeParsedCmd(parsedCmd):
+    """Return a comparable description of a ParsedCmd
+    """
+    return (
+        parsedCmd.cmdVerb,
+        parsedCmd.callFunc,
+        [(name, repr(par)) for name, par in parsedCmd.paramDict.iteritems()],
+        sorted((name, repr(qual)) for name, qual in parsedCmd.qualDict.iteritems()),
+    )
+
+def asList(ppResult):
+    """Convert (possibly missing) pyparsing results to a list
+    """
+    if not ppResult:
+        return []
+    return ppResult.asList()
+
+
+class TestCmdParse(TestCase):
+
+    def setUp(self):
+        self.parser = CmdParser(TCCLCOCmdList)
+        # reference parser: the original pyparsing-only behavior
+        self.ppParser = CmdParser(TCCLCOCmdList, cacheSize=0, useFastTokenize=False)
+
+    def testFastTokenize(self):
+        for line in FastLineList:
+            fastTokens = fastTokenize(line)
+            self.assertIsNotNone(fastTokens, "fastTokenize rejected %r" % (line,))
+            ppOut = self.ppParser.tokenize(line)
+            self.assertEqual(fastTokens.cmdVerb, ppOut.cmdVerb)
+            self.assertEqual(fastTokens.qualifiers, asList(ppOut.qualifiers), line)
+            self.assertEqual(fastTokens.parameters, asList(ppOut.parameters), line)
+        for line in SlowLineList + BadLineList[-2:]:
+            self.assertIsNone(fastTokenize(line), "fastTokenize accepted %r" % (line,))
+
+    def testEquivalence(self):
+        for line in FastLineList + SlowLineList:
+            ppDesc = describeParsedCmd(self.ppParser.parseLine(line))
+            self.assertEqual(describeParsedCmd(self.parser.parseLine(line)), ppDesc, line)
+            # again, from the cache
+            self.assertEqual(describeParsedCmd(self.parser.parseLine(line)), ppDesc, line)
+
+    def testBadLines(self):
+        for line in BadLineList:
+            for parser in (self.ppParser, self.parser):
+                self.assertRaises(Exception, parser.parseLine, line)
+                # errors are not cached
+                self.assertRaises(Exception, parser.parseLine, line)
+        self.assertEqual(len(self.parser._parseCache), 0)
+        self.assertRaises(ParseError, self.parser.parseLine, "noSuchVerb 1,2")
+
+    def testCache(self):
+        parser = CmdParser(TCCLCOCmdList, cacheSize=2)
+        showStatus = parser.parseLine("show status")
+        self.assertIs(parser.parseLine("  show  status "), showStatus)
+        guideOffset = parser.parseLine("guideoffset 1,2,3,4")
+        # "show status" is now the most recently used, so "guideoffset" is discarded first
+        parser.parseLine("show status")
+        parser.parseLine("ping")
+        self.assertIs(parser.parseLine("show status"), showStatus)
+        self.assertIsNot(parser.parseLine("guideoffset 1,2,3,4"), guideOffset)
+        self.assertEqual(len(parser._parseCache), 2)
+        parser.clearCache()
+        self.assertIsNot(parser.parseLine("show status"), showStatus)
+
+    def testAbbrevIndex(self):
+        nameList = ["on", "One", "off", "status", "stop", 5, "Stat"]
+        abbrevIndex = parseDefs.AbbrevIndex(nameList)
+        matchList = RO.Alg.MatchList(valueList=nameList)
+        for abbrev in ("o", "on", "ON", "one", "of", "s", "st", "stat", "statu", "STOP", "x", "onex", ""):
+            self.assertEqual(abbrevIndex.getAllMatches(abbrev), matchList.getAllMatches(abbrev))
+            try:
+                match = matchList.getUniqueMatch(abbrev)
+            except ValueError as e:
+                self.assertRaisesRegexp(ValueError, "^%s$" % (re.escape(str(e)),), abbrevIndex.getUniqueIndex, abbrev)
+            else:
+                self.assertEqual(abbrevIndex.getUniqueIndex(abbrev), nameList.index(match))
+
+    def testNegatedQualifier(self):
+        cmdDef = parseDefs.Command(
+            name = "track",
+            qualifierList = [
+                parseDefs.Qualifier(name = "collimate", negatable = True, defBoolValue = True),
+                parseDefs.Qualifier(name = "noWait"),
+                parseDefs.Qualifier(name = "nowhere"),
+                parseDefs.Qualifier(name = "stop", valType = ["now", "later"], numValueRange = [0, 1]),
+            ],
+        )
+        parser = CmdParser([cmdDef])
+        for line, qualName, boolValue in (
+            ("track /coll", "collimate", True),
+            ("track /nocoll", "collimate", False),
+            ("track /noWa", "noWait", True),
+            ("track /noWh", "nowhere", True),
+        ):
+            self.assertEqual(parser.parseLine(line).qualDict[qualName.lower()].boolValue, boolValue, line)
+        self.assertEqual(parser.parseLine("track /stop=LA").qualDict["stop"].valueList, ["later"])
+        # "no" is ambiguous both as a name and as a negated name
+        self.assertRaisesRegexp(ValueError, "too many matches", parser.parseLine, "track /no")
+        self.assertRaisesRegexp(ValueError, "no matches", parser.parseLine, "track /nostop")
+        self.assertRaisesRegexp(ValueError, "no matches", parser.parseLine, "track /stop=x")
+
+    def testLazyCallFunc(self):
+        callFunc = parseDefs.LazyCallFunc("tcc.cmd.ping", "ping")
+        self.assertFalse(callFunc.isResolved)
+        from tcc.cmd.ping import ping
+        self.assertIs(callFunc.resolve(), ping)
+        self.assertTrue(callFunc.isResolved)
+        self.assertRaises(ImportError, parseDefs.LazyCallFunc("tcc.cmd.noSuchModule", "ping").resolve)
+        self.assertRaises(AttributeError, parseDefs.LazyCallFunc("tcc.cmd.ping", "noSuchFunc").resolve)
+
+        # every command's callback can be found
+        for callFunc in self.parser.getCallFuncList():
+            self.assertTrue(callable(callFunc.resolve()), repr(callFunc))
+
+
+if __name__ == '__main__':
+    from unittest import main
+    main()
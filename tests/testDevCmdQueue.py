@@ -0,0 +1,67 @@
+#!/usr/bin/env python2
+from __future__ import division, absolute_import
+
+from twisted.trial.unittest import TestCase
+
+from twistedActor import DevCmd
+
+from tcc.dev.devCmdQueue import DevCmdQueue, PriorityMotion, PriorityStatus
+
+def getPriority(devCmd):
+    return PriorityStatus if devCmd.cmdStr.islower() else PriorityMotion
+
+def getStatusVerbs(devCmd):
+    return [devCmd.cmdStr] if devCmd.cmdStr.islower() else None
+
+class TestDevCmdQueue(TestCase):
+    """Test priority ordering and status superseding of DevCmdQueue
+    """
+    def setUp(self):
+        self.started = []
+        self.queue = DevCmdQueue(getPriority, getStatusVerbs)
+
+    def addCmd(self, cmdStr):
+        devCmd = DevCmd(cmdStr=cmdStr)
+        self.queue.addCmd(devCmd, lambda cmd: self.started.append(cmd.cmdStr))
+        return devCmd
+
+    def finishCurrent(self):
+        devCmd = self.queue.currExeCmd.cmd
+        devCmd.setState(devCmd.Done)
+
+    def testMotionJumpsStatus(self):
+        self.addCmd("rerr")
+        self.addCmd("derr")
+        self.addCmd("state")
+        self.addCmd("OFFP")
+        self.assertEqual(self.started, ["rerr"])
+        self.finishCurrent()
+        self.assertEqual(self.started, ["rerr", "OFFP"])
+        self.finishCurrent()
+        self.finishCurrent()
+        self.assertEqual(self.started, ["rerr", "OFFP", "derr", "state"])
+        self.assertIn("motion", self.queue.getWaitStatsStr())
+
+    def testFifoWithinPriority(self):
+        self.addCmd("rerr")
+        for cmdStr in ["OFRA 1", "OFDC 1", "OFFP"]:
+            self.addCmd(cmdStr)
+        for ii in range(3):
+            self.finishCurrent()
+        self.assertEqual(self.started, ["rerr", "OFRA 1", "OFDC 1", "OFFP"])
+
+    def testSupersede(self):
+        self.addCmd("OFFP")
+        oldCmd = self.addCmd("mrp")
+        newCmd = self.addCmd("mrp")
+        self.assertEqual(len(self.queue.queueList), 1)
+        self.finishCurrent()
+        self.finishCurrent()
+        self.assertTrue(newCmd.isDone and not newCmd.didFail)
+        self.assertTrue(oldCmd.isDone and not oldCmd.didFail)
+        self.assertEqual(self.started, ["OFFP", "mrp"])
+
+
+if __name__ == '__main__':
+    from unittest import main
+    main()
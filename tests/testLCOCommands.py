@@ -3,6 +3,7 @@ from __future__ import division, absolute_import
 
 import functools
 import itertools
+import time
 
 import numpy
 
@@ -10,9 +11,11 @@ from twisted.trial.unittest import TestCase
 from twisted.internet.defer import gatherResults, Deferred
 from twisted.internet import reactor
 
-from tcc.actor import TCCLCODispatcherWrapper
+from tcc.actor import TCCLCODispatcherWrapper, tccLCOActor
+from tcc.dev import tcsDevice, m2Device
+from tcc.dev.devCmdQueue import PriorityCommand, PriorityMotion, PriorityStatus
 
-from twistedActor import testUtils
+from twistedActor import testUtils, expandCommand, DevCmd
 
 testUtils.init(__file__)
 
@@ -110,6 +113,20 @@ class TestLCOCommands(TestCase):
         """
         return self.queueCmd(cmdStr, callFunc=functools.partial(self.checkOffsetDone, raVal=raVal, decVal=decVal))
 
+    def recordTCSCmds(self):
+        """Record the cmdStr of each device command queued on the tcs device
+
+        @return list of recorded cmdStr, updated as commands are queued
+        """
+        tcsDev = self.actor.tcsDev
+        cmdStrList = []
+        queueDevCmd = tcsDev.queueDevCmd
+        def recordQueueDevCmd(devCmd):
+            cmdStrList.append(devCmd.cmdStr)
+            return queueDevCmd(devCmd)
+        tcsDev.queueDevCmd = recordQueueDevCmd
+        return cmdStrList
+
     def checkFocus(self, cmdVar, focusVal):
         """Check the actor, and the model, verify that the correct focus
         is present
@@ -404,6 +421,7 @@ class TestLCOCommands(TestCase):
         def cb(cmdVar):
             self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
             self.assertEqual(self.actor.secDev.status.secFocus, position)
+            self.assertIsNone(self.actor.secDev.moveEndTime)
         return self.queueCmd("sec move %.4f"%position, cb)
 
     def testSecMove2(self):
@@ -418,6 +436,112 @@ class TestLCOCommands(TestCase):
                 self.assertEqual(x1, x2)
         return self.queueCmd("sec move %.4f, %.2f"%(position,tipx), cb)
 
+    def testM2Status(self):
+        status = m2Device.Status()
+        status.parseStatus("State=DONE Ori=12500.0,-0.0,-0.0,-0.0,0.0 Lamps=off Galil=off")
+        self.assertEqual(status.state, m2Device.Done)
+        self.assertEqual(status.orientation, [12500.0, 0, 0, 0, 0])
+        self.assertEqual((status.lamps, status.galil), ("off", "off"))
+        kwDict = status.getStatusDict()
+        self.assertEqual(kwDict["secFocus"], "12500.00")
+        self.assertEqual(status.changeMask, 0)
+        # an unchanged reply changes nothing
+        status.parseStatus("State=DONE Ori=12500.0,-0.0,-0.0,-0.0,0.0 Lamps=off Galil=off")
+        self.assertEqual(status.changeMask, 0)
+        self.assertEqual(status.getStatusDict(), kwDict)
+        # fields in another order are parsed the slow way
+        status.parseStatus("Galil=ON Lamps=1 State=error Ori=12400,1,2,3,4")
+        self.assertEqual(status.state, m2Device.Failed)
+        self.assertEqual((status.lamps, status.galil), ("on", "on"))
+        self.assertEqual(status.changeMask,
+            m2Device.StateBit | m2Device.OrientationBit | m2Device.LampsBit | m2Device.GalilBit)
+        kwDict = status.getStatusDict()
+        self.assertEqual(kwDict["secFocus"], "12400.00")
+        self.assertEqual(kwDict["ffPower"], "T")
+        self.assertEqual(kwDict["secDesOrient"], "NaN, NaN, NaN, NaN, NaN, 0.00")
+        status.desOrientation = [12300, 1, 2, 3, 4]
+        self.assertEqual(status.getStatusDict()["secDesOrient"], "12300.00, 1.00, 2.00, 3.00, 4.00, 0.00")
+        self.assertRaises(AssertionError, status.parseStatus, "State=DONE Ori=1,2,3 Lamps=off Galil=off")
+        self.assertRaises(AssertionError, status.parseStatus, "Foo=1")
+
+    def testSecStopPipelined(self):
+        self.actor.secDev.pipelineCmds = True
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            self.assertTrue(self.actor.secDev.usePipeline)
+            self.assertEqual(self.actor.secDev.status.galil, m2Device.Off)
+        return self.queueCmd("sec stop", cb)
+
+    def testSecMovePipelined(self):
+        self.actor.secDev.pipelineCmds = True
+        position = self.actor.secDev.status.secFocus + 5
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            self.assertTrue(self.actor.secDev.usePipeline)
+            self.assertEqual(self.actor.secDev.status.secFocus, position)
+        return self.queueCmd("sec move %.4f"%position, cb)
+
+    def testM2MergeMoves(self):
+        orientation = [100., 1., 2., 3., 4.]
+        def merge(*requestList):
+            return m2Device.mergeMoves([m2Device.MoveRequest(None, valueList, offset)
+                for valueList, offset in requestList], orientation)
+        self.assertEqual(merge(([5, 1], True), ([3], True)), ("offset", [8, 1], [108, 2, 2, 3, 4]))
+        self.assertEqual(merge(([50], False)), ("move", [50], [50, 1, 2, 3, 4]))
+        # an absolute value replaces earlier values and offsets; later offsets add to it
+        self.assertEqual(merge(([5], True), ([50, 10], False), ([2], True)), ("move", [52, 10], [52, 10, 2, 3, 4]))
+        # axes that are not moved keep their current value
+        self.assertEqual(merge(([5], True), ([None, 10, 20, 30, 40], False)),
+            ("move", [105, 10, 20, 30, 40], [105, 10, 20, 30, 40]))
+
+    def testSecMoveWhileMoving(self):
+        secDev = self.actor.secDev
+        focus = secDev.status.secFocus
+        d = Deferred()
+        moveCmd = secDev.move([focus + 10])
+        # these arrive while the mirror is moving, and are merged into one move
+        offsetCmd1 = secDev.focus(5, offset=True)
+        offsetCmd2 = secDev.focus(-2, offset=True)
+        self.assertEqual(len(secDev.moveRequestList), 2)
+        cmdList = [moveCmd, offsetCmd1, offsetCmd2]
+        def cb(cmd):
+            if all(cmd.isDone for cmd in cmdList) and not d.called:
+                for cmd in cmdList:
+                    self.assertFalse(cmd.didFail)
+                self.assertEqual(secDev.status.secFocus, focus + 13)
+                d.callback(None)
+        for cmd in cmdList:
+            cmd.addCallback(cb)
+        return d
+
+    def testSecStopPendingMove(self):
+        secDev = self.actor.secDev
+        focus = secDev.status.secFocus
+        secDev.move([focus + 10])
+        offsetCmd = secDev.focus(5, offset=True)
+        secDev.stop()
+        self.assertTrue(offsetCmd.isDone and offsetCmd.didFail)
+        self.assertEqual(secDev.moveRequestList, [])
+
+    def testM2MovePollTime(self):
+        secDev = self.actor.secDev
+        secDev.moveEndTime = None
+        self.assertEqual(secDev.movePollTime(), m2Device.PollTime)
+        # sleep until shortly before the predicted end, but not too long
+        secDev.moveEndTime = time.time() + 3
+        self.assertAlmostEqual(secDev.movePollTime(), 3 - m2Device.MoveBurstWindow, places=1)
+        secDev.moveEndTime = time.time() + 100
+        self.assertEqual(secDev.movePollTime(), m2Device.MoveMaxPollTime)
+        # poll densely around the predicted end
+        secDev.moveEndTime = time.time() + 0.5
+        self.assertEqual(secDev.movePollTime(), m2Device.MoveBurstPollTime)
+        secDev.moveEndTime = time.time() - 0.5
+        self.assertEqual(secDev.movePollTime(), m2Device.MoveBurstPollTime)
+        # the prediction was wrong: fall back to periodic polling
+        secDev.moveEndTime = time.time() - 10
+        self.assertEqual(secDev.movePollTime(), m2Device.PollTime)
+        secDev.moveEndTime = None
+
     def testTarget(self):
         ra = 5
         dec = 6
@@ -440,6 +564,32 @@ class TestLCOCommands(TestCase):
             self.assertTrue(self.actor.tcsDev.status.statusFieldDict["dec"], dec)
         return self.queueCmd("target %.4f, %.2f icrs /screen"%(ra, dec), cb)
 
+    def testTargetRejected(self):
+        ra = 5
+        dec = 6
+        self.dw.actorWrapper.tcsWrapper.controller.rejectCmdVerbs.add("RAD")
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and cmdVar.didFail)
+            tcsDev = self.actor.tcsDev
+            self.assertTrue(tcsDev.waitSlewCmd.didFail)
+            self.assertFalse(tcsDev.slewPending)
+            self.assertIn(tcsDev.pollState, (tcsDevice.Tracking, tcsDevice.Halted))
+        return self.queueCmd("target %.4f, %.2f icrs"%(ra, dec), cb)
+
+    def testSlewEstimate(self):
+        ra = 5
+        dec = 6
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            status = self.actor.tcsDev.status
+            self.assertIsNotNone(status.slewDuration)
+            self.assertGreaterEqual(status.slewDuration, tcsDevice.SlewSettleTime)
+            self.assertNotEqual(status.slewEnd(), "NaN")
+            # longer moves take longer
+            self.assertLess(tcsDevice.estimateSlewTime(10, 0), tcsDevice.estimateSlewTime(90, 0))
+            self.assertLess(tcsDevice.estimateSlewTime(0, 0, rotDist=1), tcsDevice.estimateSlewTime(0, 0, rotDist=100))
+        return self.queueCmd("target %.4f, %.2f icrs"%(ra, dec), cb)
+
     def testOffsetGuideMin(self):
         offset = 0.001 # below min threshold
         def cb(cmdVar):
@@ -458,6 +608,17 @@ class TestLCOCommands(TestCase):
             self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
         return self.queueCmd("offset guide 0, 0, %.5f"%(offset), cb)
 
+    def testRotMotion(self):
+        smallMove = tcsDevice.RotMotion(0.01, startTime=100)
+        bigMove = tcsDevice.RotMotion(-20, startTime=100)
+        self.assertLess(smallMove.duration, bigMove.duration)
+        self.assertGreaterEqual(smallMove.duration, tcsDevice.RotUnclampTime)
+        self.assertAlmostEqual(bigMove.clampedTime, 100 + bigMove.duration)
+        # small moves must be predicted to finish well within the rotator time limit
+        self.assertLess(tcsDevice.RotMotion(1).duration, tcsDevice.RotTimeLim)
+        # no dense clamp polling unless a rotator move is in progress
+        self.assertIsNone(self.actor.tcsDev.rotPollTime())
+
     def testShowFocus(self):
         def cb(cmdVar):
             self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
@@ -468,6 +629,132 @@ class TestLCOCommands(TestCase):
             self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
         return self.queueCmd("show status", cb)
 
+    def testPipelinedStatus(self):
+        self.actor.tcsDev.pipelineStatus = True
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            self.assertTrue(self.actor.tcsDev.usePipeline)
+            self.assertEqual(self.actor.tcsDev.status.statusFieldDict["airmass"].value, 1.01)
+        return self.queueCmd("device status tcs", cb)
+
+    def testCmdPriority(self):
+        tcsDev = self.actor.tcsDev
+        self.assertEqual(tcsDev.getCmdPriority(DevCmd(cmdStr="airmass")), PriorityStatus)
+        self.assertEqual(tcsDev.getCmdPriority(DevCmd(cmdStr="OFFP")), PriorityMotion)
+        for cmdStr in ("", "  "):
+            self.assertEqual(tcsDev.getCmdPriority(DevCmd(cmdStr=cmdStr)), PriorityCommand)
+
+    def testStatusSchedule(self):
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            # everything was just fetched, slow fields are not due
+            dueVerbs = self.actor.tcsDev.dueStatusVerbs()
+            self.assertNotIn("temps", dueVerbs)
+            self.assertNotIn("epoch", dueVerbs)
+            self.assertGreaterEqual(self.actor.tcsDev.nextPollTime(), 0.5)
+        return self.queueCmd("device status tcs", cb)
+
+    def testSlewHold(self):
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            tcsDev = self.actor.tcsDev
+            # early in a long slew only the costly position and error fields are held
+            tcsDev.waitSlewCmd = expandCommand()
+            tcsDev.status.slewStartTime = time.time()
+            tcsDev.status.slewDuration = 60
+            now = time.time()
+            statusFieldDict = tcsDev.status.statusFieldDict
+            self.assertGreater(tcsDev.slewHoldTime(statusFieldDict["ra"], now), 0)
+            self.assertLessEqual(tcsDev.slewHoldTime(statusFieldDict["ra"], now), tcsDevice.SlewMaxPollTime)
+            self.assertEqual(tcsDev.slewHoldTime(statusFieldDict["state"], now), 0)
+            self.assertLessEqual(tcsDev.nextPollTime(), tcsDevice.PollTimeSlew)
+            tcsDev.waitSlewCmd.setState(tcsDev.waitSlewCmd.Done)
+            self.assertEqual(tcsDev.slewHoldTime(statusFieldDict["ra"], now), 0)
+        return self.queueCmd("device status tcs", cb)
+
+    def testGetFreshCached(self):
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            cmdStrList = self.recordTCSCmds()
+            freshCmd = self.actor.tcsDev.status.getFresh(["ra", "dec"], maxAge=60)
+            self.assertTrue(freshCmd.isDone and not freshCmd.didFail)
+            self.assertEqual(cmdStrList, [])
+        return self.queueCmd("device status tcs", cb)
+
+    def testGetFreshStale(self):
+        d = Deferred()
+        def freshCB(freshCmd):
+            if freshCmd.isDone:
+                self.assertFalse(freshCmd.didFail)
+                self.assertLess(self.actor.tcsDev.status.getAge("ra"), 10)
+                d.callback(None)
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            status = self.actor.tcsDev.status
+            status.statusFieldDict["ra"].timestamp -= 100
+            self.assertEqual(status.getStaleVerbs(["ra", "dec"], maxAge=10), ["ra"])
+            cmdStrList = self.recordTCSCmds()
+            freshCmd = status.getFresh(["ra", "dec"], maxAge=10)
+            self.assertEqual(cmdStrList, ["ra"])
+            freshCmd.addCallback(freshCB)
+        self.queueCmd("device status tcs", cb)
+        return d
+
+    def testCollimateCached(self):
+        d = Deferred()
+        moveList = []
+        def collimateCB(collimateCmd):
+            if collimateCmd.isDone:
+                self.assertFalse(collimateCmd.didFail)
+                d.callback(None)
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            tcsDev = self.actor.tcsDev
+            secDev = self.actor.secDev
+            for cmdVerb in tccLCOActor.CollimationStatusVerbs:
+                tcsDev.status.statusFieldDict[cmdVerb].timestamp = time.time()
+            move = secDev.move
+            def recordMove(valueList, *args, **kwargs):
+                moveList.append(valueList)
+                return move(valueList, *args, **kwargs)
+            secDev.move = recordMove
+            cmdStrList = self.recordTCSCmds()
+            collimateCmd = expandCommand()
+            collimateCmd.addCallback(collimateCB)
+            self.actor.updateCollimation(collimateCmd, force=True)
+            # cached status is used: no tcs queries, the mirror is moved at once
+            self.assertEqual(cmdStrList, [])
+            self.assertEqual(len(moveList), 1)
+        self.queueCmd("device status tcs", cb)
+        return d
+
+    def testTCCKWCache(self):
+        def cb(cmdVar):
+            self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
+            status = self.actor.tcsDev.status
+            kwDict = status.getTCCKWDict()
+            self.assertEqual(kwDict["airmass"], status.airmass())
+            self.assertEqual(kwDict["tccTemps"], status.tccTemps())
+            # setting a new value reformats the keywords derived from it
+            status.statusFieldDict["airmass"].setValue("1.5")
+            self.assertEqual(status.getTCCKWDict()["airmass"], "1.50")
+        return self.queueCmd("device status tcs", cb)
+
+    def testStatusSingleFlight(self):
+        tcsDev = self.actor.tcsDev
+        statusCmd1 = tcsDev.getStatus()
+        statusCmd2 = tcsDev.getStatus()
+        self.assertEqual(len([sweep for sweep in tcsDev._statusSweeps if not sweep.isDone]), 1)
+        d = Deferred()
+        def cb(statusCmd):
+            if statusCmd1.isDone and statusCmd2.isDone and not d.called:
+                self.assertFalse(statusCmd1.didFail)
+                self.assertFalse(statusCmd2.didFail)
+                d.callback(None)
+        statusCmd1.addCallback(cb)
+        statusCmd2.addCallback(cb)
+        return d
+
     def testInstrumentNum(self):
         def cb(cmdVar):
             self.assertTrue(cmdVar.isDone and not cmdVar.didFail)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python2
+from __future__ import division, absolute_import
+
+from twisted.trial.unittest import TestCase
+
+from tcc.actor.tccLCOActor import TCCStatus
+from tcc.actor.kwSubscription import KWSubscription, KWSubscriptionManager
+from tcc.utils.taiClock import taiClock
+
+from twistedActor import testUtils
+testUtils.init(__file__)
+
+
+class RecordingCmd(object):
+    """Minimal stand in for a user command that records keyword output
+    """
+    userCommanded = False
+
+    def __init__(self):
+        self.eldestParentCmd = self
+        self.replyList = []
+
+    def writeToUsers(self, msgCode, msgStr):
+        self.replyList.append((msgCode, msgStr))
+
+
+class RecordingActor(object):
+    """Minimal stand in for an actor that records output to individual users
+    """
+    def __init__(self, userIDList):
+        self.userDict = dict((userID, None) for userID in userIDList)
+        self.replyList = []
+
+    def writeToOneUser(self, msgCode, msgStr, cmd=None, userID=None):
+        self.replyList.append((userID, msgCode, msgStr))
+
+
+class TestTCCStatus(TestCase):
+
+    def testChanged(self):
+        tccStatus = TCCStatus()
+        cmd = RecordingCmd()
+        tccStatus.updateKW("airmass", "1.20", cmd)
+        tccStatus.updateKW("airmass", "1.20", cmd)
+        tccStatus.updateKW("airmass", "1.30", cmd)
+        self.assertEqual(cmd.replyList, [("d", "airmass=1.20"), ("d", "airmass=1.30")])
+
+    def testTimeTagged(self):
+        tccStatus = TCCStatus()
+        cmd = RecordingCmd()
+        tccStatus.updateKW("objNetPos", "10.0,0.0,100.0,-20.0,0.0,100.0", cmd)
+        # only the time tags changed
+        tccStatus.updateKW("objNetPos", "10.0,0.0,102.0,-20.0,0.0,102.0", cmd)
+        self.assertEqual(len(cmd.replyList), 1)
+        tccStatus.updateKW("objNetPos", "10.5,0.0,104.0,-20.0,0.0,104.0", cmd)
+        self.assertEqual(cmd.replyList[-1], ("d", "objNetPos=10.5,0.0,104.0,-20.0,0.0,104.0"))
+        # heartbeat: an unchanged position is output once it is stale
+        tccStatus.kwOutputTimeDict["objnetpos"] -= 1000
+        tccStatus.updateKW("objNetPos", "10.5,0.0,106.0,-20.0,0.0,106.0", cmd)
+        self.assertEqual(len(cmd.replyList), 3)
+
+    def testBatch(self):
+        tccStatus = TCCStatus()
+        cmd = RecordingCmd()
+        tccStatus.updateKWs({"airmass": "1.20", "tccHA": "15.000000"}, cmd)
+        self.assertEqual(len(cmd.replyList), 1)
+        msgCode, msgStr = cmd.replyList[0]
+        self.assertEqual(msgCode, "d")
+        self.assertEqual(sorted(msgStr.split("; ")), ["airmass=1.20", "tccHA=15.000000"])
+        # nested batches are written when the outermost ends, latest value wins
+        tccStatus.beginBatch()
+        tccStatus.updateKW("airmass", "1.30", cmd)
+        tccStatus.updateKWs({"airmass": "1.40", "screenPos": "20.00"}, cmd)
+        self.assertEqual(len(cmd.replyList), 1)
+        tccStatus.endBatch()
+        self.assertEqual(cmd.replyList[-1], ("d", "airmass=1.40; screenPos=20.00"))
+
+    def testTimeKWs(self):
+        tccStatus = TCCStatus()
+        cmd = RecordingCmd()
+        tccStatus.outputTimeKWs(cmd)
+        msgCode, msgStr = cmd.replyList[0]
+        timeDict = dict(kwVal.split("=") for kwVal in msgStr.split("; "))
+        self.assertEqual(timeDict["UTC_TAI"], "-%.1f" % (taiClock.taiMinusUTC(),))
+        self.assertAlmostEqual(float(timeDict["TAI"]), taiClock.tai(), delta=1)
+        self.assertEqual(len(timeDict["TAI"].split(".")[1]), 6)
+
+    def testSubscriptionFilter(self):
+        replyList = []
+        sub = KWSubscription(lambda cmd, msgStr: replyList.append(msgStr), kwList=["AxePos", "airmass"])
+        sub.update(None, [("axePos", "1, 2, 3"), ("tccHA", "15.0"), ("airmass", "1.20")])
+        sub.update(None, [("tccHA", "15.1")])
+        self.assertEqual(replyList, ["axePos=1, 2, 3; airmass=1.20"])
+
+    def testSubscriptionRate(self):
+        replyList = []
+        sub = KWSubscription(lambda cmd, msgStr: replyList.append(msgStr), maxRate=0.01)
+        self.addCleanup(sub.cancel)
+        sub.update(None, [("airmass", "1.20")])
+        # within the rate limit: coalesced to the latest value of each keyword
+        sub.update(None, [("airmass", "1.30"), ("tccHA", "15.0")])
+        sub.update(None, [("airmass", "1.40")])
+        self.assertEqual(replyList, ["airmass=1.20"])
+        self.assertTrue(sub.flushTimer.isActive)
+        sub.flush()
+        self.assertEqual(replyList, ["airmass=1.20", "tccHA=15.0; airmass=1.40"])
+
+    def testSubscriptionManager(self):
+        actor = RecordingActor([1, 2])
+        subManager = KWSubscriptionManager(actor)
+        cmd = RecordingCmd()
+        # no subscriptions: one broadcast
+        subManager.writeKWs(cmd, [("airmass", "1.20"), ("tccHA", "15.0")])
+        self.assertEqual(cmd.replyList, [("d", "airmass=1.20; tccHA=15.0")])
+        self.assertEqual(actor.replyList, [])
+        subManager.subscribe(1, kwList=["airmass"])
+        subManager.writeKWs(cmd, [("airmass", "1.30"), ("tccHA", "15.1")])
+        self.assertEqual(len(cmd.replyList), 1)
+        self.assertEqual(sorted(actor.replyList), [(1, "d", "airmass=1.30"), (2, "d", "airmass=1.30; tccHA=15.1")])
+        # the subscriber disconnects: back to broadcasting
+        del actor.userDict[1]
+        subManager.writeKWs(cmd, [("airmass", "1.40")])
+        self.assertEqual(len(subManager), 0)
+        self.assertEqual(cmd.replyList[-1], ("d", "airmass=1.40"))
+
+
+if __name__ == '__main__':
+    from unittest import main
+    main()
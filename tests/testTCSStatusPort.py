@@ -0,0 +1,51 @@
+#!/usr/bin/env python2
+from __future__ import division, absolute_import
+
+from twisted.trial.unittest import TestCase
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+
+from tcc.dev import TCSDeviceWrapper
+
+from twistedActor import testUtils
+testUtils.init(__file__)
+
+class TestTCSStatusPort(TestCase):
+    """Test status queries on a dedicated TCS connection
+    """
+    def setUp(self):
+        self.dw = TCSDeviceWrapper(name="tcsWrapper", useStatusPort=True)
+        return self.dw.readyDeferred
+
+    def tearDown(self):
+        delayedCalls = reactor.getDelayedCalls()
+        for call in delayedCalls:
+            call.cancel()
+        return self.dw.close()
+
+    @property
+    def dev(self):
+        return self.dw.device
+
+    def testStatusOnStatusPort(self):
+        d = Deferred()
+        self.assertTrue(self.dev.statusDev is not None)
+        def checkStatus(statusCmd):
+            if statusCmd.isDone:
+                self.assertFalse(statusCmd.didFail)
+                self.assertEqual(self.dev.status.statusFieldDict["airmass"].value, 1.01)
+                d.callback(None)
+        def getStatus(statusDev):
+            if statusDev.conn.isConnected and not d.called:
+                self.assertTrue(self.dev.statusQueueDev is self.dev.statusDev)
+                self.dev.getStatus().addCallback(checkStatus)
+        if self.dev.statusDev.conn.isConnected:
+            getStatus(self.dev.statusDev)
+        else:
+            self.dev.statusDev.conn.addStateCallback(lambda conn: getStatus(self.dev.statusDev))
+        return d
+
+
+if __name__ == '__main__':
+    from unittest import main
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_collimate.py
+#
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import unittest
+
+import numpy
+
+from tcc.cmd.collimate import CollimationModel, DuPontHALimits, DuPontDecLimits
+
+
+class TestCollimationModel(unittest.TestCase):
+
+    def setUp(self):
+
+        rand = numpy.random.RandomState(1)
+        self.ha = rand.uniform(DuPontHALimits[0], DuPontHALimits[1], 5000)
+        self.dec = rand.uniform(DuPontDecLimits[0], DuPontDecLimits[1], 5000)
+
+    def test_vectorized(self):
+
+        model = CollimationModel()
+        orientArr = model.getOrientationArr(self.ha, self.dec)
+        self.assertEqual(orientArr.shape, (len(self.ha), 4))
+        for ha, dec, orient in zip(self.ha[0:200], self.dec[0:200], orientArr[0:200]):
+            scalarOrient = model.getOrientation(ha, dec)
+            self.assertIsNone(scalarOrient[0])
+            numpy.testing.assert_allclose(scalarOrient[1:], orient, rtol=0, atol=1e-9)
+        # scalars in, one orientation out
+        self.assertEqual(model.getOrientationArr(10., 20.).shape, (4,))
+        # at ha=0, dec=-29 the flexure terms are zero
+        numpy.testing.assert_allclose(model.getOrientationArr(0., -29.), model.baseOrientation, atol=1e-9)
+
+    def test_grid_accuracy(self):
+
+        model = CollimationModel()
+        exactArr = model.getOrientationArr(self.ha, self.dec)
+        model.useGrid(step=1.)
+        gridArr = model.getOrientationArr(self.ha, self.dec)
+        maxErr = numpy.max(numpy.abs(gridArr - exactArr), axis=0)
+        # far below the smallest collimation move (minTilt and minTrans)
+        self.assertLess(max(maxErr[0:2]), model.minTilt / 100.)
+        self.assertLess(max(maxErr[2:4]), model.minTrans / 50.)
+        # scalar lookups agree with vectorized lookups
+        for ha, dec, orient in zip(self.ha[0:200], self.dec[0:200], gridArr[0:200]):
+            numpy.testing.assert_allclose(model.getOrientation(ha, dec)[1:], orient, rtol=0, atol=1e-9)
+        # grid points are exact, including the corners
+        for ha, dec in ((DuPontHALimits[0], DuPontDecLimits[0]), (DuPontHALimits[1], DuPontDecLimits[1]), (12., -31.)):
+            numpy.testing.assert_allclose(model.getOrientation(ha, dec)[1:],
+                CollimationModel().getOrientation(ha, dec)[1:], rtol=0, atol=1e-9)
+
+    def test_grid_outside(self):
+
+        model = CollimationModel()
+        model.useGrid(step=2.)
+        exactModel = CollimationModel()
+        ha = numpy.array([120., -100., 0.])
+        dec = numpy.array([0., 10., 60.])
+        numpy.testing.assert_allclose(model.getOrientationArr(ha, dec), exactModel.getOrientationArr(ha, dec), atol=1e-9)
+        self.assertEqual(model.getOrientation(120., 0.), exactModel.getOrientation(120., 0.))
+        self.assertRaises(ValueError, model.grid.getFlexTerms, 120., 0.)
+        model.useGrid(None)
+        self.assertIsNone(model.grid)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_importProfile.py
+#
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import os
+import sys
+import tempfile
+import unittest
+
+from tcc.utils.importProfile import ImportProfiler
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+
+class TestImportProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = ImportProfiler()
+        # modules that are very unlikely to have been imported yet
+        for modName in ("wave", "chunk", "colorsys"):
+            sys.modules.pop(modName, None)
+
+    def tearDown(self):
+        self.profiler.stop()
+
+    def test_record(self):
+
+        origImport = builtins.__import__
+        self.profiler.start()
+        self.assertTrue(self.profiler.isActive)
+        import wave
+        import wave # already imported: not recorded again
+        import colorsys
+        self.profiler.stop()
+        self.assertIs(builtins.__import__, origImport)
+        self.assertFalse(self.profiler.isActive)
+
+        recordDict = dict((rec[1], rec) for rec in self.profiler.recordList)
+        self.assertIn("wave", recordDict)
+        self.assertIn("colorsys", recordDict)
+        self.assertEqual(len([rec for rec in self.profiler.recordList if rec[1] == "wave"]), 1)
+        # wave imports chunk, which is listed first, one level deeper
+        self.assertIn("chunk", recordDict)
+        modNameList = [rec[1] for rec in self.profiler.recordList]
+        self.assertLess(modNameList.index("chunk"), modNameList.index("wave"))
+        self.assertEqual(recordDict["chunk"][0], recordDict["wave"][0] + 1)
+        for depth, modName, selfTime, cumTime in self.profiler.recordList:
+            self.assertGreaterEqual(selfTime, 0)
+            self.assertGreaterEqual(cumTime, selfTime)
+        self.assertGreaterEqual(recordDict["wave"][3], recordDict["chunk"][3])
+
+    def test_report(self):
+
+        self.profiler.start()
+        import colorsys
+        self.profiler.stop()
+        reportLines = self.profiler.getReport()
+        self.assertTrue(any(line.endswith(" colorsys") for line in reportLines))
+        self.assertTrue(reportLines[-1].endswith("sec"))
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.profiler.writeReport(dest=path, extraLines=["done"])
+            with open(path, "r") as f:
+                lineList = f.read().splitlines()
+            self.assertEqual(lineList, reportLines + ["done"])
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
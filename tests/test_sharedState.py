@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_sharedState.py
+#
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import math
+import os
+import tempfile
+import unittest
+
+from tcc.utils import sharedState
+
+
+class TestSharedState(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(prefix="tccState")
+        os.close(fd)
+        self.writer = sharedState.SharedStateWriter(self.path)
+        self.reader = sharedState.SharedStateReader(self.path)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        os.remove(self.path)
+
+    def test_initially_unknown(self):
+
+        valueDict = self.reader.read()
+        self.assertEqual(valueDict["seq"] % 2, 0)
+        self.assertTrue(math.isnan(valueDict["haPos"]))
+
+    def test_update(self):
+
+        seq = self.reader.read()["seq"]
+        self.writer.update({"haPos": 15.5, "rerr": -0.25, "secMoving": True, "airmass": None})
+        valueDict = self.reader.read()
+        self.assertGreater(valueDict["seq"], seq)
+        self.assertEqual(valueDict["haPos"], 15.5)
+        self.assertEqual(valueDict["rerr"], -0.25)
+        self.assertEqual(valueDict["secMoving"], 1)
+        self.assertTrue(math.isnan(valueDict["airmass"]))
+        # later updates keep earlier values
+        self.writer.update({"decPos": -30})
+        valueDict = self.reader.read()
+        self.assertEqual(valueDict["haPos"], 15.5)
+        self.assertEqual(valueDict["decPos"], -30)
+
+    def test_unknown_field(self):
+
+        with self.assertRaises(sharedState.SharedStateError):
+            self.writer.update({"noSuchField": 1})
+
+    def test_bad_file(self):
+
+        with open(self.path, "wb") as f:
+            f.write(b"x" * sharedState.BlockSize)
+        with self.assertRaises(sharedState.SharedStateError):
+            sharedState.SharedStateReader(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
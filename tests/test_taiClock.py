@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_taiClock.py
+#
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import calendar
+import time
+import unittest
+
+from tcc.utils.taiClock import TAIClock, LeapSecondList, UnixEpochMJDSecs, tai, utcMinusTAI
+
+
+class TestTAIClock(unittest.TestCase):
+
+    def test_leap_seconds(self):
+
+        clock = TAIClock()
+        leapTime = calendar.timegm((2017, 1, 1, 0, 0, 0))
+        self.assertEqual(clock.taiMinusUTC(leapTime - 0.001), 36)
+        self.assertEqual(clock.taiMinusUTC(leapTime), 37)
+        self.assertEqual(clock.taiMinusUTC(calendar.timegm((1972, 6, 30, 12, 0, 0))), 10)
+        self.assertEqual(clock.taiMinusUTC(0), 10)
+        self.assertEqual(clock.taiMinusUTC(), LeapSecondList[-1][2])
+
+    def test_tai(self):
+
+        clock = TAIClock()
+        unixTime = calendar.timegm((2018, 3, 1, 12, 0, 0)) + 0.123456
+        # MJD 58178.5 = 2018-03-01 12:00 UTC
+        self.assertAlmostEqual(clock.utc(unixTime), 58178.5 * 24 * 3600 + 0.123456, places=6)
+        self.assertAlmostEqual(clock.tai(unixTime), 58178.5 * 24 * 3600 + 37.123456, places=6)
+        self.assertAlmostEqual(tai(unixTime), clock.tai(unixTime), places=6)
+        self.assertEqual(utcMinusTAI(unixTime), -37)
+        self.assertLess(abs(tai() - (time.time() + UnixEpochMJDSecs + 37)), 1)
+
+    def test_refresh(self):
+
+        try:
+            import astropy
+        except ImportError:
+            raise unittest.SkipTest("astropy not available")
+        clock = TAIClock(leapSecondList=LeapSecondList[0:-1])
+        self.assertEqual(clock.taiMinusUTC(), 36)
+        self.assertTrue(clock.refresh())
+        self.assertEqual(clock.leapSecondList[0:len(LeapSecondList)], LeapSecondList)
+        self.assertGreaterEqual(clock.taiMinusUTC(), 37)
+        self.assertIsNotNone(clock.refreshTime)
+
+
+if __name__ == '__main__':
+    unittest.main()
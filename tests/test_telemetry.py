@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# test_telemetry.py
+#
+
+
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+
+import numpy
+import unittest
+
+from tcc.utils.telemetry import TelemetryBuffer
+
+
+class TestTelemetryBuffer(unittest.TestCase):
+
+    def test_append_and_window(self):
+
+        buf = TelemetryBuffer(["rerr", "derr"], size=10)
+        for ii in range(5):
+            buf.append({"rerr": ii, "derr": None if ii % 2 else -ii}, timestamp=100 + ii)
+        self.assertEqual(len(buf), 5)
+        times, values = buf.window("rerr")
+        numpy.testing.assert_array_equal(times, [100, 101, 102, 103, 104])
+        numpy.testing.assert_array_equal(values, [0, 1, 2, 3, 4])
+        # unknown values are skipped
+        times, values = buf.window("derr")
+        numpy.testing.assert_array_equal(times, [100, 102, 104])
+        self.assertEqual(buf.latest("derr"), (104, -4))
+        # time window is relative to the newest sample by default
+        numpy.testing.assert_array_equal(buf.window("rerr", seconds=2)[1], [2, 3, 4])
+        numpy.testing.assert_array_equal(buf.window("rerr", seconds=2, now=102)[1], [0, 1, 2, 3, 4])
+
+    def test_wraparound(self):
+
+        buf = TelemetryBuffer(["rerr"], size=4)
+        for ii in range(10):
+            buf.append({"rerr": ii}, timestamp=ii)
+        self.assertEqual(len(buf), 4)
+        times, values = buf.window("rerr")
+        numpy.testing.assert_array_equal(times, [6, 7, 8, 9])
+        numpy.testing.assert_array_equal(values, [6, 7, 8, 9])
+        # the time window spans the wrap point
+        numpy.testing.assert_array_equal(buf.window("rerr", seconds=2)[1], [7, 8, 9])
+        self.assertEqual(buf.latest("rerr"), (9, 9))
+
+    def test_stats(self):
+
+        buf = TelemetryBuffer(["rerr"], size=100)
+        self.assertTrue(numpy.isnan(buf.mean("rerr")))
+        self.assertTrue(numpy.isnan(buf.slope("rerr")))
+        for ii in range(50):
+            buf.append({"rerr": 3 - 0.5 * ii}, timestamp=1000 + 2 * ii)
+        self.assertAlmostEqual(buf.slope("rerr"), -0.25)
+        self.assertAlmostEqual(buf.slope("rerr", seconds=10), -0.25)
+        self.assertAlmostEqual(buf.mean("rerr", seconds=4), 3 - 0.5 * 48)
+        # population std of the last two samples: -45 and -45.5
+        self.assertAlmostEqual(buf.std("rerr", seconds=2), 0.25)
+
+    def test_predict_decay(self):
+
+        buf = TelemetryBuffer(["rerr"], size=100)
+        self.assertIsNone(buf.predictDecay("rerr", 0.1))
+        buf.append({"rerr": -8.}, timestamp=10)
+        self.assertIsNone(buf.predictDecay("rerr", 0.1))
+        # halves every second, 8 -> 0.125 at t = 16
+        buf.append({"rerr": 4.}, timestamp=11)
+        buf.append({"rerr": -2.}, timestamp=12)
+        self.assertAlmostEqual(buf.predictDecay("rerr", 0.125), 16)
+        # growing errors have no prediction
+        buf.append({"rerr": 3.}, timestamp=13)
+        buf.append({"rerr": 5.}, timestamp=14)
+        self.assertIsNone(buf.predictDecay("rerr", 0.1, numSamples=2))
+        # already within threshold
+        buf.append({"rerr": 0.05}, timestamp=15)
+        self.assertEqual(buf.predictDecay("rerr", 0.1), 15)
+        # exact zeros are not fit, and never give NaN
+        buf.append({"rerr": 0.}, timestamp=16)
+        buf.append({"rerr": 4.}, timestamp=17)
+        self.assertIsNone(buf.predictDecay("rerr", 0.1, numSamples=2))
+        buf.append({"rerr": 2.}, timestamp=18)
+        self.assertAlmostEqual(buf.predictDecay("rerr", 0.125, numSamples=3), 22)
+
+    def test_reserved_name(self):
+
+        with self.assertRaises(ValueError):
+            TelemetryBuffer(["time"])
+
+
+if __name__ == '__main__':
+    unittest.main()